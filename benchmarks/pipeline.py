@@ -0,0 +1,397 @@
+"""End-to-end fetch -> embed -> rank -> digest benchmark on synthetic data.
+
+Runs fully offline: feeds are served from a local HTTP server, embeddings
+and LLM answers come from the stand-ins in src/fakes.py and the digest is
+sent to a FakeTelegramSender. Reports wall time and peak RSS per stage
+and the number of API calls each stage made.
+
+Usage:
+    python -m benchmarks.pipeline --articles 1000 --feedback 100
+    python -m benchmarks.pipeline --articles 10000 --feedback 1000 --json result.json
+    python -m benchmarks.pipeline --baseline result.json --tolerance 0.25
+
+With --baseline the exit status is 1 if any stage got slower than the
+tolerance allows or made more API calls than the baseline run.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import DatabaseManager, Article, Feedback  # noqa: E402
+from src.embedder import Embedder  # noqa: E402
+from src.fakes import FakeTelegramSender  # noqa: E402
+from src.fetcher import RSSFetcher  # noqa: E402
+from src.ranker import ArticleRanker  # noqa: E402
+from src.telegram_bot import TelegramBot  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+# Topic vocabularies; articles mix one main topic with filler words, so
+# feedback on a topic carries over to similar articles
+TOPICS = {
+    'ai': 'model training neural network inference transformer dataset benchmark gpu',
+    'security': 'vulnerability exploit patch breach ransomware malware encryption audit',
+    'space': 'rocket launch orbit satellite mission telescope lunar mars',
+    'health': 'clinical trial vaccine diagnosis hospital patient therapy genome',
+    'energy': 'solar battery grid wind nuclear emissions hydrogen storage',
+    'mobile': 'smartphone android ios app release camera chip display',
+    'policy': 'regulation court antitrust privacy law senate ruling compliance',
+    'science': 'physics quantum experiment particle climate ocean fossil species',
+}
+FILLER = 'today new report says company team week announced update plans could'.split()
+
+STAGES = ('fetch', 'embed', 'rank', 'digest')
+EMBED_CHUNK = 1000
+# Slowdowns below this are treated as timer noise
+NOISE_SECONDS = 0.1
+
+
+class SyntheticCorpus:
+    """Deterministic articles spread over RSS feeds."""
+    
+    def __init__(self, articles: int, feeds: int, seed: int = 0):
+        """Generate the corpus.
+        
+        Args:
+            articles: Total number of articles
+            feeds: Number of feeds to spread them over
+            seed: Random seed
+        """
+        rng = random.Random(seed)
+        topics = list(TOPICS)
+        now = datetime(2024, 1, 1)
+        self.feeds: Dict[str, List[dict]] = {f"feed-{i}": [] for i in range(feeds)}
+        self.topics: Dict[str, str] = {}
+        
+        for i in range(articles):
+            topic = topics[rng.randrange(len(topics))]
+            words = TOPICS[topic].split()
+            title = ' '.join(rng.sample(words, 3) + rng.sample(FILLER, 2)).capitalize() + f" #{i}"
+            body = ' '.join(rng.choice(words if rng.random() < 0.6 else FILLER) for _ in range(120))
+            url = f"https://bench.example/{topic}/{i}"
+            self.topics[url] = topic
+            self.feeds[f"feed-{i % feeds}"].append({
+                'title': title,
+                'link': url,
+                'description': f"<p>{body}</p>",
+                'published': now - timedelta(minutes=i)
+            })
+    
+    def feed_xml(self, name: str) -> bytes:
+        """Render one feed as RSS 2.0, newest entry first."""
+        items = ''.join(
+            f"<item><title>{escape(item['title'])}</title><link>{item['link']}</link>"
+            f"<guid>{item['link']}</guid>"
+            f"<pubDate>{format_datetime(item['published'])}</pubDate>"
+            f"<description>{escape(item['description'])}</description></item>"
+            for item in self.feeds[name]
+        )
+        return (
+            f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>'
+            f'{items}</channel></rss>'
+        ).encode()
+
+
+class FeedServer:
+    """Serves a corpus' feeds over HTTP on localhost."""
+    
+    def __init__(self, corpus: SyntheticCorpus):
+        """Render the feeds and start serving them.
+        
+        Args:
+            corpus: Corpus to serve
+        """
+        bodies = {f"/{name}": corpus.feed_xml(name) for name in corpus.feeds}
+        server = self
+        self.requests = 0
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = bodies.get(self.path)
+                self.send_response(200 if body else 404)
+                self.send_header('Content-Type', 'application/rss+xml')
+                self.end_headers()
+                self.wfile.write(body or b'')
+            
+            def log_message(self, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.urls = {
+            name: f"http://127.0.0.1:{self._server.server_port}/{name}" for name in corpus.feeds
+        }
+    
+    def stop(self):
+        """Stop serving."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def build_config(base: dict, workdir: str, feed_urls: Dict[str, str], args) -> dict:
+    """Benchmark configuration: the example config with offline providers."""
+    config = copy.deepcopy(base)
+    config['rss_feeds'] = [{'url': url, 'name': name} for name, url in feed_urls.items()]
+    config['database'] = {'path': os.path.join(workdir, 'bench.db')}
+    config['chromadb'] = {'path': os.path.join(workdir, 'chroma'), 'collection_name': 'bench'}
+    config['fetching'] = {**config.get('fetching', {}), 'per_host_concurrency': 8}
+    
+    embeddings = config['embeddings']
+    embeddings['provider'] = 'fake'
+    embeddings['fake'] = {'dimensions': args.dimensions, 'latency_seconds': args.embedding_latency}
+    embeddings['cache'] = {**embeddings.get('cache', {}),
+                           'path': os.path.join(workdir, 'embedding_cache.db')}
+    embeddings['pipeline'] = {**embeddings.get('pipeline', {}), 'enabled': False}
+    
+    llm = config['llm']
+    llm['provider'] = 'fake'
+    llm['fake'] = {'model': 'fake-ranker', 'latency_seconds': args.llm_latency,
+                   'latency_jitter': args.llm_latency / 2, 'max_tokens': 500}
+    llm['resilience'] = {**llm.get('resilience', {}), 'failover': False}
+    llm['budget'] = {**llm.get('budget', {}), 'enabled': False}
+    
+    config['local_ranker'] = {**config.get('local_ranker', {}),
+                              'model_path': os.path.join(workdir, 'local_ranker.joblib')}
+    config['filtering'] = {**config['filtering'], 'similarity_threshold': 0.0}
+    config['filtering']['streaming_digest'] = {
+        'enabled': args.streaming,
+        'wave_size': args.wave_size
+    }
+    config['filtering']['retrieval'] = {
+        **config['filtering'].get('retrieval', {}),
+        'mode': args.retrieval
+    }
+    return config
+
+
+@contextmanager
+def stage(results: dict, name: str):
+    """Record wall time and peak RSS of a stage."""
+    start = time.perf_counter()
+    yield
+    results['stages'][name] = {
+        'seconds': round(time.perf_counter() - start, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    }
+
+
+def add_feedback(db, corpus: SyntheticCorpus, count: int, seed: int = 0):
+    """Rate articles: two topics liked, the rest disliked."""
+    rng = random.Random(seed)
+    liked_topics = {'ai', 'space'}
+    articles = db.query(Article.id, Article.url).all()
+    rng.shuffle(articles)
+    db.add_all([
+        Feedback(article_id=article_id, user_id=1,
+                 rating='like' if corpus.topics.get(url) in liked_topics else 'dislike')
+        for article_id, url in articles[:count]
+    ])
+    db.query(Article).filter(
+        Article.id.in_([article_id for article_id, _ in articles[:count]])
+    ).update({Article.shown_to_user: True}, synchronize_session=False)
+    db.commit()
+
+
+def run(args, base_config: dict) -> dict:
+    """Run every stage once and collect the measurements."""
+    results = {
+        'articles': args.articles,
+        'feedback': args.feedback,
+        'feeds': args.feeds,
+        'streaming': args.streaming,
+        'retrieval': args.retrieval,
+        'stages': {},
+        'calls': {}
+    }
+    corpus = SyntheticCorpus(args.articles, args.feeds, args.seed)
+    server = FeedServer(corpus)
+    
+    with tempfile.TemporaryDirectory(prefix='rss-bench-') as workdir:
+        config = build_config(base_config, workdir, server.urls, args)
+        os.environ.setdefault(config['telegram']['bot_token_env'], '0:benchmark')
+        os.environ.setdefault(config['telegram']['admin_user_id_env'], '1')
+        
+        db_manager = DatabaseManager(config)
+        db_manager.create_tables()
+        db = db_manager.get_session()
+        try:
+            with stage(results, 'fetch'):
+                fetched = RSSFetcher(config).fetch_all(db)
+            results['calls']['feed_requests'] = server.requests
+            results['fetched'] = fetched
+            server.stop()
+            
+            add_feedback(db, corpus, args.feedback, args.seed)
+            
+            embedder = Embedder(config)
+            with stage(results, 'embed'):
+                articles = db.query(Article).all()
+                for start in range(0, len(articles), EMBED_CHUNK):
+                    chunk = articles[start:start + EMBED_CHUNK]
+                    embedder.store_article_embeddings(chunk, embedder.embed_articles(chunk))
+            results['calls']['embedding_requests'] = embedder.client.requests
+            results['calls']['embedded_texts'] = embedder.client.inputs
+            
+            ranker = ArticleRanker(config, embedder)
+            sender = FakeTelegramSender()
+            bot = TelegramBot(config, db_manager, ranker.preference_profile, sender)
+            rank_started = time.perf_counter()
+            pending = db.query(Article).filter(
+                Article.shown_to_user == False,
+                Article.duplicate_of == None
+            ).all()
+            liked = db.query(Article).join(Feedback).filter(Feedback.rating == 'like').all()
+            disliked = db.query(Article).join(Feedback).filter(Feedback.rating == 'dislike').all()
+            
+            if args.streaming:
+                # Ranking and sending overlap, so they are one stage
+                with stage(results, 'digest'):
+                    digest, ranked = asyncio.run(
+                        bot.stream_digest(db, ranker, pending, liked, disliked)
+                    )
+            else:
+                with stage(results, 'rank'):
+                    ranked = ranker.filter_and_rank_candidates(db, pending, liked, disliked)
+                with stage(results, 'digest'):
+                    min_score = config['filtering'].get('min_score_to_show', 7.0)
+                    digest = [item for item in ranked if item[1] >= min_score]
+                    digest = digest[:config['filtering']['articles_per_digest']]
+                    asyncio.run(bot.send_digest(digest))
+                    ranker.retriever.mark_shown(db, [article for article, _, _ in digest])
+            
+            chat = ranker.llm.clients[0].openai_client
+            results['calls']['llm_requests'] = chat.requests
+            results['calls']['llm_tokens'] = chat.prompt_tokens + chat.completion_tokens
+            ranker.close()
+            
+            # Query embeddings made while ranking count towards the embed total
+            results['calls']['embedding_requests'] = embedder.client.requests
+            results['calls']['telegram_messages'] = len(sender.messages)
+            results['ranked'] = len(ranked)
+            results['digest'] = len(digest)
+            if len(sender.messages) > 1:
+                # Message 0 is the digest header
+                results['first_article_seconds'] = round(
+                    sender.messages[1]['sent_at'] - rank_started, 3
+                )
+        finally:
+            db.close()
+            server.stop()
+    
+    results['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return results
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """List stages that got slower, or call counts that grew, vs a baseline."""
+    regressions = []
+    for name, measured in result['stages'].items():
+        before = baseline.get('stages', {}).get(name)
+        if before and measured['seconds'] > before['seconds'] * (1 + tolerance) + NOISE_SECONDS:
+            regressions.append(
+                f"{name}: {measured['seconds']:.2f}s vs {before['seconds']:.2f}s baseline"
+            )
+    for name, count in result['calls'].items():
+        before = baseline.get('calls', {}).get(name)
+        if before is not None and count > before:
+            regressions.append(f"{name}: {count} vs {before} baseline")
+    return regressions
+
+
+def print_report(result: dict):
+    """Print the measurements as a table."""
+    print(
+        f"\nPipeline benchmark: {result['articles']} articles in {result['feeds']} feeds, "
+        f"{result['feedback']} ratings, {result['retrieval']} retrieval"
+        f"{' (streaming digest)' if result['streaming'] else ''}"
+    )
+    print(f"{'stage':<8} {'seconds':>9} {'peak RSS MB':>12}")
+    for name in STAGES:
+        measured = result['stages'].get(name)
+        if measured:
+            print(f"{name:<8} {measured['seconds']:>9.3f} {measured['peak_rss_mb']:>12.1f}")
+    if 'first_article_seconds' in result:
+        print(f"First article sent after {result['first_article_seconds']:.3f}s of ranking")
+    print("API calls: " + ', '.join(f"{name}={count}" for name, count in result['calls'].items()))
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--articles', type=int, default=1000, help='Synthetic articles (e.g. 1000, 10000, 100000)')
+    parser.add_argument('--feedback', type=int, default=100, help='Ratings to add (e.g. 100, 1000)')
+    parser.add_argument('--feeds', type=int, default=20, help='Feeds the articles are spread over')
+    parser.add_argument('--dimensions', type=int, default=256, help='Fake embedding size')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='Simulated seconds per LLM request')
+    parser.add_argument('--embedding-latency', type=float, default=0.0, help='Simulated seconds per embedding request')
+    parser.add_argument('--streaming', action='store_true', help='Use the streaming digest')
+    parser.add_argument('--wave-size', type=int, default=None,
+                        help='Candidates ranked per streaming wave (default: one round of requests)')
+    parser.add_argument('--retrieval', choices=('exhaustive', 'ann'), default='exhaustive',
+                        help='How digest candidates are found')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', default='config/config.yaml.example', help='Base configuration')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs the baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line."""
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    
+    with open(args.config, 'r', encoding='utf-8') as f:
+        base_config = yaml.safe_load(f)
+    
+    result = run(args, base_config)
+    print_report(result)
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        sizes = ('articles', 'feedback', 'feeds', 'streaming', 'retrieval')
+        if any(baseline.get(key) != result[key] for key in sizes):
+            print("Baseline was measured on a different corpus size - not comparing")
+            return 2
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
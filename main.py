@@ -13,7 +13,9 @@ os.environ['ANONYMIZED_TELEMETRY'] = 'False'
 
 from src.database import DatabaseManager
 from src.fetcher import RSSFetcher
+from src.url_ingester import URLIngester
 from src.embedder import Embedder
+from src.embedding_pipeline import EmbeddingPipeline
 from src.ranker import ArticleRanker
 from src.cleanup import ArticleCleanupManager
 from src.telegram_bot import TelegramBot
@@ -113,9 +115,10 @@ async def init_components(config: dict):
     logger.info("Initializing embedder...")
     embedder = Embedder(config)
     
-    # Initialize fetcher
+    # Initialize fetcher (new articles are embedded in the background)
     logger.info("Initializing RSS fetcher...")
-    fetcher = RSSFetcher(config)
+    embedding_pipeline = EmbeddingPipeline(config, db_manager, embedder)
+    fetcher = RSSFetcher(config, embedding_pipeline)
     
     # Initialize ranker
     logger.info("Initializing article ranker...")
@@ -127,7 +130,9 @@ async def init_components(config: dict):
     
     # Initialize Telegram bot
     logger.info("Initializing Telegram bot...")
-    telegram_bot = TelegramBot(config, db_manager)
+    telegram_bot = TelegramBot(
+        config, db_manager, ranker.preference_profile, retriever=ranker.retriever
+    )
     await telegram_bot.start()
     
     # Initialize scheduler
@@ -215,6 +220,7 @@ async def run_app():
         except Exception as e:
             logger.error(f"Error stopping Telegram bot: {e}")
         
+        ranker.close()
         logger.info("✅ RSS AI Curator stopped")
 
 async def run_fetch():
@@ -228,6 +234,7 @@ async def run_fetch():
     logger.info("=== Running RSS Fetch ===")
     
     db_manager = DatabaseManager(config)
+    db_manager.create_tables()
     fetcher = RSSFetcher(config)
     
     db = db_manager.get_session()
@@ -238,6 +245,39 @@ async def run_fetch():
         db.close()
 
 
+async def run_ingest_urls(urls_file: str, report_path: str = None):
+    """Ingest a file of article URLs (one per line) and exit."""
+    logger = logging.getLogger(__name__)
+    
+    load_dotenv()
+    config = load_config()
+    setup_logging(config)
+    
+    logger.info(f"=== Ingesting URLs from {urls_file} ===")
+    
+    with open(urls_file, 'r') as f:
+        urls = [line for line in f if line.strip() and not line.startswith('#')]
+    
+    if report_path is None:
+        report_path = f"{urls_file}.report.csv"
+    
+    db_manager = DatabaseManager(config)
+    db_manager.create_tables()
+    fetcher = RSSFetcher(config)
+    ingester = URLIngester(config, fetcher)
+    
+    db = db_manager.get_session()
+    try:
+        summary = ingester.ingest(db, urls, report_path=report_path)
+        logger.info(
+            f"✅ Ingested {summary['total']} URLs: {summary['saved']} saved, "
+            f"{summary['skipped']} skipped, {summary['failed']} failed "
+            f"(report: {report_path})"
+        )
+    finally:
+        db.close()
+
+
 async def run_digest():
     """Generate and send digest once and exit."""
     logger = logging.getLogger(__name__)
@@ -321,6 +361,8 @@ Commands:
   python main.py init         Initialize database and directories
   python main.py start        Start the bot (runs continuously)
   python main.py fetch        Fetch RSS feeds once
+  python main.py ingest-urls FILE [REPORT]
+                              Save every article URL listed in FILE
   python main.py digest       Generate and send digest once
   python main.py cleanup      Run cleanup once
   python main.py stats        Show statistics
@@ -330,6 +372,7 @@ Examples:
   python main.py init         # First time setup
   python main.py start        # Start the bot
   python main.py fetch        # Manual RSS fetch
+  python main.py ingest-urls reading_list.txt   # Import a reading list
   python main.py stats        # Check your stats
 
 For more information, see README.md
@@ -350,6 +393,12 @@ def main():
         asyncio.run(run_app())
     elif command == 'fetch':
         asyncio.run(run_fetch())
+    elif command == 'ingest-urls':
+        if len(sys.argv) < 3:
+            print("Usage: python main.py ingest-urls FILE [REPORT]")
+            sys.exit(1)
+        report_path = sys.argv[3] if len(sys.argv) > 3 else None
+        asyncio.run(run_ingest_urls(sys.argv[2], report_path))
     elif command == 'digest':
         asyncio.run(run_digest())
     elif command == 'cleanup':
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Migration: Add columns introduced after the initial schema.
+
+⚠️  IMPORTANT: This migration is ONLY for existing databases!
+    New installations already include these columns, and new tables
+    are created automatically by 'python main.py init'.
+
+Run this once after upgrading (it is safe to run repeatedly):
+    python migrate_schema.py
+
+For fresh installations, just run:
+    python main.py init
+"""
+import sqlite3
+import sys
+import os
+
+# (table, column, column definition, index name or None)
+COLUMNS = [
+    ('articles', 'simhash', 'VARCHAR(16)', None),
+    ('articles', 'duplicate_of', 'INTEGER', 'ix_articles_duplicate_of'),
+    ('feed_state', 'newest_entry_id', 'VARCHAR(500)', None),
+    ('feed_state', 'last_polled_at', 'DATETIME', None),
+    ('feed_state', 'last_new_entry_at', 'DATETIME', None),
+    ('feed_state', 'avg_interval_seconds', 'FLOAT', None),
+    ('feed_state', 'next_poll_at', 'DATETIME', 'ix_feed_state_next_poll_at'),
+    ('feed_state', 'consecutive_failures', 'INTEGER DEFAULT 0', None),
+    ('feed_state', 'last_error', 'VARCHAR(500)', None),
+    ('feed_state', 'last_failure_at', 'DATETIME', None),
+    ('feed_state', 'next_attempt_at', 'DATETIME', 'ix_feed_state_next_attempt_at'),
+    ('llm_rankings', 'prompt_version', 'VARCHAR(50)', None),
+    ('llm_rankings', 'feedback_fingerprint', 'VARCHAR(64)', None),
+    ('llm_rankings', 'prompt_tokens', 'INTEGER', None),
+    ('llm_rankings', 'completion_tokens', 'INTEGER', None),
+    ('llm_rankings', 'cost_usd', 'FLOAT', None),
+]
+
+
+def migrate_database(db_path: str = "data/rss_curator.db"):
+    """Add any missing columns (and their indexes).
+    
+    Args:
+        db_path: Path to SQLite database
+    """
+    if not os.path.exists(db_path):
+        print(f"❌ Database not found at {db_path}")
+        print("   Run 'python main.py init' first to create the database.")
+        sys.exit(1)
+    
+    print(f"📦 Migrating database: {db_path}")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        added = []
+        
+        for table, column, definition, index_name in COLUMNS:
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = [row[1] for row in cursor.fetchall()]
+            
+            if not existing:
+                # Table doesn't exist yet - 'main.py init' will create it
+                continue
+            
+            if column not in existing:
+                print(f"🔧 Adding {table}.{column} column...")
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                )
+                added.append(f"{table}.{column}")
+            
+            if index_name:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {table}({column})"
+                )
+        
+        conn.commit()
+        
+        if added:
+            print(f"✅ Migration complete!")
+            for name in added:
+                print(f"   • Added {name}")
+        else:
+            print("✅ Migration already applied - all columns exist")
+    
+    except sqlite3.Error as e:
+        print(f"❌ Migration failed: {e}")
+        conn.rollback()
+        sys.exit(1)
+    
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    # Check if custom path provided
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "data/rss_curator.db"
+    
+    print("=" * 60)
+    print("  RSS AI Curator - Database Migration")
+    print("  Add new schema columns")
+    print("=" * 60)
+    print()
+    
+    migrate_database(db_path)
+    
+    print()
+    print("=" * 60)
+    print("  Next steps:")
+    print("  1. Create any new tables: python main.py init")
+    print("  2. Restart your bot: python main.py start")
+    print("=" * 60)
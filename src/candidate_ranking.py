@@ -0,0 +1,224 @@
+"""Concurrent and batched LLM ranking of candidate articles."""
+import json
+import math
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Callable, List, Dict, Tuple, Optional
+from .database import Article
+from .resilient_llm import ResilientLLM
+from .llm_budget import BudgetExceeded, Usage
+
+if TYPE_CHECKING:
+    from .ranker import ArticleRanker
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateRanker:
+    """Sends a ranker's prompts to the LLM, several at once and several per prompt.
+    
+    Prompts are built and single responses are queried by the ArticleRanker;
+    this class decides how candidates are grouped and how many requests are
+    in flight.
+    """
+    
+    def __init__(self, config: dict, ranker: 'ArticleRanker'):
+        """Initialize candidate ranker.
+        
+        Args:
+            config: Application configuration dictionary
+            ranker: Ranker that builds the prompts and owns the main model
+        """
+        self.ranker = ranker
+        # LLM calls in flight at once while ranking candidates (1 = sequential)
+        self.max_concurrent_requests = config['llm'].get('max_concurrent_requests', 4)
+        # Candidates sharing one context block per request (1 = one per request)
+        self.articles_per_prompt = config['llm'].get('articles_per_prompt', 5)
+    
+    def rank(
+        self,
+        candidates: List[Article],
+        liked_articles: List[Article],
+        disliked_articles: List[Article],
+        llm: Optional[ResilientLLM] = None,
+        usage: Optional[Dict[int, Optional[Usage]]] = None
+    ) -> List[Tuple[Article, float, str]]:
+        """Rank candidates with the LLM, several per prompt when configured.
+        
+        Prompts are built on this thread, since they read ORM objects tied
+        to the caller's session; only the API calls run concurrently.
+        Articles a batched response misses are ranked one by one. Articles
+        the budget did not cover are left out.
+        
+        Args:
+            candidates: Articles to rank
+            liked_articles: User's liked articles
+            disliked_articles: User's disliked articles
+            llm: Client to use (defaults to the main model)
+            usage: Dictionary filled with the tokens spent per article ID
+        
+        Returns:
+            List of (article, score, reasoning) tuples in candidate order
+        """
+        llm = llm or self.ranker.llm
+        results = {}
+        # Articles whose request failed after retries and failover
+        failed = set()
+        requests = 0
+        k = max(1, self.articles_per_prompt)
+        
+        if k > 1:
+            batches = []
+            for start in range(0, len(candidates), k):
+                chunk = candidates[start:start + k]
+                try:
+                    batches.append((chunk, self.ranker._prepare_batch_prompt(
+                        chunk, liked_articles, disliked_articles
+                    )))
+                except Exception as e:
+                    logger.error(f"Error preparing batch prompt: {e}", exc_info=True)
+            
+            batch_results = self._run_concurrently(partial(self._rank_batch, llm=llm), batches)
+            for (chunk, _), batch_result in zip(batches, batch_results):
+                if batch_result is None:
+                    failed.update(article.id for article in chunk)
+                else:
+                    results.update(batch_result)
+            requests += len(batches)
+        
+        singles = []
+        for article in candidates:
+            if article.id in results or article.id in failed:
+                continue
+            try:
+                singles.append((
+                    article,
+                    self.ranker._prepare_prompt(article, liked_articles, disliked_articles)
+                ))
+            except Exception as e:
+                logger.error(
+                    f"Error preparing article {article.id} ('{article.title[:50]}...'): {e}",
+                    exc_info=True
+                )
+                # Continue with other articles instead of failing completely
+                continue
+        
+        single_results = self._run_concurrently(
+            partial(self.ranker._query_llm, llm=llm), [prompt for _, prompt in singles]
+        )
+        for (article, _), result in zip(singles, single_results):
+            if result is None:
+                failed.add(article.id)
+            else:
+                results[article.id] = result
+        requests += len(singles)
+        
+        if usage is not None:
+            usage.update(
+                (article_id, article_usage) for article_id, (_, _, article_usage) in results.items()
+            )
+        
+        logger.info(
+            f"Ranked {len(results)} candidates with {requests} {llm.model} requests "
+            f"({k} per prompt, up to {self.max_concurrent_requests} concurrent)"
+        )
+        if failed:
+            logger.warning(f"Ranking failed for {len(failed)} candidates; they stay unranked")
+        return [
+            (article, *results[article.id][:2])
+            for article in candidates if article.id in results
+        ]
+    
+    def _run_concurrently(self, func: Callable, items: list) -> list:
+        """Apply func to items with bounded concurrency, keeping order.
+        
+        Args:
+            func: Function doing one LLM request per item
+            items: Items to process
+        
+        Returns:
+            List of results in item order
+        """
+        workers = max(1, min(self.max_concurrent_requests, len(items)))
+        if workers == 1:
+            return [func(item) for item in items]
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-rank') as pool:
+            return list(pool.map(func, items))
+    
+    def _rank_batch(
+        self,
+        batch: Tuple[List[Article], str],
+        llm: Optional[ResilientLLM] = None
+    ) -> Optional[Dict[int, Tuple[float, str, Optional[Usage]]]]:
+        """Rank several articles with one request.
+        
+        Args:
+            batch: Tuple of (articles, batch prompt)
+            llm: Client to use (defaults to the main model)
+        
+        Returns:
+            Dictionary mapping article ID to (score, reasoning, usage share)
+            for every article the response covered, or None if the request
+            failed or the budget does not cover it
+        """
+        llm = llm or self.ranker.llm
+        articles, prompt = batch
+        try:
+            response = llm.complete(prompt, max_tokens=llm.max_tokens * len(articles))
+        except BudgetExceeded:
+            return None
+        except Exception as e:
+            logger.error(f"Error querying LLM ({llm.provider}) for batch: {e}", exc_info=True)
+            return None
+        
+        results = parse_batch_response(response.text, articles)
+        share = response.usage.split(len(results)) if response.usage and results else None
+        return {
+            article_id: (score, reasoning, share)
+            for article_id, (score, reasoning) in results.items()
+        }
+
+
+def parse_batch_response(
+    content: str,
+    articles: List[Article]
+) -> Dict[int, Tuple[float, str]]:
+    """Parse and validate a batched JSON response.
+    
+    Args:
+        content: LLM response text
+        articles: Articles the prompt asked about
+    
+    Returns:
+        Dictionary mapping article ID to (score, reasoning); invalid,
+        unknown and duplicate entries are dropped
+    """
+    start, end = content.find('['), content.rfind(']')
+    try:
+        items = json.loads(content[start:end + 1]) if 0 <= start < end else None
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        logger.warning(f"Batch response is not a JSON array: {content[:200]}")
+        return {}
+    
+    wanted = {article.id for article in articles}
+    results = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            article_id = int(item.get('id'))
+            score = float(item.get('score'))
+        except (TypeError, ValueError):
+            continue
+        if article_id not in wanted or article_id in results or not math.isfinite(score):
+            continue
+        
+        # Clamp to 0-10
+        score = max(0.0, min(10.0, score))
+        results[article_id] = (score, str(item.get('reasoning') or '').strip())
+    
+    return results
@@ -0,0 +1,202 @@
+"""Approximate nearest-neighbour retrieval of digest candidates."""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import numpy as np
+from sklearn.cluster import KMeans
+from sqlalchemy.orm import Session
+from .database import Article, Config, Feedback
+from .embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateRetriever:
+    """Finds digest candidates with a few HNSW queries instead of a full scan.
+    
+    The queries are the liked centroid, k-means centroids of the liked
+    articles and the most recent likes. Each returns its nearest unshown
+    articles (by the 'shown' metadata flag) and their union is the pool
+    the ranker scores, so the work grows with the number of queries
+    rather than with the pending backlog.
+    """
+    
+    # Config table key recording that every stored embedding has a 'shown' flag
+    BACKFILL_KEY = 'chromadb_shown_flag'
+    
+    def __init__(self, config: dict, embedder: Embedder):
+        """Initialize candidate retriever.
+        
+        Args:
+            config: Application configuration dictionary
+            embedder: Embedder instance
+        """
+        retrieval_config = config.get('filtering', {}).get('retrieval', {})
+        # 'exhaustive' scores every pending article, 'ann' queries the index
+        self.enabled = retrieval_config.get('mode', 'exhaustive') == 'ann'
+        self.results_per_query = retrieval_config.get('results_per_query', 100)
+        self.clusters = retrieval_config.get('clusters', 4)
+        self.recent_likes = retrieval_config.get('recent_likes', 5)
+        # Pending articles this recent are embedded here if the pipeline missed them
+        self.embed_recent_hours = retrieval_config.get('embed_recent_hours', 24)
+        
+        self.embedder = embedder
+        self._backfilled = False
+    
+    def retrieve(
+        self,
+        db: Session,
+        pending: List[Article],
+        liked: List[Article]
+    ) -> Optional[Dict[int, np.ndarray]]:
+        """Retrieve the candidate pool for the pending articles.
+        
+        Args:
+            db: Database session
+            pending: Pending (unshown, non-duplicate) articles
+            liked: User's liked articles
+        
+        Returns:
+            Dictionary mapping pending article ID to embedding, or None if
+            there is nothing to query with or nothing pending was found
+            (score every article instead)
+        """
+        if not liked:
+            return None
+        
+        self._ensure_shown_flags(db)
+        self._embed_recent(pending)
+        
+        queries = self._query_vectors(db, liked)
+        if not len(queries):
+            return None
+        
+        found = self.embedder.find_unshown_neighbours(queries, self.results_per_query)
+        pending_ids = {article.id for article in pending}
+        pool = {article_id: vector for article_id, vector in found.items() if article_id in pending_ids}
+        
+        stale = [article_id for article_id in found if article_id not in pending_ids]
+        if stale:
+            self._flag_shown(db, stale)
+        
+        logger.info(
+            f"ANN retrieval: {len(queries)} queries returned {len(found)} articles, "
+            f"{len(pool)} of {len(pending)} pending kept as candidates"
+        )
+        return pool or None
+    
+    def mark_shown(self, db: Session, articles: List[Article]):
+        """Mark articles as shown to the user and commit, flagging them in the index.
+        
+        Every place that shows articles goes through here, so retrieval does
+        not spend its result slots on them.
+        
+        Args:
+            db: Database session
+            articles: Articles just sent to the user
+        """
+        article_ids = [article.id for article in articles]
+        now = datetime.utcnow()
+        for article in articles:
+            article.shown_to_user = True
+            article.shown_at = now
+        db.commit()
+        
+        if self.embedder is not None and article_ids:
+            self.embedder.set_shown(article_ids, True)
+    
+    def _query_vectors(self, db: Session, liked: List[Article]) -> np.ndarray:
+        """Liked centroid, liked cluster centroids and recent likes."""
+        matrix, id_to_row, _ = self.embedder.get_article_embeddings(
+            [article.id for article in liked]
+        )
+        if not id_to_row:
+            return np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        
+        queries = [matrix.mean(axis=0)]
+        
+        n_clusters = min(self.clusters, len(matrix))
+        if n_clusters > 1:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            kmeans.fit(matrix)
+            queries.extend(kmeans.cluster_centers_)
+        
+        if self.recent_likes:
+            recent = db.query(Feedback.article_id).filter(
+                Feedback.rating == 'like',
+                Feedback.article_id.in_(list(id_to_row))
+            ).order_by(Feedback.created_at.desc()).limit(self.recent_likes).all()
+            queries.extend(matrix[id_to_row[article_id]] for article_id, in recent)
+        
+        return np.vstack(queries)
+    
+    def _embed_recent(self, pending: List[Article]):
+        """Embed recently fetched pending articles the index does not have yet.
+        
+        Older ones are left to the embedding pipeline's backfill, so this
+        stays bounded by the fetch rate rather than the backlog.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=self.embed_recent_hours)
+        recent = [article for article in pending if article.fetched_at and article.fetched_at >= cutoff]
+        if not recent:
+            return
+        
+        stored = self.embedder.stored_article_ids([article.id for article in recent])
+        missing = [article for article in recent if article.id not in stored]
+        if missing:
+            embeddings = self.embedder.embed_articles(missing)
+            stored = self.embedder.store_article_embeddings(missing, embeddings)
+            logger.info(f"Embedded {stored} of {len(missing)} recent articles missing from the index")
+    
+    def _flag_shown(self, db: Session, article_ids: List[int]):
+        """Flag returned articles that are no longer pending as shown."""
+        still_pending = {
+            article_id for article_id, in db.query(Article.id).filter(
+                Article.id.in_(article_ids),
+                Article.shown_to_user == False,
+                Article.duplicate_of == None
+            )
+        }
+        done = [article_id for article_id in article_ids if article_id not in still_pending]
+        if done:
+            self.embedder.set_shown(done, True)
+    
+    def _ensure_shown_flags(self, db: Session):
+        """Give embeddings stored before the 'shown' flag existed one, once."""
+        if self._backfilled:
+            return
+        if db.get(Config, self.BACKFILL_KEY) is not None:
+            self._backfilled = True
+            return
+        
+        unflagged = (
+            self.embedder.stored_article_ids() -
+            self.embedder.stored_article_ids(where={'shown': {'$in': [True, False]}})
+        )
+        if unflagged:
+            pending = {
+                article_id for article_id, in db.query(Article.id).filter(
+                    Article.shown_to_user == False,
+                    Article.duplicate_of == None
+                )
+            }
+            flagged = (
+                self.embedder.set_shown(sorted(unflagged - pending), True) +
+                self.embedder.set_shown(sorted(unflagged & pending), False)
+            )
+            if flagged < len(unflagged):
+                # Retried next run; until then unflagged embeddings are not retrieved
+                logger.warning(
+                    f"Only {flagged} of {len(unflagged)} stored embeddings got a 'shown' flag"
+                )
+                return
+            logger.info(f"Added 'shown' flags to {len(unflagged)} stored embeddings")
+        
+        # Own session: committing the caller's would expire its articles, and an
+        # uncommitted flush would lock out the usage rows written while ranking
+        with Session(db.get_bind()) as session:
+            session.merge(Config(key=self.BACKFILL_KEY, value=datetime.utcnow().isoformat()))
+            session.commit()
+        self._backfilled = True
@@ -0,0 +1,149 @@
+"""Two-tier ranking: a cheap tier for every candidate, the main model for a slice."""
+import logging
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple
+from sqlalchemy.orm import Session
+from .database import Article
+from .local_ranker import LocalRanker
+
+if TYPE_CHECKING:
+    from .ranker import ArticleRanker
+
+logger = logging.getLogger(__name__)
+
+
+class RankingCascade:
+    """Decides which cheaply ranked candidates the main model re-ranks.
+    
+    The cheap tier is either the local ranker or a cheaper LLM. Its best
+    escalate_top_n scores, any score within uncertainty_band of
+    min_score_to_show, and any candidate it could not score are escalated.
+    """
+    
+    def __init__(self, config: dict):
+        """Initialize ranking cascade.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        cascade_config = config['llm'].get('cascade', {})
+        self.enabled = cascade_config.get('enabled', False)
+        # 'local' (LocalRanker) or 'llm' (cheap_provider / cheap_model)
+        self.cheap_tier = cascade_config.get('cheap_tier', 'local')
+        self.cheap_provider = cascade_config.get('cheap_provider', config['llm']['provider'])
+        self.cheap_model = cascade_config.get('cheap_model')
+        self.escalate_top_n = cascade_config.get('escalate_top_n', 8)
+        self.uncertainty_band = cascade_config.get('uncertainty_band', 1.0)
+        self.min_score = config.get('filtering', {}).get('min_score_to_show', 7.0)
+    
+    def select_for_escalation(
+        self,
+        cheap_scores: Dict[int, float],
+        candidate_ids: List[int]
+    ) -> Set[int]:
+        """Pick the candidates to re-rank with the main model.
+        
+        Args:
+            cheap_scores: Dictionary mapping article ID to cheap tier score
+            candidate_ids: IDs of all candidates
+        
+        Returns:
+            Set of article IDs to escalate
+        """
+        unscored = {article_id for article_id in candidate_ids if article_id not in cheap_scores}
+        top = sorted(cheap_scores, key=cheap_scores.get, reverse=True)[:self.escalate_top_n]
+        uncertain = {
+            article_id for article_id, score in cheap_scores.items()
+            if abs(score - self.min_score) <= self.uncertainty_band
+        }
+        return unscored | set(top) | uncertain
+    
+    def rank(
+        self,
+        ranker: 'ArticleRanker',
+        db: Session,
+        candidates: List[Article],
+        liked_articles: List[Article],
+        disliked_articles: List[Article],
+        fingerprint: str
+    ) -> List[Tuple[Article, float, str]]:
+        """Rank with the cheap tier, then re-rank the escalated slice.
+        
+        Both tiers' results are stored with their own provider and model.
+        
+        Args:
+            ranker: Ranker owning the clients, caches and ranking storage
+            db: Database session
+            candidates: Articles to rank
+            liked_articles: User's liked articles
+            disliked_articles: User's disliked articles
+            fingerprint: Fingerprint of the current feedback set
+        
+        Returns:
+            List of (article, score, reasoning) tuples in candidate order,
+            from the main model where escalated
+        """
+        cheap = self._rank_cheap_tier(
+            ranker, db, candidates, liked_articles, disliked_articles, fingerprint
+        )
+        
+        # Failed cheap calls leave candidates unscored; those are always escalated
+        cheap_scores = {article.id: score for article, score, _ in cheap}
+        escalate_ids = self.select_for_escalation(
+            cheap_scores, [article.id for article in candidates]
+        )
+        escalated = [article for article in candidates if article.id in escalate_ids]
+        premium = []
+        if escalated:
+            usage = {}
+            premium = ranker.candidate_ranker.rank(
+                escalated, liked_articles, disliked_articles, usage=usage
+            )
+            ranker._save_rankings(db, premium, fingerprint, usage=usage)
+        
+        changed = sum(
+            1 for article, score, _ in premium
+            if article.id in cheap_scores
+            and (cheap_scores[article.id] >= self.min_score) != (score >= self.min_score)
+        )
+        logger.info(
+            f"Cascade: {len(escalated)}/{len(candidates)} candidates escalated to {ranker.model}, "
+            f"threshold outcome changed for {changed}"
+        )
+        
+        final = {article.id: (article, score, reasoning) for article, score, reasoning in cheap}
+        final.update((article.id, (article, score, reasoning)) for article, score, reasoning in premium)
+        return [final[article.id] for article in candidates if article.id in final]
+    
+    def _rank_cheap_tier(
+        self,
+        ranker: 'ArticleRanker',
+        db: Session,
+        candidates: List[Article],
+        liked_articles: List[Article],
+        disliked_articles: List[Article],
+        fingerprint: str
+    ) -> List[Tuple[Article, float, str]]:
+        """Rank candidates with the cheap tier and store the results."""
+        if ranker.cheap_llm is None:
+            ranked = ranker.local_ranker.rank(candidates)
+            ranker._save_rankings(
+                db, ranked, provider=LocalRanker.PROVIDER, model=LocalRanker.MODEL
+            )
+            return ranked
+        
+        cheap_llm = ranker.cheap_llm
+        cached = ranker.ranking_cache.lookup(
+            db, candidates, cheap_llm.model, ranker.prompt_version, fingerprint
+        )
+        usage = {}
+        ranked = ranker.candidate_ranker.rank(
+            [article for article in candidates if article.id not in cached],
+            liked_articles, disliked_articles, cheap_llm, usage
+        )
+        ranker._save_rankings(
+            db, ranked, fingerprint, cheap_llm.provider, cheap_llm.model, usage
+        )
+        return ranked + [
+            (article, cached[article.id].score, cached[article.id].reasoning)
+            for article in candidates if article.id in cached
+        ]
@@ -5,6 +5,7 @@ from typing import Dict
 from sqlalchemy.orm import Session
 from .database import Article, Feedback, LLMRanking, CleanupLog
 from .embedder import Embedder
+from .preference_profile import PreferenceProfileManager
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,7 @@ class ArticleCleanupManager:
         self.config = config['cleanup']
         self.retention = config['cleanup']['retention']
         self.embedder = embedder
+        self.preference_profile = PreferenceProfileManager(config, embedder)
     
     def run_cleanup(self, db: Session) -> Dict:
         """Execute cleanup based on policies.
@@ -38,6 +40,10 @@ class ArticleCleanupManager:
         
         logger.info("Starting article cleanup...")
         
+        # Deletions are only flushed until the single commit at the end
+        self._deleted_ids = []
+        self._rated_ids = []
+        
         stats = {
             'deleted': 0,
             'liked_kept': 0,
@@ -48,22 +54,33 @@ class ArticleCleanupManager:
         # Track initial counts
         initial_count = db.query(Article).count()
         
-        # 1. Time-based cleanup
-        stats['deleted'] += self._cleanup_by_age(db)
-        
-        # 2. Count-based cleanup
-        stats['deleted'] += self._cleanup_by_count(db)
-        
-        # 3. Update kept counts
-        stats['liked_kept'] = db.query(Feedback).filter(
-            Feedback.rating == 'like'
-        ).count()
-        stats['disliked_kept'] = db.query(Feedback).filter(
-            Feedback.rating == 'dislike'
-        ).count()
-        
-        # 4. Log cleanup
-        self._log_cleanup(db, stats)
+        try:
+            # 1. Time-based cleanup
+            stats['deleted'] += self._cleanup_by_age(db)
+            
+            # 2. Count-based cleanup
+            stats['deleted'] += self._cleanup_by_count(db)
+            
+            # 3. Update kept counts
+            stats['liked_kept'] = db.query(Feedback).filter(
+                Feedback.rating == 'like'
+            ).count()
+            stats['disliked_kept'] = db.query(Feedback).filter(
+                Feedback.rating == 'dislike'
+            ).count()
+            
+            # 4. Take rated articles out of the preference profile while their
+            # vectors still exist, and log cleanup, in the same commit
+            with self.preference_profile.lock:
+                self.preference_profile.remove_articles(db, self._rated_ids)
+                self._log_cleanup(db, stats)
+        except Exception:
+            db.rollback()
+            raise
+        
+        # 5. Delete vectors only once the articles are gone for good
+        for article_id in self._deleted_ids:
+            self.embedder.delete_article_embedding(article_id)
         
         logger.info(
             f"Cleanup complete: {stats['deleted']} articles deleted, "
@@ -120,7 +137,7 @@ class ArticleCleanupManager:
             self._delete_article(db, article)
             deleted += 1
         
-        db.commit()
+        db.flush()
         return deleted
     
     def _cleanup_by_count(self, db: Session) -> int:
@@ -198,18 +215,19 @@ class ArticleCleanupManager:
             self._delete_article(db, article)
             deleted += 1
         
-        db.commit()
+        db.flush()
         return deleted
     
     def _delete_article(self, db: Session, article: Article):
-        """Delete article and its embeddings.
+        """Delete article; its embedding goes after the cleanup is committed.
         
         Args:
             db: Database session
             article: Article to delete
         """
-        # Delete from vector DB
-        self.embedder.delete_article_embedding(article.id)
+        self._deleted_ids.append(article.id)
+        if article.feedback:
+            self._rated_ids.append(article.id)
         
         # Delete from SQL (cascades to feedback and rankings)
         db.delete(article)
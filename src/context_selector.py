@@ -1,6 +1,6 @@
 """Smart selection of examples for LLM context."""
 import logging
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 from datetime import datetime
 import numpy as np
 from sklearn.cluster import KMeans
@@ -90,15 +90,14 @@ class LLMContextSelector:
         all_disliked: List[Article]
     ) -> Tuple[List[Article], List[Article]]:
         """Select examples most similar to new article."""
-        # Get or create embedding for new article
-        new_embedding = self.embedder.get_article_embedding(new_article.id)
-        if new_embedding is None:
-            new_embedding = self.embedder.embed_article(new_article)
+        new_embedding, embeddings = self._load_embeddings(
+            new_article, all_liked + all_disliked
+        )
         
         # Score liked articles
         liked_scores = []
         for article in all_liked:
-            embedding = self.embedder.get_article_embedding(article.id)
+            embedding = embeddings.get(article.id)
             if embedding is not None:
                 similarity = self._cosine_similarity(new_embedding, embedding)
                 liked_scores.append((article, similarity))
@@ -106,7 +105,7 @@ class LLMContextSelector:
         # Score disliked articles
         disliked_scores = []
         for article in all_disliked:
-            embedding = self.embedder.get_article_embedding(article.id)
+            embedding = embeddings.get(article.id)
             if embedding is not None:
                 similarity = self._cosine_similarity(new_embedding, embedding)
                 disliked_scores.append((article, similarity))
@@ -169,16 +168,16 @@ class LLMContextSelector:
         """Combine strategies with weighted scoring."""
         weights = self.config['strategies']
         
-        # Get embedding for new article
-        new_emb = self.embedder.get_article_embedding(new_article.id)
-        if new_emb is None:
-            new_emb = self.embedder.embed_article(new_article)
+        # Get embeddings for the new article and all examples
+        new_emb, embeddings = self._load_embeddings(
+            new_article, all_liked + all_disliked
+        )
         
         # Score liked articles
         liked_scores = {}
         for article in all_liked:
             score = self._calculate_hybrid_score(
-                article, new_emb, weights
+                article, new_emb, weights, embeddings.get(article.id)
             )
             liked_scores[article.id] = score
         
@@ -186,7 +185,7 @@ class LLMContextSelector:
         disliked_scores = {}
         for article in all_disliked:
             score = self._calculate_hybrid_score(
-                article, new_emb, weights
+                article, new_emb, weights, embeddings.get(article.id)
             )
             disliked_scores[article.id] = score
         
@@ -213,7 +212,8 @@ class LLMContextSelector:
         self,
         article: Article,
         new_embedding: np.ndarray,
-        weights: Dict
+        weights: Dict,
+        article_emb: Optional[np.ndarray]
     ) -> float:
         """Calculate hybrid score for article."""
         score = 0.0
@@ -226,7 +226,6 @@ class LLMContextSelector:
         
         # Similarity score
         if weights['similar']['enabled']:
-            article_emb = self.embedder.get_article_embedding(article.id)
             if article_emb is not None:
                 similarity = self._cosine_similarity(new_embedding, article_emb)
                 score += similarity * weights['similar']['weight']
@@ -244,14 +243,11 @@ class LLMContextSelector:
             return articles[:n_samples]
         
         # Get embeddings
-        embeddings = []
-        valid_articles = []
-        
-        for article in articles:
-            emb = self.embedder.get_article_embedding(article.id)
-            if emb is not None:
-                embeddings.append(emb)
-                valid_articles.append(article)
+        matrix, id_to_row, _ = self.embedder.get_article_embeddings(
+            [article.id for article in articles]
+        )
+        valid_articles = [article for article in articles if article.id in id_to_row]
+        embeddings = matrix[[id_to_row[article.id] for article in valid_articles]]
         
         if len(embeddings) <= n_samples:
             return valid_articles[:n_samples]
@@ -282,6 +278,27 @@ class LLMContextSelector:
         
         return selected[:n_samples]
     
+    def _load_embeddings(
+        self,
+        new_article: Article,
+        examples: List[Article]
+    ) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
+        """Fetch the new article's and all examples' embeddings in one call.
+        
+        Returns:
+            Tuple of (new article embedding, mapping of example ID to embedding)
+        """
+        matrix, id_to_row, _ = self.embedder.get_article_embeddings(
+            [new_article.id] + [article.id for article in examples]
+        )
+        embeddings = {article_id: matrix[row] for article_id, row in id_to_row.items()}
+        
+        new_embedding = embeddings.get(new_article.id)
+        if new_embedding is None:
+            new_embedding = self.embedder.embed_article(new_article)
+        
+        return new_embedding, embeddings
+    
     @staticmethod
     def _cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculate cosine similarity."""
@@ -2,7 +2,7 @@
 import os
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, ForeignKey, Boolean, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 import logging
@@ -32,6 +32,11 @@ class Article(Base):
     shown_to_user = Column(Boolean, default=False, index=True)
     shown_at = Column(DateTime)
     
+    # Near-duplicate grouping: SimHash signature (hex) and the ID of the
+    # story's representative article (NULL for representatives)
+    simhash = Column(String(16))
+    duplicate_of = Column(Integer, index=True)
+    
     # Relationships
     feedback = relationship("Feedback", back_populates="article", cascade="all, delete-orphan")
     rankings = relationship("LLMRanking", back_populates="article", cascade="all, delete-orphan")
@@ -71,6 +76,11 @@ class LLMRanking(Base):
     score = Column(Float, nullable=False)
     reasoning = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    prompt_version = Column(String(50))
+    feedback_fingerprint = Column(String(64))  # Feedback set used; NULL if not reusable
+    prompt_tokens = Column(Integer)  # Share of the request's tokens, if reported
+    completion_tokens = Column(Integer)
+    cost_usd = Column(Float)
     
     # Relationships
     article = relationship("Article", back_populates="rankings")
@@ -79,6 +89,23 @@ class LLMRanking(Base):
         return f"<LLMRanking(id={self.id}, score={self.score}, provider='{self.provider}')>"
 
 
+class LLMUsage(Base):
+    """Tokens and cost of one LLM request, whether or not it produced a ranking."""
+    
+    __tablename__ = 'llm_usage'
+    
+    id = Column(Integer, primary_key=True)
+    provider = Column(String(20))
+    model = Column(String(50))
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<LLMUsage(id={self.id}, model='{self.model}', cost_usd={self.cost_usd})>"
+
+
 class CleanupLog(Base):
     """Cleanup operation logs."""
     
@@ -95,6 +122,70 @@ class CleanupLog(Base):
         return f"<CleanupLog(date={self.cleanup_date}, deleted={self.articles_deleted})>"
 
 
+class FeedState(Base):
+    """Per-feed HTTP caching state for conditional fetching."""
+    
+    __tablename__ = 'feed_state'
+    
+    feed_url = Column(String(500), primary_key=True)
+    etag = Column(String(200))
+    last_modified = Column(String(100))
+    last_status = Column(Integer)
+    body_hash = Column(String(64))
+    last_success_at = Column(DateTime)
+    newest_entry_id = Column(String(500))
+    
+    # Adaptive polling
+    last_polled_at = Column(DateTime)
+    last_new_entry_at = Column(DateTime)
+    avg_interval_seconds = Column(Float)
+    next_poll_at = Column(DateTime, index=True)
+    
+    # Circuit breaker for failing feeds
+    consecutive_failures = Column(Integer, default=0)
+    last_error = Column(String(500))
+    last_failure_at = Column(DateTime)
+    next_attempt_at = Column(DateTime, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<FeedState(feed_url='{self.feed_url}', last_status={self.last_status})>"
+
+
+class PreferenceProfile(Base):
+    """Running sums of the user's liked or disliked article embeddings."""
+    
+    __tablename__ = 'preference_profiles'
+    
+    rating = Column(String(20), primary_key=True)  # 'like' or 'dislike'
+    count = Column(Integer, nullable=False, default=0)
+    # Sum of unit-normalised embeddings (float64 bytes)
+    vector_sum = Column(LargeBinary)
+    # Time-decayed sum and total weight, as of decayed_at
+    decayed_sum = Column(LargeBinary)
+    decayed_weight = Column(Float, default=0.0)
+    decayed_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<PreferenceProfile(rating='{self.rating}', count={self.count})>"
+
+
+class ProfileMember(Base):
+    """Rated article currently included in a preference profile."""
+    
+    __tablename__ = 'profile_members'
+    
+    # No foreign key: the row must outlive the article until it is
+    # subtracted from the profile
+    article_id = Column(Integer, primary_key=True)
+    rating = Column(String(20), nullable=False)
+    added_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<ProfileMember(article_id={self.article_id}, rating='{self.rating}')>"
+
+
 class Config(Base):
     """Application configuration storage."""
     
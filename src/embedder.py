@@ -1,9 +1,10 @@
 """Embedding generation and vector storage."""
 import os
+import time
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 import numpy as np
-from openai import OpenAI
+from openai import OpenAI, BadRequestError
 
 # Disable ChromaDB telemetry before import
 os.environ['ANONYMIZED_TELEMETRY'] = 'False'
@@ -11,6 +12,7 @@ os.environ['ANONYMIZED_TELEMETRY'] = 'False'
 import chromadb
 from chromadb.config import Settings
 from .database import Article
+from .embedding_cache import EmbeddingCache
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +20,13 @@ logger = logging.getLogger(__name__)
 class Embedder:
     """Handles embedding generation and vector storage."""
     
+    # Identifies how article text is built and truncated (see _article_text);
+    # change it whenever that changes so cached embeddings are not reused
+    ARTICLE_TEXT_POLICY = 'title+content[:2000]/30000'
+    
+    # Max IDs per ChromaDB get (bounded by SQLite's parameter limit)
+    GET_CHUNK = 5000
+    
     def __init__(self, config: dict):
         """Initialize embedder.
         
@@ -26,11 +35,25 @@ class Embedder:
         """
         self.config = config
         
-        # Initialize OpenAI client
-        api_key = os.getenv(config['embeddings']['api_key_env'])
-        self.client = OpenAI(api_key=api_key)
+        # Initialize OpenAI client (or its offline stand-in)
+        if config['embeddings'].get('provider') == 'fake':
+            from .fakes import HashEmbeddingClient
+            fake_config = config['embeddings'].get('fake', {})
+            self.client = HashEmbeddingClient(
+                fake_config.get('dimensions', 256),
+                fake_config.get('latency_seconds', 0.0)
+            )
+        else:
+            api_key = os.getenv(config['embeddings']['api_key_env'])
+            self.client = OpenAI(api_key=api_key)
         self.model = config['embeddings']['model']
         
+        # Request packing for batch embedding
+        self.max_batch_inputs = config['embeddings'].get('max_batch_inputs', 128)
+        self.max_batch_tokens = config['embeddings'].get('max_batch_tokens', 100000)
+        self.max_retries = config['embeddings'].get('max_retries', 2)
+        self.cache = EmbeddingCache(config)
+        
         # Initialize ChromaDB
         chroma_path = config.get('chromadb', {}).get('path', 'data/chromadb')
         os.makedirs(chroma_path, exist_ok=True)
@@ -63,10 +86,7 @@ class Embedder:
         Returns:
             Numpy array of embedding vector
         """
-        # Truncate text if too long (8191 tokens for text-embedding-3-small)
-        max_chars = 30000  # Approximate
-        if len(text) > max_chars:
-            text = text[:max_chars]
+        text = self._truncate(text)
         
         try:
             response = self.client.embeddings.create(
@@ -88,9 +108,144 @@ class Embedder:
         Returns:
             Numpy array of embedding vector
         """
-        # Combine title and content for embedding
-        text = f"{article.title}\n\n{article.content[:2000]}"
-        return self.embed_text(text)
+        cached = self._cached_embeddings([article])
+        if article.content_hash in cached:
+            return cached[article.content_hash]
+        
+        embedding = self.embed_text(self._article_text(article))
+        self._cache_embeddings([article], [embedding])
+        return embedding
+    
+    def embed_texts(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Generate embeddings for many texts with as few requests as possible.
+        
+        Texts are packed into requests of at most max_batch_inputs inputs
+        and roughly max_batch_tokens tokens. Failed requests are retried on
+        their own, and a rejected request is split so one bad input does
+        not fail its whole batch.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            Embedding per text in input order (None where embedding failed)
+        """
+        texts = [self._truncate(text) for text in texts]
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        
+        for indices in self._pack_batches(texts):
+            batch = self._embed_batch([texts[i] for i in indices])
+            for i, embedding in zip(indices, batch):
+                embeddings[i] = embedding
+        
+        return embeddings
+    
+    def embed_articles(self, articles: List[Article]) -> List[Optional[np.ndarray]]:
+        """Generate embeddings for many articles.
+        
+        Args:
+            articles: Article objects
+        
+        Returns:
+            Embedding per article in input order (None where embedding failed)
+        """
+        cached = self._cached_embeddings(articles)
+        misses = [article for article in articles if article.content_hash not in cached]
+        
+        if misses:
+            new_embeddings = self.embed_texts([self._article_text(a) for a in misses])
+            self._cache_embeddings(misses, new_embeddings)
+            cached.update(
+                (article.content_hash, embedding)
+                for article, embedding in zip(misses, new_embeddings)
+                if embedding is not None
+            )
+        
+        return [cached.get(article.content_hash) for article in articles]
+    
+    def _cached_embeddings(self, articles: List[Article]) -> Dict[str, np.ndarray]:
+        """Look up cached embeddings by content hash, never raising."""
+        hashes = [article.content_hash for article in articles if article.content_hash]
+        try:
+            return self.cache.get_many(hashes, self.model, self.ARTICLE_TEXT_POLICY)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return {}
+    
+    def _cache_embeddings(self, articles: List[Article], embeddings: List[Optional[np.ndarray]]):
+        """Store new embeddings in the cache, never raising."""
+        try:
+            self.cache.put_many({
+                article.content_hash: embedding
+                for article, embedding in zip(articles, embeddings)
+                if article.content_hash and embedding is not None
+            }, self.model, self.ARTICLE_TEXT_POLICY)
+        except Exception as e:
+            logger.warning(f"Embedding cache update failed: {e}")
+    
+    @staticmethod
+    def _article_text(article: Article) -> str:
+        """Combine title and content for embedding."""
+        return f"{article.title}\n\n{(article.content or '')[:2000]}"
+    
+    @staticmethod
+    def _truncate(text: str) -> str:
+        """Truncate text if too long (8191 tokens for text-embedding-3-small)."""
+        max_chars = 30000  # Approximate
+        return text[:max_chars] if len(text) > max_chars else text
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count (about 4 characters per token)."""
+        return len(text) // 4 + 1
+    
+    def _pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into requests within the input and token limits."""
+        batches = []
+        current, current_tokens = [], 0
+        
+        for i, text in enumerate(texts):
+            tokens = self._estimate_tokens(text)
+            if current and (
+                len(current) >= self.max_batch_inputs or
+                current_tokens + tokens > self.max_batch_tokens
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _embed_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Embed one request's worth of texts, retrying only this batch."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(
+                    input=texts,
+                    model=self.model
+                )
+                data = sorted(response.data, key=lambda item: item.index)
+                return [np.array(item.embedding) for item in data]
+            except BadRequestError as e:
+                if len(texts) == 1:
+                    logger.error(f"Error generating embedding: {e}")
+                    return [None]
+                # Split to isolate the input the API rejects
+                middle = len(texts) // 2
+                return self._embed_batch(texts[:middle]) + self._embed_batch(texts[middle:])
+            except Exception as e:
+                logger.warning(
+                    f"Embedding request for {len(texts)} inputs failed "
+                    f"(attempt {attempt + 1}/{self.max_retries + 1}): {e}"
+                )
+                if attempt < self.max_retries:
+                    time.sleep(2 ** attempt)
+        
+        logger.error(f"Error generating embeddings: giving up on {len(texts)} inputs")
+        return [None] * len(texts)
     
     def store_article_embedding(
         self, 
@@ -114,6 +269,8 @@ class Embedder:
             'title': article.title[:200],  # Truncate for storage
             'source': article.source or '',
             'url': article.url,
+            # Lets nearest-neighbour queries skip articles already shown
+            'shown': bool(article.shown_to_user),
             **metadata
         }
         
@@ -127,6 +284,43 @@ class Embedder:
         
         logger.debug(f"Stored embedding for article {article.id}")
     
+    def store_article_embeddings(
+        self,
+        articles: List[Article],
+        embeddings: List[Optional[np.ndarray]]
+    ) -> int:
+        """Store many article embeddings in one ChromaDB call.
+        
+        Args:
+            articles: Article objects
+            embeddings: Embedding per article (None entries are skipped)
+        
+        Returns:
+            Number of embeddings stored
+        """
+        pairs = [
+            (article, embedding) for article, embedding in zip(articles, embeddings)
+            if embedding is not None
+        ]
+        if not pairs:
+            return 0
+        
+        self.collection.add(
+            ids=[str(article.id) for article, _ in pairs],
+            embeddings=[embedding.tolist() for _, embedding in pairs],
+            metadatas=[{
+                'article_id': article.id,
+                'title': article.title[:200],
+                'source': article.source or '',
+                'url': article.url,
+                'shown': bool(article.shown_to_user)
+            } for article, _ in pairs],
+            documents=[article.summary or article.content[:500] for article, _ in pairs]
+        )
+        
+        logger.debug(f"Stored {len(pairs)} article embeddings")
+        return len(pairs)
+    
     def get_article_embedding(self, article_id: int) -> Optional[np.ndarray]:
         """Retrieve embedding for article.
         
@@ -150,6 +344,40 @@ class Embedder:
         
         return None
     
+    def get_article_embeddings(
+        self,
+        article_ids: List[int]
+    ) -> Tuple[np.ndarray, Dict[int, int], List[int]]:
+        """Retrieve embeddings for many articles at once.
+        
+        Args:
+            article_ids: Article IDs
+        
+        Returns:
+            Tuple of (float32 matrix with one row per found article,
+            mapping of article ID to row, IDs without an embedding)
+        """
+        unique_ids = list(dict.fromkeys(article_ids))
+        rows = []
+        id_to_row = {}
+        
+        try:
+            for start in range(0, len(unique_ids), self.GET_CHUNK):
+                result = self.collection.get(
+                    ids=[str(i) for i in unique_ids[start:start + self.GET_CHUNK]],
+                    include=['embeddings']
+                )
+                for article_id, embedding in zip(result['ids'], result['embeddings']):
+                    id_to_row[int(article_id)] = len(rows)
+                    rows.append(embedding)
+        except Exception as e:
+            logger.error(f"Error retrieving embeddings for {len(unique_ids)} articles: {e}")
+            return np.zeros((0, 0), dtype=np.float32), {}, unique_ids
+        
+        matrix = np.array(rows, dtype=np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+        missing = [article_id for article_id in unique_ids if article_id not in id_to_row]
+        return matrix, id_to_row, missing
+    
     def find_similar_articles(
         self, 
         embedding: np.ndarray,
@@ -189,6 +417,98 @@ class Embedder:
             logger.error(f"Error finding similar articles: {e}")
             return []
     
+    def find_unshown_neighbours(
+        self,
+        query_embeddings: np.ndarray,
+        n_results: int
+    ) -> Dict[int, np.ndarray]:
+        """Find the nearest unshown articles to several query vectors.
+        
+        Runs one HNSW query per row, restricted by metadata to embeddings
+        whose 'shown' flag is False. Errors propagate to the caller.
+        
+        Args:
+            query_embeddings: Matrix of query vectors (one per row)
+            n_results: Nearest articles to return per query
+        
+        Returns:
+            Dictionary mapping article ID to embedding for the union of results
+        """
+        count = self.collection.count()
+        if not count or not len(query_embeddings):
+            return {}
+        
+        results = self.collection.query(
+            query_embeddings=[np.asarray(query).tolist() for query in query_embeddings],
+            n_results=min(n_results, count),
+            where={'shown': False},
+            include=['embeddings']
+        )
+        
+        found = {}
+        for ids, embeddings in zip(results['ids'], results['embeddings']):
+            for article_id, embedding in zip(ids, embeddings):
+                found[int(article_id)] = np.array(embedding, dtype=np.float32)
+        return found
+    
+    def set_shown(self, article_ids: List[int], shown: bool = True) -> int:
+        """Set the 'shown' metadata flag of stored articles.
+        
+        Args:
+            article_ids: Article IDs
+            shown: Flag value
+        
+        Returns:
+            Number of articles updated
+        """
+        updated = 0
+        try:
+            for start in range(0, len(article_ids), self.GET_CHUNK):
+                chunk = article_ids[start:start + self.GET_CHUNK]
+                self.collection.update(
+                    ids=[str(i) for i in chunk],
+                    metadatas=[{'shown': shown}] * len(chunk)
+                )
+                updated += len(chunk)
+        except Exception as e:
+            logger.error(f"Error updating shown flag for {len(article_ids)} articles: {e}")
+        return updated
+    
+    def stored_article_ids(
+        self,
+        article_ids: Optional[List[int]] = None,
+        where: Optional[Dict] = None
+    ) -> Set[int]:
+        """IDs of articles with a stored embedding, without loading vectors.
+        
+        Args:
+            article_ids: IDs to check (default: every stored article)
+            where: Optional metadata filter
+        
+        Returns:
+            Set of stored article IDs
+        """
+        stored = set()
+        if article_ids is not None:
+            for start in range(0, len(article_ids), self.GET_CHUNK):
+                result = self.collection.get(
+                    ids=[str(i) for i in article_ids[start:start + self.GET_CHUNK]],
+                    where=where,
+                    include=[]
+                )
+                stored.update(int(i) for i in result['ids'])
+            return stored
+        
+        offset = 0
+        while True:
+            result = self.collection.get(
+                limit=self.GET_CHUNK, offset=offset, where=where, include=[]
+            )
+            stored.update(int(i) for i in result['ids'])
+            if len(result['ids']) < self.GET_CHUNK:
+                return stored
+            offset += self.GET_CHUNK
+    
     def update_article_metadata(self, article_id: int, metadata: Dict):
         """Update metadata for stored article.
         
@@ -0,0 +1,175 @@
+"""Persistent content-addressed embedding cache."""
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Caches embeddings on disk by (content hash, model, text policy).
+    
+    Vectors are stored as float32 blobs in a small SQLite file next to the
+    main database, so re-fetched articles and a wiped ChromaDB collection
+    do not cost new API calls. The least recently used entries are evicted
+    once the cache grows past max_entries.
+    """
+    
+    def __init__(self, config: dict):
+        """Initialize embedding cache.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        cache_config = config.get('embeddings', {}).get('cache', {})
+        self.enabled = cache_config.get('enabled', True)
+        self.path = cache_config.get('path', 'data/embedding_cache.db')
+        self.max_entries = cache_config.get('max_entries', 100000)
+        
+        self._conn: Optional[sqlite3.Connection] = None
+        # Shared by the embedding pipeline thread and the digest job
+        self._lock = threading.Lock()
+    
+    def get_many(self, content_hashes: List[str], model: str, policy: str) -> Dict[str, np.ndarray]:
+        """Look up cached embeddings.
+        
+        Args:
+            content_hashes: Article content hashes
+            model: Embedding model name
+            policy: Text preparation/truncation policy identifier
+        
+        Returns:
+            Dictionary mapping content hash to embedding for the hits
+        """
+        if not self.enabled or not content_hashes:
+            return {}
+        
+        keys = {self._key(h, model, policy): h for h in content_hashes}
+        found = {}
+        
+        with self._lock:
+            conn = self._connect()
+            key_list = list(keys)
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for key, vector in conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    chunk
+                ):
+                    found[keys[key]] = np.frombuffer(vector, dtype=np.float32)
+            
+            now = time.time()
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, self._key(h, model, policy)) for h in found]
+            )
+            self._increment(conn, 'hits', len(found))
+            self._increment(conn, 'misses', len(keys) - len(found))
+            conn.commit()
+        
+        return found
+    
+    def put_many(self, embeddings: Dict[str, np.ndarray], model: str, policy: str):
+        """Store embeddings, evicting the least recently used if over capacity.
+        
+        Args:
+            embeddings: Dictionary mapping content hash to embedding
+            model: Embedding model name
+            policy: Text preparation/truncation policy identifier
+        """
+        if not self.enabled or not embeddings:
+            return
+        
+        now = time.time()
+        rows = [
+            (self._key(h, model, policy),
+             np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for h, vector in embeddings.items()
+        ]
+        
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                rows
+            )
+            
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                self._increment(conn, 'evictions', count - self.max_entries)
+            conn.commit()
+    
+    def stats(self) -> dict:
+        """Get cache size and hit/miss counters.
+        
+        Returns:
+            Dictionary with 'entries', 'hits', 'misses', 'evictions',
+            'hit_rate' and 'size_mb'
+        """
+        stats = {'entries': 0, 'hits': 0, 'misses': 0, 'evictions': 0,
+                 'hit_rate': 0.0, 'size_mb': 0.0}
+        if not os.path.exists(self.path):
+            return stats
+        
+        with self._lock:
+            conn = self._connect()
+            stats['entries'] = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            stats.update(conn.execute("SELECT name, value FROM counters").fetchall())
+        
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['size_mb'] = os.path.getsize(self.path) / (1024 * 1024)
+        return stats
+    
+    def close(self):
+        """Close the cache file."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    @staticmethod
+    def _key(content_hash: str, model: str, policy: str) -> str:
+        """Build the cache key for an article text."""
+        return f"{model}|{policy}|{content_hash}"
+    
+    @staticmethod
+    def _increment(conn: sqlite3.Connection, name: str, amount: int):
+        """Add to a persisted counter."""
+        if amount:
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the cache file on first use."""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_embeddings_last_used ON embeddings(last_used);
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            """)
+        return self._conn
@@ -0,0 +1,192 @@
+"""Background embedding of newly fetched articles."""
+import logging
+import queue
+import threading
+from typing import List, Optional
+from .database import DatabaseManager, Article
+from .embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingPipeline:
+    """Embeds new articles in a background thread as they are fetched.
+    
+    The fetcher submits IDs of committed articles to a bounded queue and a
+    single worker drains it in batches, so by digest time pending articles
+    already have vectors in ChromaDB. Anything dropped or failed here is
+    still embedded lazily by the ranker.
+    """
+    
+    def __init__(self, config: dict, db_manager: DatabaseManager, embedder: Embedder):
+        """Initialize embedding pipeline.
+        
+        Args:
+            config: Application configuration dictionary
+            db_manager: Database manager for the worker's own sessions
+            embedder: Embedder instance
+        """
+        pipeline_config = config.get('embeddings', {}).get('pipeline', {})
+        self.enabled = pipeline_config.get('enabled', True)
+        self.batch_size = pipeline_config.get('batch_size', 32)
+        # How long to wait for a batch to fill up before embedding it
+        self.max_wait_seconds = pipeline_config.get('max_wait_seconds', 2.0)
+        self.backfill_on_start = pipeline_config.get('backfill_on_start', True)
+        
+        self.db_manager = db_manager
+        self.embedder = embedder
+        self.queue: queue.Queue = queue.Queue(maxsize=pipeline_config.get('queue_size', 5000))
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.embedded_count = 0
+    
+    @property
+    def running(self) -> bool:
+        """Whether the worker thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start the background worker."""
+        if not self.enabled or self.running:
+            return
+        
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='embedding-pipeline', daemon=True
+        )
+        self._thread.start()
+        logger.info("Embedding pipeline started")
+    
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker after the batch it is working on."""
+        if not self.running:
+            return
+        
+        self._stopping.set()
+        self._thread.join(timeout)
+        logger.info(f"Embedding pipeline stopped ({self.queue.qsize()} articles left queued)")
+    
+    def submit(self, article_ids: List[int]) -> int:
+        """Queue committed articles for embedding.
+        
+        Never blocks: when the queue is full the remaining articles are
+        left for the ranker to embed on demand.
+        
+        Args:
+            article_ids: IDs of newly saved articles
+        
+        Returns:
+            Number of articles queued
+        """
+        if not self.running:
+            return 0
+        
+        queued = 0
+        for article_id in article_ids:
+            try:
+                self.queue.put_nowait(article_id)
+                queued += 1
+            except queue.Full:
+                logger.warning(
+                    f"Embedding queue full, {len(article_ids) - queued} articles "
+                    f"will be embedded at digest time"
+                )
+                break
+        
+        return queued
+    
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been processed.
+        
+        Args:
+            timeout: Max seconds to wait, or None to wait indefinitely
+        
+        Returns:
+            True if the queue drained in time
+        """
+        finished = threading.Event()
+        
+        def join():
+            self.queue.join()
+            finished.set()
+        
+        threading.Thread(target=join, daemon=True).start()
+        return finished.wait(timeout)
+    
+    def _run(self):
+        """Worker loop."""
+        if self.backfill_on_start:
+            self._backfill()
+        
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self._embed_batch(batch)
+            except Exception as e:
+                logger.error(f"Error in embedding pipeline: {e}", exc_info=True)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+    
+    def _next_batch(self) -> List[int]:
+        """Collect up to batch_size IDs, waiting at most max_wait_seconds."""
+        try:
+            batch = [self.queue.get(timeout=self.max_wait_seconds)]
+        except queue.Empty:
+            return []
+        
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=self.max_wait_seconds))
+            except queue.Empty:
+                break
+        
+        return batch
+    
+    def _backfill(self):
+        """Embed pending articles that were fetched before the worker ran."""
+        db = self.db_manager.get_session()
+        try:
+            pending_ids = [
+                article_id for (article_id,) in db.query(Article.id).filter(
+                    Article.shown_to_user == False,
+                    Article.duplicate_of == None
+                )
+            ]
+        finally:
+            db.close()
+        
+        for start in range(0, len(pending_ids), self.batch_size):
+            if self._stopping.is_set():
+                return
+            try:
+                self._embed_batch(pending_ids[start:start + self.batch_size])
+            except Exception as e:
+                logger.error(f"Error backfilling embeddings: {e}", exc_info=True)
+    
+    def _embed_batch(self, article_ids: List[int]):
+        """Embed and store the articles that have no vector yet."""
+        existing = set(self.embedder.collection.get(
+            ids=[str(article_id) for article_id in article_ids],
+            include=[]
+        )['ids'])
+        missing = [article_id for article_id in article_ids if str(article_id) not in existing]
+        if not missing:
+            return
+        
+        db = self.db_manager.get_session()
+        try:
+            articles = db.query(Article).filter(
+                Article.id.in_(missing),
+                Article.duplicate_of == None
+            ).all()
+            
+            embeddings = self.embedder.embed_articles(articles)
+            stored = self.embedder.store_article_embeddings(articles, embeddings)
+            self.embedded_count += stored
+            
+            logger.debug(f"Embedded {stored}/{len(articles)} articles in the background")
+        finally:
+            db.close()
@@ -0,0 +1,145 @@
+"""Offline stand-ins for the OpenAI, Anthropic and Telegram APIs.
+
+Selected with embeddings.provider: "fake" and llm.provider: "fake" (or
+passed in directly) so the pipeline can run and be benchmarked without
+network access or API keys. Every stand-in counts the calls it answers.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from types import SimpleNamespace
+from typing import List, Optional
+import numpy as np
+
+
+def _stable_hash(text: str) -> int:
+    """Process-independent hash of a string."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'little')
+
+
+class HashEmbeddingClient:
+    """Deterministic embeddings in place of the OpenAI client.
+    
+    Each word is hashed to a signed bucket of the vector, so texts sharing
+    vocabulary get similar vectors and similarity filtering behaves much
+    like it does with real embeddings.
+    """
+    
+    def __init__(self, dimensions: int = 256, latency_seconds: float = 0.0):
+        """Initialize fake embedding client.
+        
+        Args:
+            dimensions: Vector size
+            latency_seconds: Simulated delay per request
+        """
+        self.dimensions = dimensions
+        self.latency = latency_seconds
+        self.requests = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+        self.embeddings = SimpleNamespace(create=self.create)
+    
+    def create(self, input, model: str):
+        """Answer like openai.embeddings.create."""
+        texts = [input] if isinstance(input, str) else list(input)
+        with self._lock:
+            self.requests += 1
+            self.inputs += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=self.vector(text).tolist())
+            for i, text in enumerate(texts)
+        ])
+    
+    def vector(self, text: str) -> np.ndarray:
+        """Unit-length bag-of-words vector for a text."""
+        vector = np.zeros(self.dimensions)
+        for word in re.findall(r'\w+', text.lower()):
+            bucket = _stable_hash(word)
+            vector[bucket % self.dimensions] += 1.0 if bucket & (1 << 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[_stable_hash(text) % self.dimensions] = 1.0
+            return vector
+        return vector / norm
+
+
+class FakeChatClient:
+    """Scores ranking prompts deterministically in place of an LLM client.
+    
+    Answers chat.completions.create like the OpenAI SDK, in the format the
+    prompt asks for (SCORE/REASONING or a JSON array). Scores depend only
+    on the article title.
+    """
+    
+    ARTICLE_PATTERN = re.compile(r'^(?:ID: (\d+)\n)?Title: (.*)$', re.MULTILINE)
+    
+    def __init__(self, latency_seconds: float = 0.0, latency_jitter: float = 0.0, seed: int = 0):
+        """Initialize fake chat client.
+        
+        Args:
+            latency_seconds: Simulated delay per request
+            latency_jitter: Extra random delay of up to this many seconds
+            seed: Seed for the jitter
+        """
+        self.latency = latency_seconds
+        self.jitter = latency_jitter
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._random = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+    
+    def create(self, model: str, messages: List[dict], max_tokens: Optional[int] = None, **kwargs):
+        """Answer like openai.chat.completions.create."""
+        prompt = messages[-1]['content']
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        
+        section = prompt.split('TO RATE:', 1)[-1]
+        articles = self.ARTICLE_PATTERN.findall(section)
+        if '"score"' in prompt:
+            content = json.dumps([
+                {"id": int(article_id), "score": self.score(title), "reasoning": f"Fake: {title[:30]}"}
+                for article_id, title in articles
+            ])
+        else:
+            title = articles[0][1] if articles else prompt
+            content = f"SCORE: {self.score(title)}\nREASONING: Fake: {title[:30]}"
+        
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4 + 1, completion_tokens=len(content) // 4 + 1)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += usage.prompt_tokens
+            self.completion_tokens += usage.completion_tokens
+        
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage
+        )
+    
+    @staticmethod
+    def score(title: str) -> float:
+        """Deterministic 0-10 score for an article title."""
+        return round(zlib.crc32(title.encode()) % 101 / 10, 1)
+
+
+class FakeTelegramSender:
+    """Records messages, with a perf_counter timestamp, in place of telegram.Bot."""
+    
+    def __init__(self):
+        """Initialize fake sender."""
+        self.messages = []
+    
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        """Record a message like telegram.Bot.send_message."""
+        self.messages.append({'chat_id': chat_id, 'text': text, 'sent_at': time.perf_counter(), **kwargs})
+        return SimpleNamespace(message_id=len(self.messages), chat_id=chat_id, text=text)
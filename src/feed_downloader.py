@@ -0,0 +1,120 @@
+"""Concurrent feed downloading."""
+import asyncio
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+import httpx
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "RSS-AI-Curator/1.0"
+
+
+class FeedDownloader:
+    """Downloads many feeds concurrently with global and per-host limits."""
+    
+    def __init__(self, config: dict):
+        """Initialize feed downloader.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        fetch_config = config.get('fetching', {})
+        self.max_concurrency = fetch_config.get('max_concurrency', 20)
+        self.per_host_concurrency = fetch_config.get('per_host_concurrency', 2)
+        self.timeout = fetch_config.get('timeout_seconds', 20)
+        self.connect_timeout = fetch_config.get('connect_timeout_seconds', 10)
+    
+    def download_all(
+        self,
+        urls: List[str],
+        request_headers: Optional[Dict[str, dict]] = None
+    ) -> Dict[str, dict]:
+        """Download all URLs concurrently.
+        
+        Safe to call from synchronous code, including code that is itself
+        running inside an event loop (e.g. a Telegram command handler).
+        
+        Args:
+            urls: Feed URLs to download
+            request_headers: Optional extra headers per URL (e.g. conditional
+                request headers)
+        
+        Returns:
+            Dictionary mapping URL to a response dictionary with keys
+            'status', 'content', 'headers' and 'error'
+        """
+        if not urls:
+            return {}
+        
+        coro = self._download_all(urls, request_headers or {})
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        
+        # A loop is already running in this thread - use a private one
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+    
+    async def _download_all(
+        self,
+        urls: List[str],
+        request_headers: Dict[str, dict]
+    ) -> Dict[str, dict]:
+        """Download URLs using one pooled async client."""
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host_concurrency)
+        )
+        
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        limits = httpx.Limits(max_connections=self.max_concurrency)
+        
+        async with httpx.AsyncClient(
+            timeout=timeout,
+            limits=limits,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT}
+        ) as client:
+            results = await asyncio.gather(*(
+                self._download_one(
+                    client, url, request_headers.get(url, {}),
+                    global_limit, host_limits[urlparse(url).netloc]
+                )
+                for url in urls
+            ))
+        
+        return dict(zip(urls, results))
+    
+    async def _download_one(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        headers: dict,
+        global_limit: asyncio.Semaphore,
+        host_limit: asyncio.Semaphore
+    ) -> dict:
+        """Download a single URL, never raising."""
+        async with host_limit, global_limit:
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code != 304:
+                    response.raise_for_status()
+                return {
+                    'status': response.status_code,
+                    'content': response.content,
+                    'headers': dict(response.headers),
+                    'error': None
+                }
+            except Exception as e:
+                logger.debug(f"Download failed for {url}: {e}")
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                return {
+                    'status': status,
+                    'content': None,
+                    'headers': {},
+                    'error': str(e) or e.__class__.__name__
+                }
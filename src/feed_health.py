@@ -0,0 +1,99 @@
+"""Per-feed circuit breaker for failing sources."""
+import logging
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy.orm import Session
+from .database import FeedState
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCircuitBreaker:
+    """Backs off exponentially from feeds that keep failing."""
+    
+    def __init__(self, config: dict):
+        """Initialize circuit breaker.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        breaker_config = config.get('fetching', {}).get('circuit_breaker', {})
+        self.enabled = breaker_config.get('enabled', True)
+        # Failures tolerated before the feed is skipped at all
+        self.failure_threshold = breaker_config.get('failure_threshold', 2)
+        self.base_backoff = timedelta(minutes=breaker_config.get('base_backoff_minutes', 30))
+        self.max_backoff = timedelta(hours=breaker_config.get('max_backoff_hours', 24))
+    
+    def allows(self, state: FeedState, now: datetime) -> bool:
+        """Check whether a feed may be fetched now.
+        
+        Args:
+            state: Feed state
+            now: Current time
+        
+        Returns:
+            False while the feed's backoff window is open
+        """
+        if not self.enabled or state.next_attempt_at is None:
+            return True
+        return state.next_attempt_at <= now
+    
+    def record_success(self, state: FeedState):
+        """Close the circuit after a successful fetch."""
+        if state.consecutive_failures:
+            logger.info(
+                f"Feed {state.feed_url} recovered after "
+                f"{state.consecutive_failures} failures"
+            )
+        state.consecutive_failures = 0
+        state.last_error = None
+        state.next_attempt_at = None
+    
+    def record_failure(self, state: FeedState, error: str, now: datetime):
+        """Count a failure and open the circuit once past the threshold.
+        
+        Args:
+            state: Feed state to update
+            error: Error message
+            now: Time of the failed fetch
+        """
+        state.consecutive_failures = (state.consecutive_failures or 0) + 1
+        state.last_error = error[:500]
+        state.last_failure_at = now
+        
+        if not self.enabled or state.consecutive_failures < self.failure_threshold:
+            return
+        
+        backoff = self.backoff(state.consecutive_failures)
+        state.next_attempt_at = now + backoff
+        logger.warning(
+            f"Feed {state.feed_url} failed {state.consecutive_failures} times in a row, "
+            f"skipping it for {backoff}"
+        )
+    
+    def backoff(self, failures: int) -> timedelta:
+        """Get the backoff after a number of consecutive failures.
+        
+        Args:
+            failures: Consecutive failures so far
+        
+        Returns:
+            Time to skip the feed for
+        """
+        exponent = min(max(0, failures - self.failure_threshold), 20)
+        return min(self.max_backoff, self.base_backoff * (2 ** exponent))
+    
+    @staticmethod
+    def open_circuits(db: Session, now: datetime) -> List[FeedState]:
+        """Get feeds that are currently being skipped.
+        
+        Args:
+            db: Database session
+            now: Current time
+        
+        Returns:
+            Feed states with an open circuit, soonest retry first
+        """
+        return db.query(FeedState).filter(
+            FeedState.next_attempt_at > now
+        ).order_by(FeedState.next_attempt_at).all()
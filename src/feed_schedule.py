@@ -0,0 +1,110 @@
+"""Adaptive per-feed polling schedule."""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from .database import FeedState
+
+logger = logging.getLogger(__name__)
+
+
+class FeedSchedulePolicy:
+    """Computes when each feed should be polled next from its publish rate."""
+    
+    def __init__(self, config: dict):
+        """Initialize schedule policy.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        scheduling = config.get('scheduling', {})
+        adaptive = scheduling.get('adaptive_polling', {})
+        default_hours = scheduling.get('fetch_interval_hours', 1)
+        
+        self.min_interval = timedelta(minutes=adaptive.get('min_interval_minutes', 15))
+        self.max_interval = timedelta(hours=adaptive.get('max_interval_hours', 24))
+        self.default_interval = timedelta(hours=default_hours)
+        # Fraction of the mean inter-arrival time to wait between polls
+        self.poll_factor = adaptive.get('poll_factor', 0.5)
+        # Weight of the newest observation in the moving average
+        self.smoothing = adaptive.get('smoothing', 0.3)
+    
+    def is_due(self, state: FeedState, now: datetime) -> bool:
+        """Check whether a feed should be polled now.
+        
+        Args:
+            state: Feed state
+            now: Current time
+        
+        Returns:
+            True if the feed is due (or has never been scheduled)
+        """
+        return state.next_poll_at is None or state.next_poll_at <= now
+    
+    def record_poll(
+        self,
+        state: FeedState,
+        new_count: int,
+        now: datetime,
+        published_times: Optional[List[datetime]] = None
+    ):
+        """Update the inter-arrival estimate and schedule the next poll.
+        
+        Args:
+            state: Feed state to update
+            new_count: Number of new entries found by this poll
+            now: Time of the poll
+            published_times: Publish times of the entries in the feed, used
+                to bootstrap the estimate on the first poll
+        """
+        avg = state.avg_interval_seconds
+        
+        if avg is None:
+            avg = self._bootstrap_interval(published_times or [])
+        elif state.last_new_entry_at is not None:
+            elapsed = (now - state.last_new_entry_at).total_seconds()
+            if new_count > 0:
+                observed = elapsed / new_count
+                avg = self.smoothing * observed + (1 - self.smoothing) * avg
+            elif elapsed > avg:
+                # Silence only counts once it is longer than expected
+                avg = self.smoothing * elapsed + (1 - self.smoothing) * avg
+        
+        if new_count > 0 or state.last_new_entry_at is None:
+            state.last_new_entry_at = now
+        
+        state.avg_interval_seconds = avg
+        state.last_polled_at = now
+        state.next_poll_at = now + self.poll_interval(state)
+    
+    def reschedule_after_failure(self, state: FeedState, now: datetime):
+        """Keep the usual cadence for a feed whose poll failed.
+        
+        Args:
+            state: Feed state to update
+            now: Time of the failed poll
+        """
+        state.next_poll_at = now + self.poll_interval(state)
+    
+    def poll_interval(self, state: FeedState) -> timedelta:
+        """Get the polling interval for a feed, within configured bounds.
+        
+        Args:
+            state: Feed state
+        
+        Returns:
+            Time to wait until the next poll
+        """
+        if state.avg_interval_seconds is None:
+            interval = self.default_interval
+        else:
+            interval = timedelta(seconds=state.avg_interval_seconds * self.poll_factor)
+        
+        return max(self.min_interval, min(self.max_interval, interval))
+    
+    def _bootstrap_interval(self, published_times: List[datetime]) -> float:
+        """Estimate the mean inter-arrival time from a feed's entries."""
+        times = sorted(t for t in published_times if t is not None)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return self.default_interval.total_seconds() / self.poll_factor
+        
+        return (times[-1] - times[0]).total_seconds() / (len(times) - 1)
@@ -2,11 +2,16 @@
 import hashlib
 import logging
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 import feedparser
-from bs4 import BeautifulSoup
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from .database import Article
+from .database import Article, FeedState
+from .feed_downloader import FeedDownloader
+from .html_cleaner import HTMLCleaner, clean_html
+from .feed_schedule import FeedSchedulePolicy
+from .feed_health import FeedCircuitBreaker
+from .near_duplicates import NearDuplicateDetector
 
 logger = logging.getLogger(__name__)
 
@@ -14,21 +19,36 @@ logger = logging.getLogger(__name__)
 class RSSFetcher:
     """Fetches and parses RSS feeds."""
     
-    def __init__(self, config: dict):
+    # Max bound parameters per IN (...) query
+    IN_CLAUSE_CHUNK = 500
+    
+    def __init__(self, config: dict, embedding_pipeline=None):
         """Initialize RSS fetcher.
         
         Args:
             config: Application configuration dictionary
+            embedding_pipeline: Optional EmbeddingPipeline notified of new
+                articles once they are committed
         """
         self.config = config
         self.feeds = config.get('rss_feeds', [])
+        self.async_enabled = config.get('fetching', {}).get('async_enabled', True)
+        self.incremental = config.get('fetching', {}).get('incremental', True)
+        self.downloader = FeedDownloader(config)
+        self.cleaner = HTMLCleaner(config)
+        self.schedule = FeedSchedulePolicy(config)
+        self.circuit_breaker = FeedCircuitBreaker(config)
+        self.near_duplicates = NearDuplicateDetector(config)
+        self.embedding_pipeline = embedding_pipeline
+        self._unpublished_ids: List[int] = []
         logger.info(f"RSS Fetcher initialized with {len(self.feeds)} feeds")
     
-    def fetch_all(self, db: Session) -> int:
+    def fetch_all(self, db: Session, due_only: bool = False) -> int:
         """Fetch articles from all configured RSS feeds.
         
         Args:
             db: Database session
+            due_only: Only fetch feeds whose adaptive next-poll time has passed
             
         Returns:
             Number of new articles added
@@ -36,10 +56,47 @@ class RSSFetcher:
         logger.info("Starting RSS fetch for all feeds...")
         total_new = 0
         
-        for feed_config in self.feeds:
+        now = datetime.utcnow()
+        self.near_duplicates.reset()
+        states = self._load_feed_states(
+            db, [feed_config['url'] for feed_config in self.feeds]
+        )
+        
+        feeds = self.feeds
+        if due_only:
+            feeds = [
+                feed_config for feed_config in self.feeds
+                if self.schedule.is_due(states[feed_config['url']], now)
+            ]
+            logger.info(f"{len(feeds)}/{len(self.feeds)} feeds due for polling")
+        
+        # Skip feeds that keep failing until their backoff window ends
+        allowed = [
+            feed_config for feed_config in feeds
+            if self.circuit_breaker.allows(states[feed_config['url']], now)
+        ]
+        if len(allowed) < len(feeds):
+            logger.info(f"Skipping {len(feeds) - len(allowed)} feeds with an open circuit")
+        feeds = allowed
+        
+        urls = [feed_config['url'] for feed_config in feeds]
+        
+        # Download all feeds concurrently; parsing and saving stay serial
+        # because the database session is not thread-safe
+        downloads = {}
+        if self.async_enabled:
+            downloads = self.downloader.download_all(urls, {
+                url: self._conditional_headers(states[url]) for url in urls
+            })
+        
+        for feed_config in feeds:
             try:
-                new_count = self._fetch_feed(db, feed_config)
+                new_count = self._fetch_feed(
+                    db, feed_config, downloads.get(feed_config['url']),
+                    states[feed_config['url']]
+                )
                 total_new += new_count
+                self.circuit_breaker.record_success(states[feed_config['url']])
                 logger.info(
                     f"Feed '{feed_config['name']}': {new_count} new articles"
                 )
@@ -47,48 +104,178 @@ class RSSFetcher:
                 logger.error(
                     f"Error fetching feed '{feed_config['name']}': {e}"
                 )
+                self.schedule.reschedule_after_failure(
+                    states[feed_config['url']], now
+                )
+                self.circuit_breaker.record_failure(
+                    states[feed_config['url']], str(e) or e.__class__.__name__, now
+                )
         
-        db.commit()
+        self.commit_and_publish(db)
         logger.info(f"RSS fetch complete: {total_new} new articles total")
         return total_new
     
-    def _fetch_feed(self, db: Session, feed_config: dict) -> int:
+    def _fetch_feed(
+        self,
+        db: Session,
+        feed_config: dict,
+        download: Optional[dict] = None,
+        state: Optional[FeedState] = None
+    ) -> int:
         """Fetch articles from a single RSS feed.
         
+        Unchanged feeds (HTTP 304 or identical body) are skipped without
+        parsing.
+        
         Args:
             db: Database session
             feed_config: Feed configuration with 'url' and 'name'
+            download: Pre-downloaded response from FeedDownloader, or None
+                to download the feed synchronously
+            state: Conditional fetch state for the feed, if tracked
             
         Returns:
             Number of new articles added
         """
         url = feed_config['url']
         source_name = feed_config['name']
+        if state is None:
+            state = FeedState(feed_url=url)
         
         # Parse RSS feed
-        feed = feedparser.parse(url)
+        body_hash = None
+        if download is None:
+            feed = feedparser.parse(
+                url, etag=state.etag, modified=state.last_modified
+            )
+            status = feed.get('status')
+            if status is None and feed.bozo:
+                # feedparser reports network errors instead of raising
+                raise RuntimeError(str(feed.bozo_exception))
+            etag = feed.get('etag')
+            last_modified = feed.get('modified')
+        elif download['error']:
+            state.last_status = download['status']
+            raise RuntimeError(download['error'])
+        else:
+            status = download['status']
+            etag = download['headers'].get('etag')
+            last_modified = download['headers'].get('last-modified')
+            
+            if status != 304:
+                body_hash = hashlib.sha256(download['content']).hexdigest()
+                if body_hash == state.body_hash:
+                    status = 304
+        
+        if status == 304:
+            logger.debug(f"Feed '{source_name}' not modified, skipping")
+            state.last_status = status
+            state.last_success_at = datetime.utcnow()
+            self.schedule.record_poll(state, 0, datetime.utcnow())
+            return 0
+        
+        if download is not None:
+            feed = feedparser.parse(
+                download['content'],
+                response_headers={'content-location': url, **download['headers']}
+            )
         
         if feed.bozo:
             logger.warning(
                 f"Feed '{source_name}' has parsing issues: {feed.bozo_exception}"
             )
         
-        new_articles = 0
+        entries = feed.entries
+        if self.incremental:
+            entries = self._unseen_entries(entries, state.newest_entry_id)
+            if len(entries) < len(feed.entries):
+                logger.debug(
+                    f"Feed '{source_name}': {len(entries)}/{len(feed.entries)} "
+                    f"entries newer than last seen"
+                )
+        
+        # Clean all entry bodies in one batch (optionally in a process pool)
+        contents = self.cleaner.clean_many(
+            [self._extract_content(entry) for entry in entries]
+        )
         
-        for entry in feed.entries:
-            article_data = self._parse_entry(entry, source_name)
-            
-            if article_data and self._save_article(db, article_data):
-                new_articles += 1
+        articles = [
+            article_data for article_data in (
+                self._parse_entry(entry, source_name, content)
+                for entry, content in zip(entries, contents)
+            )
+            if article_data
+        ]
+        new_articles = len(self._save_articles(db, articles))
+        
+        # Remember validators only after the entries were saved (a failed
+        # save raises above), so a failed run is retried in full next time
+        state.etag = etag or state.etag
+        state.last_modified = last_modified or state.last_modified
+        state.body_hash = body_hash
+        state.last_status = status
+        if feed.entries:
+            state.newest_entry_id = self._entry_key(feed.entries[0])
+        state.last_success_at = datetime.utcnow()
+        self.schedule.record_poll(
+            state, new_articles, datetime.utcnow(),
+            [a['published_at'] for a in articles]
+        )
         
         return new_articles
     
-    def _parse_entry(self, entry, source_name: str) -> Optional[Dict]:
+    def _load_feed_states(self, db: Session, urls: List[str]) -> Dict[str, FeedState]:
+        """Load conditional fetch state for feeds, creating missing rows.
+        
+        Args:
+            db: Database session
+            urls: Feed URLs
+        
+        Returns:
+            Dictionary mapping feed URL to FeedState
+        """
+        states = {
+            state.feed_url: state
+            for state in db.query(FeedState).filter(FeedState.feed_url.in_(urls))
+        }
+        
+        for url in urls:
+            if url not in states:
+                states[url] = FeedState(feed_url=url)
+                db.add(states[url])
+        
+        return states
+    
+    @staticmethod
+    def _conditional_headers(state: FeedState) -> dict:
+        """Build conditional request headers from feed state.
+        
+        Args:
+            state: Feed state
+        
+        Returns:
+            Dictionary of HTTP headers
+        """
+        headers = {}
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+        return headers
+    
+    def _parse_entry(
+        self,
+        entry,
+        source_name: str,
+        content: Optional[str] = None
+    ) -> Optional[Dict]:
         """Parse a single RSS entry.
         
         Args:
             entry: Feedparser entry object
             source_name: Name of the source feed
+            content: Already cleaned entry content, or None to extract
+                and clean it here
             
         Returns:
             Dictionary with article data or None if invalid
@@ -101,17 +288,9 @@ class RSSFetcher:
         # Extract title
         title = entry.get('title', 'Untitled')
         
-        # Extract content
-        content = ''
-        if hasattr(entry, 'content'):
-            content = entry.content[0].value
-        elif hasattr(entry, 'summary'):
-            content = entry.summary
-        elif hasattr(entry, 'description'):
-            content = entry.description
-        
-        # Clean HTML from content
-        content = self._clean_html(content)
+        # Extract content and clean HTML from it
+        if content is None:
+            content = self._clean_html(self._extract_content(entry))
         
         # Extract summary (first 500 chars of content)
         summary = content[:500] + '...' if len(content) > 500 else content
@@ -143,33 +322,73 @@ class RSSFetcher:
             'content_hash': content_hash
         }
     
-    def _clean_html(self, html_content: str) -> str:
-        """Remove HTML tags and clean text.
+    @staticmethod
+    def _entry_key(entry) -> Optional[str]:
+        """Get a stable identifier for an RSS entry (GUID, else link)."""
+        return entry.get('id') or entry.get('link')
+    
+    def _unseen_entries(self, entries: list, newest_seen: Optional[str]) -> list:
+        """Return the entries before the newest already-ingested one.
+        
+        Feeds list entries newest first, so everything from the last seen
+        entry onwards was processed by an earlier fetch. Feeds whose dates
+        show a different order are processed in full.
         
         Args:
-            html_content: Raw HTML content
-            
+            entries: Feedparser entries
+            newest_seen: Key of the newest entry seen on the previous fetch
+        
         Returns:
-            Cleaned text
+            Entries that still need processing
         """
-        if not html_content:
-            return ''
+        if not newest_seen or not self._is_newest_first(entries):
+            return entries
         
-        soup = BeautifulSoup(html_content, 'lxml')
+        for i, entry in enumerate(entries):
+            if self._entry_key(entry) == newest_seen:
+                return entries[:i]
         
-        # Remove script and style elements
-        for script in soup(['script', 'style']):
-            script.decompose()
+        return entries
+    
+    @staticmethod
+    def _is_newest_first(entries: list) -> bool:
+        """Check that entry dates (where present) never increase."""
+        previous_date = None
+        for entry in entries:
+            date = entry.get('published_parsed') or entry.get('updated_parsed')
+            if date and previous_date and date > previous_date:
+                return False
+            previous_date = date or previous_date
+        return True
+    
+    @staticmethod
+    def _extract_content(entry) -> str:
+        """Extract raw (HTML) content from an RSS entry.
         
-        # Get text
-        text = soup.get_text()
+        Args:
+            entry: Feedparser entry object
         
-        # Clean up whitespace
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+        Returns:
+            Raw content, or empty string
+        """
+        if hasattr(entry, 'content'):
+            return entry.content[0].value
+        elif hasattr(entry, 'summary'):
+            return entry.summary
+        elif hasattr(entry, 'description'):
+            return entry.description
+        return ''
+    
+    def _clean_html(self, html_content: str) -> str:
+        """Remove HTML tags and clean text.
         
-        return text
+        Args:
+            html_content: Raw HTML content
+            
+        Returns:
+            Cleaned text
+        """
+        return clean_html(html_content)
     
     @staticmethod
     def _hash_content(url: str, title: str, content: str) -> str:
@@ -196,27 +415,136 @@ class RSSFetcher:
         Returns:
             True if new article saved, False if duplicate
         """
-        # Check if article already exists (by URL or content hash)
-        existing = db.query(Article).filter(
-            (Article.url == article_data['url']) |
-            (Article.content_hash == article_data['content_hash'])
-        ).first()
+        return len(self._save_articles(db, [article_data])) == 1
+    
+    def _save_articles(self, db: Session, articles: List[dict]) -> List[int]:
+        """Bulk-save articles that don't exist yet.
+        
+        Known URLs and content hashes are loaded with one set-based query
+        each (so both indexes are used), and the remaining rows go in with
+        a single INSERT OR IGNORE.
+        
+        Args:
+            db: Database session
+            articles: Article data dictionaries
+        
+        Returns:
+            IDs of newly inserted articles
         
-        if existing:
-            return False
+        Raises:
+            Exception: If the insert fails; only this batch is rolled back
+        """
+        if not articles:
+            return []
+        
+        known_urls = self._existing_values(
+            db, Article.url, [a['url'] for a in articles]
+        )
+        known_hashes = self._existing_values(
+            db, Article.content_hash, [a['content_hash'] for a in articles]
+        )
+        
+        # Skip known articles and duplicates within the batch itself
+        fresh = []
+        for article_data in articles:
+            if (article_data['url'] in known_urls or
+                    article_data['content_hash'] in known_hashes):
+                continue
+            known_urls.add(article_data['url'])
+            known_hashes.add(article_data['content_hash'])
+            fresh.append({
+                **article_data,
+                'simhash': (
+                    self.near_duplicates.signature_for(article_data)
+                    if self.near_duplicates.enabled else None
+                )
+            })
         
-        # Create new article
-        article = Article(**article_data)
-        db.add(article)
+        if not fresh:
+            return []
         
         try:
-            db.flush()  # Get the ID without committing
-            logger.debug(f"New article saved: {article.title[:50]}...")
-            return True
+            # A savepoint keeps rows saved earlier in this session (other feeds)
+            with db.begin_nested():
+                db.execute(insert(Article).prefix_with('OR IGNORE'), fresh)
         except Exception as e:
-            logger.error(f"Error saving article: {e}")
+            logger.error(f"Error saving {len(fresh)} articles: {e}")
+            raise
+        
+        id_by_url = {}
+        fresh_urls = [a['url'] for a in fresh]
+        for start in range(0, len(fresh_urls), self.IN_CLAUSE_CHUNK):
+            chunk = fresh_urls[start:start + self.IN_CLAUSE_CHUNK]
+            id_by_url.update(
+                (url, article_id) for article_id, url in
+                db.query(Article.id, Article.url).filter(Article.url.in_(chunk))
+            )
+        
+        new_articles = [
+            (id_by_url[a['url']], a['simhash']) for a in fresh if a['url'] in id_by_url
+        ]
+        new_ids = [article_id for article_id, _ in new_articles]
+        
+        # Group near-duplicate stories so only one of them gets ranked
+        self.near_duplicates.assign_clusters(db, new_articles)
+        self._unpublished_ids.extend(new_ids)
+        
+        logger.debug(f"Saved {len(new_ids)} new articles")
+        return new_ids
+    
+    def _existing_values(self, db: Session, column, values: List[str]) -> Set[str]:
+        """Return the subset of values already stored in a unique column.
+        
+        Args:
+            db: Database session
+            column: Article column to check (url or content_hash)
+            values: Candidate values
+        
+        Returns:
+            Set of values that already exist
+        """
+        existing = set()
+        values = list(set(values))
+        for start in range(0, len(values), self.IN_CLAUSE_CHUNK):
+            chunk = values[start:start + self.IN_CLAUSE_CHUNK]
+            existing.update(
+                value for (value,) in db.query(column).filter(column.in_(chunk))
+            )
+        return existing
+    
+    def commit_and_publish(self, db: Session):
+        """Commit the session, then publish the articles it saved.
+        
+        If the commit fails the session is rolled back and the saved IDs are
+        dropped, since SQLite may reuse them for other articles.
+        
+        Args:
+            db: Database session
+        
+        Raises:
+            Exception: Whatever the commit raised
+        """
+        try:
+            db.commit()
+        except Exception:
             db.rollback()
-            return False
+            self.discard_unpublished_articles()
+            raise
+        self.publish_new_articles()
+    
+    def publish_new_articles(self):
+        """Hand articles saved since the last commit to the embedding pipeline.
+        
+        Must be called after the session is committed, since the pipeline
+        reads the articles with its own session.
+        """
+        new_ids, self._unpublished_ids = self._unpublished_ids, []
+        if self.embedding_pipeline is not None and new_ids:
+            self.embedding_pipeline.submit(new_ids)
+    
+    def discard_unpublished_articles(self):
+        """Forget articles saved since the last commit after a rollback."""
+        self._unpublished_ids = []
     
     def fetch_single_url(self, db: Session, url: str, source_name: str = "Manual") -> Optional[Article]:
         """Fetch and save a single article from URL.
@@ -231,16 +559,14 @@ class RSSFetcher:
         """
         try:
             import requests
-            from readability import Document
+            from .url_ingester import extract_article
             
             # Fetch page
             response = requests.get(url, timeout=10)
             response.raise_for_status()
             
             # Extract content
-            doc = Document(response.text)
-            title = doc.title()
-            content = self._clean_html(doc.summary())
+            title, content = extract_article(response.content)
             
             article_data = {
                 'url': url,
@@ -253,7 +579,7 @@ class RSSFetcher:
             }
             
             if self._save_article(db, article_data):
-                db.commit()
+                self.commit_and_publish(db)
                 return db.query(Article).filter(
                     Article.url == url
                 ).first()
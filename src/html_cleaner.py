@@ -0,0 +1,179 @@
+"""HTML-to-text cleaning for article content."""
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+import lxml.html
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Markup the lxml fast path cannot reproduce exactly like BeautifulSoup:
+# script/style (removed by the full cleaner), ruby text and parentheses
+# (rt/rp, left out by get_text), elements whose text lxml and
+# BeautifulSoup treat differently, document-level tags, comments,
+# doctypes, processing instructions and stray '<' characters
+_SLOW_PATH_MARKUP = re.compile(
+    r'<\s*/?\s*(?:script|style|template|html|head|body|title|frameset|'
+    r'noscript|noembed|noframes|plaintext|xmp|textarea|iframe|rt|rp)\b'
+    r'|<(?![A-Za-z/])|</(?![A-Za-z])',
+    re.IGNORECASE
+)
+
+# Input lxml and BeautifulSoup recover from differently: a trailing
+# unfinished entity or tag, malformed numeric references and control
+# characters
+_UNSAFE_TEXT = re.compile(
+    r'&[#A-Za-z0-9]*\s*$|<[^>]*$'
+    r'|&#(?![0-9]{1,6};|[xX][0-9A-Fa-f]{1,5};)|&#0+;|&#[xX]0+;'
+    r'|[\x00-\x08\x0b\x0e-\x1f\x7f]'
+)
+
+# Whitespace as defined by BeautifulSoup when collapsing empty strings
+_ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def clean_html(html_content: str) -> str:
+    """Remove HTML tags and clean text.
+    
+    Uses lxml text extraction directly when the markup is simple enough
+    for the result to be identical to the BeautifulSoup cleaner, which
+    keeps content hashes stable.
+    
+    Args:
+        html_content: Raw HTML content
+    
+    Returns:
+        Cleaned text
+    """
+    if not html_content:
+        return ''
+    
+    text = None
+    if _fast_path_safe(html_content):
+        try:
+            text = _lxml_text(html_content)
+        except Exception:
+            text = None
+    
+    if text is None:
+        text = _soup_text(html_content)
+    
+    return _normalize_whitespace(text)
+
+
+def _fast_path_safe(html_content: str) -> bool:
+    """Check whether markup can skip the BeautifulSoup tree."""
+    stripped = html_content.lstrip()
+    return (
+        bool(stripped)
+        and not stripped.startswith('</')
+        and not _SLOW_PATH_MARKUP.search(html_content)
+        and not _UNSAFE_TEXT.search(html_content)
+    )
+
+
+def _soup_text(html_content: str) -> str:
+    """Extract text with BeautifulSoup, dropping script and style."""
+    soup = BeautifulSoup(html_content, 'lxml')
+    
+    # Remove script and style elements
+    for script in soup(['script', 'style']):
+        script.decompose()
+    
+    return soup.get_text()
+
+
+def _lxml_text(html_content: str) -> str:
+    """Extract text from an lxml tree the way BeautifulSoup would."""
+    root = lxml.html.document_fromstring(html_content)
+    parts = []
+    _collect_text(root, parts, False)
+    return ''.join(parts)
+
+
+def _collect_text(element, parts: List[str], preserve: bool):
+    """Append the text of an element and its descendants in order."""
+    preserve = preserve or element.tag == 'pre'
+    
+    if element.text:
+        parts.append(_soup_string(element.text, preserve))
+    
+    for child in element:
+        _collect_text(child, parts, preserve)
+        if child.tail:
+            parts.append(_soup_string(child.tail, preserve))
+
+
+def _soup_string(text: str, preserve: bool) -> str:
+    """Collapse whitespace-only strings like BeautifulSoup does."""
+    if preserve or text.strip(_ASCII_SPACES):
+        return text
+    return '\n' if '\n' in text else ' '
+
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse line breaks and runs of spaces into single spaces."""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+class HTMLCleaner:
+    """Cleans batches of HTML, optionally in a process pool."""
+    
+    def __init__(self, config: dict):
+        """Initialize HTML cleaner.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        fetch_config = config.get('fetching', {})
+        self.workers = fetch_config.get('html_workers', 0)
+        self.min_batch_for_pool = fetch_config.get('html_pool_min_batch', 20)
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def clean(self, html_content: str) -> str:
+        """Clean a single HTML string in-process."""
+        return clean_html(html_content)
+    
+    def clean_many(self, contents: List[str]) -> List[str]:
+        """Clean many HTML strings, preserving order.
+        
+        Small batches are cleaned in-process since the pool round trip
+        would cost more than it saves.
+        
+        Args:
+            contents: Raw HTML strings
+        
+        Returns:
+            Cleaned texts in the same order
+        """
+        if self.workers <= 1 or len(contents) < self.min_batch_for_pool:
+            return [clean_html(content) for content in contents]
+        
+        try:
+            chunksize = max(1, len(contents) // (self.workers * 4))
+            return list(self._get_pool().map(clean_html, contents, chunksize=chunksize))
+        except Exception as e:
+            logger.warning(f"HTML cleaning pool failed, cleaning in-process: {e}")
+            self.shutdown()
+            return [clean_html(content) for content in contents]
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the process pool on first use."""
+        if self._pool is None:
+            # spawn, not fork: the app runs scheduler and bot threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            logger.info(f"HTML cleaning pool started with {self.workers} workers")
+        return self._pool
+    
+    def shutdown(self):
+        """Stop the process pool, if running."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,239 @@
+"""Token and cost ceilings for LLM ranking."""
+import threading
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .database import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Usage:
+    """Tokens used by one LLM request (or the share of it for one article)."""
+    
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    # Provider and model that answered (they differ from the primary after failover)
+    provider: Optional[str] = None
+    model: Optional[str] = None
+    
+    def split(self, parts: int) -> 'Usage':
+        """Share of this usage for one of several articles."""
+        return Usage(
+            self.prompt_tokens // parts,
+            self.completion_tokens // parts,
+            self.cost / parts,
+            self.provider,
+            self.model
+        )
+
+
+class BudgetExceeded(Exception):
+    """Raised instead of sending a request the budget cannot cover."""
+
+
+class LLMBudget:
+    """Enforces per-run and per-day token and cost ceilings.
+    
+    Each request reserves its estimated cost up front, so concurrent calls
+    cannot overshoot; the reservation is replaced by the actual usage the
+    provider reports, which is also stored in LLMUsage, one row per request
+    (including failed hedges, unparseable answers and test calls). Today's
+    usage is read back from there at the start of every run. A limit of
+    None or 0 disables that ceiling.
+    """
+    
+    def __init__(self, config: dict):
+        """Initialize budget.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        budget_config = config['llm'].get('budget', {})
+        self.enabled = budget_config.get('enabled', True)
+        self.limits = {
+            'run_tokens': budget_config.get('max_tokens_per_run'),
+            'day_tokens': budget_config.get('max_tokens_per_day'),
+            'run_cost': budget_config.get('max_cost_per_run'),
+            'day_cost': budget_config.get('max_cost_per_day')
+        }
+        # USD per million tokens: {model: {input: x, output: y}}
+        self.pricing = budget_config.get('pricing', {})
+        
+        self.run_tokens = 0
+        self.run_cost = 0.0
+        self.day_tokens = 0
+        self.day_cost = 0.0
+        self.day = None
+        self.exhausted = False
+        self._lock = threading.Lock()
+        # Engine usage rows are written to; set by attach()
+        self._engine = None
+    
+    def attach(self, db: Session):
+        """Store recorded usage in the database a session is bound to.
+        
+        Args:
+            db: Database session
+        """
+        self._engine = db.get_bind()
+    
+    def start_run(self, db: Session):
+        """Reset the run counters, load today's usage and attach to the database.
+        
+        Args:
+            db: Database session
+        """
+        self.attach(db)
+        tokens, cost = self._usage_since(db, self._midnight())
+        with self._lock:
+            self.run_tokens = 0
+            self.run_cost = 0.0
+            self.day_tokens = tokens
+            self.day_cost = cost
+            self.day = datetime.utcnow().date()
+            self.exhausted = False
+    
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """Price of a request in USD (0 for models without pricing)."""
+        price = self.pricing.get(model, {})
+        return (
+            prompt_tokens * price.get('input', 0.0)
+            + completion_tokens * price.get('output', 0.0)
+        ) / 1_000_000
+    
+    def reserve(self, model: str, prompt_tokens: int, max_completion_tokens: int) -> Usage:
+        """Reserve the worst-case usage of a request.
+        
+        Args:
+            model: Model the request goes to
+            prompt_tokens: Estimated prompt tokens
+            max_completion_tokens: Completion token limit of the request
+        
+        Returns:
+            The reservation, to be passed to record()
+        
+        Raises:
+            BudgetExceeded: If the request would break a ceiling
+        """
+        estimate = Usage(
+            prompt_tokens, max_completion_tokens,
+            self.cost(model, prompt_tokens, max_completion_tokens)
+        )
+        if not self.enabled:
+            return estimate
+        
+        with self._lock:
+            self._roll_day()
+            tokens = estimate.prompt_tokens + estimate.completion_tokens
+            totals = {
+                'run_tokens': self.run_tokens + tokens,
+                'day_tokens': self.day_tokens + tokens,
+                'run_cost': self.run_cost + estimate.cost,
+                'day_cost': self.day_cost + estimate.cost
+            }
+            broken = [name for name, total in totals.items()
+                      if self.limits[name] and total > self.limits[name]]
+            if broken:
+                if not self.exhausted:
+                    logger.warning(f"LLM budget exhausted ({', '.join(broken)})")
+                self.exhausted = True
+                raise BudgetExceeded(', '.join(broken))
+            
+            self._add(estimate, 1)
+        return estimate
+    
+    def record(self, reservation: Usage, usage: Optional[Usage]):
+        """Replace a reservation with the usage the provider reported and store it.
+        
+        Args:
+            reservation: Value returned by reserve()
+            usage: Actual usage, or None if the request failed without any
+        """
+        if usage is not None:
+            self._store(usage)
+        if not self.enabled:
+            return
+        with self._lock:
+            self._add(reservation, -1)
+            if usage is not None:
+                self._add(usage, 1)
+    
+    def status(self, db: Optional[Session] = None) -> Dict:
+        """Get today's usage and what is left of the daily ceilings.
+        
+        Args:
+            db: Database session to read today's usage from (otherwise the
+                counters of the current run are used)
+        
+        Returns:
+            Dictionary with 'day_tokens', 'day_cost', 'tokens_left' and
+            'cost_left' (None where there is no ceiling)
+        """
+        if db is not None:
+            tokens, cost = self._usage_since(db, self._midnight())
+        else:
+            tokens, cost = self.day_tokens, self.day_cost
+        
+        day_tokens, day_cost = self.limits['day_tokens'], self.limits['day_cost']
+        return {
+            'day_tokens': tokens,
+            'day_cost': cost,
+            'tokens_left': max(0, day_tokens - tokens) if day_tokens else None,
+            'cost_left': max(0.0, day_cost - cost) if day_cost else None
+        }
+    
+    def _add(self, usage: Usage, sign: int):
+        """Add (or with sign -1 remove) usage from the counters."""
+        tokens = usage.prompt_tokens + usage.completion_tokens
+        self.run_tokens += sign * tokens
+        self.day_tokens += sign * tokens
+        self.run_cost += sign * usage.cost
+        self.day_cost += sign * usage.cost
+    
+    def _store(self, usage: Usage):
+        """Write one request's usage in its own session (errors are logged, not raised).
+        
+        Runs on the request's worker thread, so it cannot use the caller's session.
+        """
+        if self._engine is None:
+            return
+        try:
+            with Session(self._engine) as db:
+                db.add(LLMUsage(
+                    provider=usage.provider,
+                    model=usage.model,
+                    prompt_tokens=usage.prompt_tokens,
+                    completion_tokens=usage.completion_tokens,
+                    cost_usd=usage.cost
+                ))
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Could not store LLM usage: {e}")
+    
+    def _roll_day(self):
+        """Start a new day's counters after midnight (UTC)."""
+        today = datetime.utcnow().date()
+        if self.day != today:
+            self.day = today
+            self.day_tokens = self.run_tokens
+            self.day_cost = self.run_cost
+    
+    @staticmethod
+    def _midnight() -> datetime:
+        """Start of the current UTC day."""
+        return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    @staticmethod
+    def _usage_since(db: Session, since: datetime):
+        """Sum tokens and cost of the requests stored since a time."""
+        tokens, cost = db.query(
+            func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens),
+            func.sum(LLMUsage.cost_usd)
+        ).filter(LLMUsage.created_at >= since).one()
+        return int(tokens or 0), float(cost or 0.0)
@@ -0,0 +1,174 @@
+"""LLM provider access for article ranking."""
+import os
+import threading
+import time
+import logging
+from dataclasses import dataclass
+from typing import Optional
+from openai import OpenAI
+from anthropic import Anthropic
+from .rate_limiter import RateLimiter
+from .llm_budget import LLMBudget, Usage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    """Reply text and the usage the provider reported for it."""
+    
+    text: str
+    usage: Optional[Usage] = None
+    # Seconds from sending the request to the reply (rate-limit waits excluded)
+    latency: Optional[float] = None
+
+
+class RequestCancelled(Exception):
+    """Raised instead of sending a request its caller has given up on."""
+
+
+class LLMClient:
+    """Sends prompts to the configured LLM provider within its rate limits."""
+    
+    def __init__(
+        self,
+        config: dict,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        budget: Optional[LLMBudget] = None
+    ):
+        """Initialize LLM client.
+        
+        Args:
+            config: Application configuration dictionary
+            provider: Provider to use instead of llm.provider
+            model: Model to use instead of the provider's configured one
+            budget: Budget every request is charged to
+        """
+        self.provider = provider or config['llm']['provider']
+        
+        # With the resilience layer enabled, it retries; the SDKs only time out
+        resilience_config = config['llm'].get('resilience', {})
+        sdk_options = {}
+        if resilience_config.get('enabled', True):
+            sdk_options = {
+                'timeout': resilience_config.get('timeout_seconds', 30),
+                'max_retries': 0
+            }
+        
+        if self.provider == 'chatgpt':
+            api_key = os.getenv(config['llm']['chatgpt']['api_key_env'])
+            self.openai_client = OpenAI(api_key=api_key, **sdk_options)
+        elif self.provider == 'claude':
+            api_key = os.getenv(config['llm']['claude']['api_key_env'])
+            self.anthropic_client = Anthropic(api_key=api_key, **sdk_options)
+        elif self.provider == 'fake':
+            # Offline stand-in answering like the OpenAI SDK
+            from .fakes import FakeChatClient
+            fake_config = config['llm']['fake']
+            self.openai_client = FakeChatClient(
+                fake_config.get('latency_seconds', 0.0),
+                fake_config.get('latency_jitter', 0.0)
+            )
+        else:
+            raise ValueError(f"Unknown LLM provider: {self.provider}")
+        
+        provider_config = config['llm'][self.provider]
+        self.model = model or provider_config['model']
+        self.temperature = provider_config.get('temperature', 0.7)
+        self.max_tokens = provider_config.get('max_tokens', 500)
+        self.rate_limiter = RateLimiter.shared(
+            self.provider,
+            self.model,
+            provider_config.get('requests_per_minute'),
+            provider_config.get('tokens_per_minute')
+        )
+        self.budget = budget
+    
+    def complete(
+        self,
+        prompt: str,
+        max_tokens: Optional[int] = None,
+        cancel: Optional[threading.Event] = None
+    ) -> LLMResponse:
+        """Get the model's reply to a prompt.
+        
+        Blocks while the provider's rate limit is exhausted.
+        
+        Args:
+            prompt: Prompt text
+            max_tokens: Completion token limit (defaults to the configured one)
+            cancel: Event set by a caller that no longer wants the reply; the
+                request is not sent if it is set by the time the rate limit allows
+        
+        Returns:
+            Response text, usage and latency
+        
+        Raises:
+            BudgetExceeded: If the budget cannot cover the request
+            RequestCancelled: If cancel was set before the request was sent
+        """
+        max_tokens = max_tokens or self.max_tokens
+        reservation = None
+        if self.budget is not None:
+            reservation = self.budget.reserve(self.model, len(prompt) // 4 + 1, max_tokens)
+        
+        response = None
+        try:
+            self.rate_limiter.acquire(self.estimate_tokens(prompt, max_tokens))
+            if cancel is not None and cancel.is_set():
+                raise RequestCancelled(f"{self.provider} request cancelled before sending")
+            
+            sent = time.monotonic()
+            if self.provider == 'claude':
+                response = self._complete_claude(prompt, max_tokens)
+            else:
+                response = self._complete_chatgpt(prompt, max_tokens)
+            response.latency = time.monotonic() - sent
+            return response
+        finally:
+            if reservation is not None:
+                self.budget.record(reservation, response.usage if response else None)
+    
+    @staticmethod
+    def estimate_tokens(prompt: str, max_tokens: int) -> int:
+        """Rough token cost of a request (prompt plus max completion)."""
+        return len(prompt) // 4 + 1 + max_tokens
+    
+    def _usage(self, prompt_tokens: int, completion_tokens: int) -> Usage:
+        """Build usage (with cost, if priced) from reported token counts."""
+        cost = self.budget.cost(self.model, prompt_tokens, completion_tokens) if self.budget else 0.0
+        return Usage(prompt_tokens, completion_tokens, cost, self.provider, self.model)
+    
+    def _complete_chatgpt(self, prompt: str, max_tokens: int) -> LLMResponse:
+        """Query ChatGPT."""
+        response = self.openai_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "You are a personalized news curator."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=self.temperature,
+            max_tokens=max_tokens
+        )
+        
+        usage = None
+        if response.usage is not None:
+            usage = self._usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return LLMResponse(response.choices[0].message.content, usage)
+    
+    def _complete_claude(self, prompt: str, max_tokens: int) -> LLMResponse:
+        """Query Claude."""
+        response = self.anthropic_client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        
+        usage = None
+        if response.usage is not None:
+            usage = self._usage(response.usage.input_tokens, response.usage.output_tokens)
+        return LLMResponse(response.content[0].text, usage)
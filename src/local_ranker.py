@@ -0,0 +1,212 @@
+"""Local relevance model trained on user feedback."""
+import os
+import zlib
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sqlalchemy.orm import Session
+from .database import Article, Feedback
+from .embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class LocalRanker:
+    """Logistic regression over article embeddings and source.
+    
+    Trained on Feedback (like = 1, dislike = 0), updated with partial_fit
+    as new ratings arrive and saved to disk. Scoring is a single matrix
+    product, so it can rank thousands of articles without API calls.
+    """
+    
+    # Sources are one-hot encoded into this many hashed buckets
+    SOURCE_BUCKETS = 64
+    # Bump when the feature layout changes; older model files are ignored
+    FEATURE_VERSION = 1
+    # Provider/model recorded with rankings made by this model
+    PROVIDER = 'local'
+    MODEL = f'sgd-logistic-v{FEATURE_VERSION}'
+    
+    def __init__(self, config: dict, embedder: Embedder):
+        """Initialize local ranker and load a saved model if present.
+        
+        Args:
+            config: Application configuration dictionary
+            embedder: Embedder used to look up article vectors
+        """
+        local_config = config.get('local_ranker', {})
+        self.enabled = local_config.get('enabled', True)
+        self.path = local_config.get('model_path', 'data/local_ranker.joblib')
+        # Ratings (of both kinds) needed before the first training
+        self.min_feedback = local_config.get('min_feedback', 10)
+        # Pick LLM candidates by predicted like probability instead of similarity
+        self.prerank = local_config.get('prerank', False)
+        self.min_probability = local_config.get('min_probability', 0.2)
+        self.embedder = embedder
+        
+        self.model: Optional[SGDClassifier] = None
+        self.trained_until: Optional[datetime] = None
+        self.samples = 0
+        self._load()
+    
+    @property
+    def ready(self) -> bool:
+        """Whether a trained model is available."""
+        return self.enabled and self.model is not None
+    
+    def refresh(self, db: Session) -> int:
+        """Learn from ratings given since the last update.
+        
+        Trains from scratch when there is no model yet (or the embedding
+        size changed), otherwise updates the model incrementally.
+        
+        Args:
+            db: Database session
+        
+        Returns:
+            Number of ratings learned from
+        """
+        if not self.enabled:
+            return 0
+        
+        query = db.query(Feedback.article_id, Feedback.rating, Feedback.created_at)
+        if self.model is not None and self.trained_until is not None:
+            query = query.filter(Feedback.created_at > self.trained_until)
+        rows = query.all()
+        if not rows:
+            return 0
+        
+        features, labels = self._training_data(db, rows)
+        if (self.model is not None and len(labels)
+                and features.shape[1] != self.model.n_features_in_):
+            logger.info("Embedding size changed - retraining local ranker from scratch")
+            self.model = None
+            return self.refresh(db)
+        
+        if self.model is None:
+            if len(labels) < self.min_feedback or len(set(labels)) < 2:
+                return 0
+            self.model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=0)
+            self.model.fit(features, labels, sample_weight=self._balanced_weights(labels))
+            self.samples = len(labels)
+        elif len(labels):
+            self.model.partial_fit(features, labels)
+            self.samples += len(labels)
+        
+        self.trained_until = max(
+            (row.created_at for row in rows if row.created_at is not None),
+            default=self.trained_until
+        )
+        self._save()
+        
+        logger.info(f"Local ranker learned from {len(labels)} ratings ({self.samples} total)")
+        return len(labels)
+    
+    def score(self, articles: List[Article], matrix: np.ndarray) -> Optional[np.ndarray]:
+        """Predict how likely the user is to like each article.
+        
+        Args:
+            articles: Articles, one per matrix row
+            matrix: Article embeddings
+        
+        Returns:
+            Like probability per article, or None if no model is trained
+        """
+        if not self.ready or not len(articles):
+            return None
+        features = self._features(matrix, [article.source for article in articles])
+        return self.model.predict_proba(features)[:, 1]
+    
+    def rank(self, articles: List[Article]) -> List[Tuple[Article, float, str]]:
+        """Rank articles on the LLM's 0-10 scale with the local model.
+        
+        Args:
+            articles: Articles to rank
+        
+        Returns:
+            List of (article, score, reasoning) for articles with embeddings
+        """
+        matrix, id_to_row, _ = self.embedder.get_article_embeddings(
+            [article.id for article in articles]
+        )
+        embedded = [article for article in articles if article.id in id_to_row]
+        probabilities = self.score(embedded, matrix[[id_to_row[a.id] for a in embedded]])
+        if probabilities is None:
+            return []
+        
+        return [
+            (article, round(float(p) * 10, 1), f"Local model: {p:.0%} chance you like this")
+            for article, p in zip(embedded, probabilities)
+        ]
+    
+    def _training_data(self, db: Session, rows: list) -> Tuple[np.ndarray, np.ndarray]:
+        """Build features and labels for rated articles with embeddings."""
+        ratings = {row.article_id: row.rating for row in rows}
+        matrix, id_to_row, _ = self.embedder.get_article_embeddings(list(ratings))
+        article_ids = [article_id for article_id in ratings if article_id in id_to_row]
+        if not article_ids:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=int)
+        
+        sources = dict(
+            db.query(Article.id, Article.source).filter(Article.id.in_(article_ids))
+        )
+        features = self._features(
+            matrix[[id_to_row[article_id] for article_id in article_ids]],
+            [sources.get(article_id, '') for article_id in article_ids]
+        )
+        labels = np.array(
+            [1 if ratings[article_id] == 'like' else 0 for article_id in article_ids],
+            dtype=int
+        )
+        return features, labels
+    
+    def _features(self, matrix: np.ndarray, sources: List[str]) -> np.ndarray:
+        """Unit-length embeddings followed by a hashed one-hot source."""
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(len(sources), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        
+        source_features = np.zeros((len(sources), self.SOURCE_BUCKETS), dtype=np.float32)
+        for row, source in enumerate(sources):
+            source_features[row, zlib.crc32((source or '').encode()) % self.SOURCE_BUCKETS] = 1.0
+        
+        return np.hstack([matrix / norms, source_features])
+    
+    @staticmethod
+    def _balanced_weights(labels: np.ndarray) -> np.ndarray:
+        """Weight samples so likes and dislikes count equally."""
+        counts = np.bincount(labels, minlength=2)
+        return len(labels) / (2.0 * counts[labels])
+    
+    def _load(self):
+        """Load the saved model, if any."""
+        if not self.enabled or not os.path.exists(self.path):
+            return
+        try:
+            state = joblib.load(self.path)
+            if state.get('feature_version') != self.FEATURE_VERSION:
+                logger.info("Saved local ranker uses old features - will retrain")
+                return
+            self.model = state['model']
+            self.trained_until = state['trained_until']
+            self.samples = state['samples']
+            logger.info(f"Loaded local ranker trained on {self.samples} ratings")
+        except Exception as e:
+            logger.warning(f"Could not load local ranker from {self.path}: {e}")
+    
+    def _save(self):
+        """Write the model to disk atomically."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        joblib.dump({
+            'feature_version': self.FEATURE_VERSION,
+            'model': self.model,
+            'trained_until': self.trained_until,
+            'samples': self.samples
+        }, temp_path)
+        os.replace(temp_path, self.path)
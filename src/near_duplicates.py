@@ -0,0 +1,187 @@
+"""Near-duplicate story detection with SimHash."""
+import hashlib
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from .database import Article
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BITS = 64
+# Leading text is enough to recognise the same wire story
+MAX_TEXT_CHARS = 4000
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """Compute a 64-bit SimHash over word shingles.
+    
+    Args:
+        text: Text to fingerprint
+        shingle_size: Number of words per shingle
+    
+    Returns:
+        64-bit signature as an unsigned integer
+    """
+    words = _WORD.findall(text[:MAX_TEXT_CHARS].lower())
+    if not words:
+        return 0
+    
+    shingles = [
+        ' '.join(words[i:i + shingle_size])
+        for i in range(max(1, len(words) - shingle_size + 1))
+    ]
+    digests = b''.join(
+        hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+        for shingle in shingles
+    )
+    
+    # One row of 64 bits per shingle; each bit votes +1 / -1
+    bits = np.unpackbits(
+        np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8),
+        axis=1,
+        bitorder='little'
+    )
+    weights = bits.sum(axis=0, dtype=np.int64) * 2 - len(shingles)
+    
+    signature = 0
+    for bit in np.flatnonzero(weights > 0):
+        signature |= 1 << int(bit)
+    return signature
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Count differing bits between two signatures."""
+    return bin(a ^ b).count('1')
+
+
+def to_hex(signature: int) -> str:
+    """Encode a signature for storage."""
+    return f"{signature:016x}"
+
+
+class SimHashIndex:
+    """In-memory banded index for finding signatures within a distance."""
+    
+    def __init__(self, max_distance: int = 6):
+        """Initialize index.
+        
+        Signatures are split into max_distance + 1 bands, so two signatures
+        within max_distance bits always agree exactly on at least one band
+        (pigeonhole) and only same-band candidates need comparing.
+        
+        Args:
+            max_distance: Max Hamming distance to consider a near duplicate
+        """
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        edges = [round(i * SIGNATURE_BITS / bands) for i in range(bands + 1)]
+        self._bands = [
+            (start, (1 << (end - start)) - 1)
+            for start, end in zip(edges, edges[1:])
+        ]
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, int]]] = defaultdict(list)
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def add(self, article_id: int, signature: int):
+        """Add a signature to the index."""
+        for band, key in self._band_keys(signature):
+            self._buckets[(band, key)].append((article_id, signature))
+        self._size += 1
+    
+    def find(self, signature: int) -> Optional[int]:
+        """Find the closest indexed article within max_distance.
+        
+        Returns:
+            Article ID of the closest match, or None
+        """
+        best_id, best_distance = None, self.max_distance + 1
+        for band, key in self._band_keys(signature):
+            for article_id, other in self._buckets.get((band, key), ()):
+                distance = hamming_distance(signature, other)
+                if distance < best_distance:
+                    best_id, best_distance = article_id, distance
+        return best_id
+    
+    def _band_keys(self, signature: int):
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (signature >> shift) & mask
+
+
+class NearDuplicateDetector:
+    """Groups newly ingested articles into story clusters."""
+    
+    def __init__(self, config: dict):
+        """Initialize detector.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        dedup_config = config.get('near_duplicates', {})
+        self.enabled = dedup_config.get('enabled', True)
+        self.max_distance = dedup_config.get('max_distance', 6)
+        self.window_days = dedup_config.get('window_days', 3)
+        self._index: Optional[SimHashIndex] = None
+    
+    def reset(self):
+        """Drop the cached index so the next use reloads it."""
+        self._index = None
+    
+    def signature_for(self, article_data: dict) -> str:
+        """Compute the stored signature for article data."""
+        return to_hex(simhash(f"{article_data['title']}\n{article_data['content'] or ''}"))
+    
+    def assign_clusters(self, db: Session, new_articles: List[Tuple[int, str]]) -> int:
+        """Link new articles to an earlier near-duplicate, if any.
+        
+        Args:
+            db: Database session
+            new_articles: (article_id, signature) pairs in ingest order
+        
+        Returns:
+            Number of articles marked as duplicates
+        """
+        if not self.enabled or not new_articles:
+            return 0
+        
+        index = self._get_index(db)
+        duplicates = []
+        
+        for article_id, signature_hex in new_articles:
+            signature = int(signature_hex, 16)
+            representative = index.find(signature)
+            if representative is not None and representative != article_id:
+                duplicates.append({'id': article_id, 'duplicate_of': representative})
+            else:
+                index.add(article_id, signature)
+        
+        if duplicates:
+            db.execute(update(Article), duplicates)
+            logger.info(f"Grouped {len(duplicates)} near-duplicate articles into existing stories")
+        
+        return len(duplicates)
+    
+    def _get_index(self, db: Session) -> SimHashIndex:
+        """Load recent cluster representatives into the index."""
+        if self._index is None:
+            cutoff = datetime.utcnow() - timedelta(days=self.window_days)
+            self._index = SimHashIndex(self.max_distance)
+            rows = db.query(Article.id, Article.simhash).filter(
+                Article.fetched_at >= cutoff,
+                Article.simhash != None,
+                Article.duplicate_of == None
+            )
+            for article_id, signature_hex in rows:
+                self._index.add(article_id, int(signature_hex, 16))
+            logger.debug(f"Loaded {len(self._index)} signatures for near-duplicate detection")
+        
+        return self._index
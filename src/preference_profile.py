@@ -0,0 +1,314 @@
+"""Incrementally maintained user preference profile vectors."""
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from .database import Feedback, PreferenceProfile, ProfileMember
+from .embedder import Embedder
+
+logger = logging.getLogger(__name__)
+
+
+class PreferenceProfileManager:
+    """Keeps running sums of liked and disliked embeddings.
+    
+    The mean cosine similarity between an article and every liked article
+    equals the article's unit vector dotted with the mean of the liked
+    unit vectors, so the similarity filter only needs these sums. They are
+    updated in O(d) per feedback change instead of being recomputed from
+    every rated article each digest.
+    
+    Updates are read-modify-write on the stored sums and come from the bot,
+    digest and cleanup threads, so each one re-reads the rows and commits
+    while holding a lock shared by all instances.
+    """
+    
+    RATINGS = ('like', 'dislike')
+    IN_CLAUSE_CHUNK = 500
+    
+    # Held from reading the profile rows until their update is committed
+    lock = threading.RLock()
+    
+    def __init__(self, config: dict, embedder: Embedder):
+        """Initialize preference profile manager.
+        
+        Args:
+            config: Application configuration dictionary
+            embedder: Embedder used to look up article vectors
+        """
+        profile_config = config.get('filtering', {}).get('preference_profile', {})
+        self.enabled = profile_config.get('enabled', True)
+        # 'mean' matches the pairwise similarity filter exactly; 'decayed'
+        # weights each rating by 2^(-age / half_life_days)
+        self.mode = profile_config.get('mode', 'mean')
+        self.half_life_days = profile_config.get('half_life_days', 90)
+        self.embedder = embedder
+    
+    def record_feedback(self, db: Session, article_id: int, rating: Optional[str]):
+        """Apply a new, changed or removed rating to the profile and commit.
+        
+        Args:
+            db: Database session
+            article_id: Rated article ID
+            rating: 'like', 'dislike', or None if the rating is gone
+        """
+        with self.lock:
+            member = db.get(ProfileMember, article_id, populate_existing=True)
+            old_rating = member.rating if member else None
+            if old_rating == rating:
+                return
+            
+            vectors = self._unit_vectors([article_id])
+            vector = vectors.get(article_id)
+            if vector is None:
+                if member is not None:
+                    # Cannot subtract an unknown vector - rebuild on next sync
+                    self._reset(db)
+                    db.commit()
+                return
+            
+            now = datetime.utcnow()
+            profiles = self._load_profiles(db, now)
+            if member is not None:
+                self._subtract(profiles[member.rating], vector, member.added_at, now)
+                db.delete(member)
+            if rating is not None:
+                self._add(profiles[rating], vector, now, now)
+                db.add(ProfileMember(article_id=article_id, rating=rating, added_at=now))
+            db.commit()
+    
+    def remove_articles(self, db: Session, article_ids: List[int]):
+        """Take articles about to be deleted out of the profile, without committing.
+        
+        Their vectors must still be stored. The caller holds lock until it
+        commits, so no other update reads the profile in between.
+        
+        Args:
+            db: Database session
+            article_ids: IDs of the articles being deleted
+        """
+        with self.lock:
+            members = []
+            for start in range(0, len(article_ids), self.IN_CLAUSE_CHUNK):
+                chunk = article_ids[start:start + self.IN_CLAUSE_CHUNK]
+                members.extend(
+                    db.query(ProfileMember).filter(
+                        ProfileMember.article_id.in_(chunk)
+                    ).populate_existing()
+                )
+            if not members:
+                return
+            
+            vectors = self._unit_vectors([member.article_id for member in members])
+            if any(member.article_id not in vectors for member in members):
+                # Cannot subtract unknown vectors - rebuild on next sync
+                self._reset(db)
+                return
+            
+            now = datetime.utcnow()
+            profiles = self._load_profiles(db, now)
+            for member in members:
+                self._subtract(profiles[member.rating], vectors[member.article_id], member.added_at, now)
+                db.delete(member)
+            db.flush()
+        logger.debug(f"Removed {len(members)} deleted articles from the preference profile")
+    
+    def centroids(
+        self,
+        db: Session,
+        liked_ids: List[int],
+        disliked_ids: List[int]
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Get the liked and disliked profile vectors.
+        
+        Reconciles the profile with the given ratings first, so changes
+        made outside record_feedback are picked up.
+        
+        Args:
+            db: Database session
+            liked_ids: IDs of all liked articles
+            disliked_ids: IDs of all disliked articles
+        
+        Returns:
+            Tuple of (liked centroid, disliked centroid); None where the
+            user has no rated articles with embeddings
+        """
+        with self.lock:
+            self.sync(db, liked_ids, disliked_ids)
+            profiles = self._load_profiles(db, datetime.utcnow())
+            centroids = tuple(self._centroid(profiles[rating]) for rating in self.RATINGS)
+            
+            # Decaying to now was only needed for reading; leave the rows to writers
+            for profile in profiles.values():
+                if profile in db.new:
+                    db.expunge(profile)
+                else:
+                    db.expire(profile)
+        return centroids
+    
+    def sync(self, db: Session, liked_ids: List[int], disliked_ids: List[int]):
+        """Bring the profile in line with the current ratings and commit.
+        
+        Args:
+            db: Database session
+            liked_ids: IDs of all liked articles
+            disliked_ids: IDs of all disliked articles
+        """
+        wanted = {article_id: 'like' for article_id in liked_ids}
+        wanted.update((article_id, 'dislike') for article_id in disliked_ids)
+        
+        with self.lock:
+            members = {
+                member.article_id: member
+                for member in db.query(ProfileMember).populate_existing()
+            }
+            
+            stale = [m for article_id, m in members.items() if wanted.get(article_id) != m.rating]
+            new_ids = [
+                article_id for article_id, rating in wanted.items()
+                if article_id not in members or members[article_id].rating != rating
+            ]
+            if not stale and not new_ids:
+                return
+            
+            vectors = self._unit_vectors([m.article_id for m in stale] + new_ids)
+            if any(m.article_id not in vectors for m in stale):
+                self.rebuild(db, liked_ids, disliked_ids)
+                return
+            
+            now = datetime.utcnow()
+            profiles = self._load_profiles(db, now)
+            for member in stale:
+                self._subtract(profiles[member.rating], vectors[member.article_id], member.added_at, now)
+                db.delete(member)
+            db.flush()
+            
+            added_at = self._feedback_times(db, new_ids)
+            for article_id in new_ids:
+                if article_id in vectors:
+                    rated_at = added_at.get(article_id, now)
+                    self._add(profiles[wanted[article_id]], vectors[article_id], rated_at, now)
+                    db.add(ProfileMember(
+                        article_id=article_id, rating=wanted[article_id], added_at=rated_at
+                    ))
+            
+            db.commit()
+        logger.debug(f"Preference profile synced: -{len(stale)} +{len(new_ids)} ratings")
+    
+    def rebuild(self, db: Session, liked_ids: List[int], disliked_ids: List[int]):
+        """Recompute the profile from scratch and commit.
+        
+        Args:
+            db: Database session
+            liked_ids: IDs of all liked articles
+            disliked_ids: IDs of all disliked articles
+        """
+        with self.lock:
+            self._reset(db)
+            logger.info(
+                f"Rebuilding preference profile from {len(liked_ids)} liked, "
+                f"{len(disliked_ids)} disliked articles"
+            )
+            self.sync(db, liked_ids, disliked_ids)
+            db.commit()
+    
+    def _reset(self, db: Session):
+        """Drop all profile state."""
+        db.query(ProfileMember).delete()
+        db.query(PreferenceProfile).delete()
+        db.flush()
+    
+    def _load_profiles(self, db: Session, now: datetime) -> Dict[str, PreferenceProfile]:
+        """Load (creating if needed) both profiles, decayed up to now.
+        
+        Rows are re-read even if the session already holds them, so another
+        session's committed update is not overwritten.
+        """
+        profiles = {
+            profile.rating: profile
+            for profile in db.query(PreferenceProfile).populate_existing()
+        }
+        for rating in self.RATINGS:
+            if rating not in profiles:
+                profiles[rating] = PreferenceProfile(
+                    rating=rating, count=0, decayed_weight=0.0, decayed_at=now
+                )
+                db.add(profiles[rating])
+            
+            profile = profiles[rating]
+            factor = self._decay(profile.decayed_at or now, now)
+            if profile.decayed_sum is not None and factor != 1.0:
+                profile.decayed_sum = (self._vector(profile.decayed_sum) * factor).tobytes()
+            profile.decayed_weight = (profile.decayed_weight or 0.0) * factor
+            profile.decayed_at = now
+        
+        return profiles
+    
+    def _add(self, profile: PreferenceProfile, vector: np.ndarray, rated_at: datetime, now: datetime):
+        """Add a unit vector to a profile."""
+        weight = self._decay(rated_at, now)
+        profile.count += 1
+        profile.vector_sum = self._plus(profile.vector_sum, vector)
+        profile.decayed_sum = self._plus(profile.decayed_sum, vector * weight)
+        profile.decayed_weight += weight
+    
+    def _subtract(self, profile: PreferenceProfile, vector: np.ndarray, rated_at: datetime, now: datetime):
+        """Remove a unit vector from a profile."""
+        weight = self._decay(rated_at or now, now)
+        profile.count = max(0, profile.count - 1)
+        profile.vector_sum = self._plus(profile.vector_sum, -vector)
+        profile.decayed_sum = self._plus(profile.decayed_sum, -vector * weight)
+        profile.decayed_weight = max(0.0, profile.decayed_weight - weight)
+    
+    def _centroid(self, profile: PreferenceProfile) -> Optional[np.ndarray]:
+        """Mean (or decay-weighted mean) unit vector of a profile."""
+        if not profile.count or profile.vector_sum is None:
+            return None
+        if self.mode == 'decayed' and profile.decayed_weight > 0:
+            return self._vector(profile.decayed_sum) / profile.decayed_weight
+        return self._vector(profile.vector_sum) / profile.count
+    
+    def _decay(self, since: datetime, now: datetime) -> float:
+        """Decay factor for an interval."""
+        age_days = max(0.0, (now - since).total_seconds() / 86400)
+        return 0.5 ** (age_days / self.half_life_days)
+    
+    def _unit_vectors(self, article_ids: List[int]) -> Dict[int, np.ndarray]:
+        """Fetch article vectors in bulk, scaled to unit length."""
+        if not article_ids:
+            return {}
+        matrix, id_to_row, _ = self.embedder.get_article_embeddings(article_ids)
+        vectors = {}
+        for article_id, row in id_to_row.items():
+            vector = matrix[row].astype(np.float64)
+            norm = np.linalg.norm(vector)
+            vectors[article_id] = vector / norm if norm > 0 else vector
+        return vectors
+    
+    def _feedback_times(self, db: Session, article_ids: List[int]) -> Dict[int, datetime]:
+        """Get when each article was rated."""
+        times = {}
+        for start in range(0, len(article_ids), self.IN_CLAUSE_CHUNK):
+            chunk = article_ids[start:start + self.IN_CLAUSE_CHUNK]
+            times.update(
+                (article_id, created_at) for article_id, created_at in
+                db.query(Feedback.article_id, Feedback.created_at).filter(
+                    Feedback.article_id.in_(chunk)
+                )
+                if created_at is not None
+            )
+        return times
+    
+    @staticmethod
+    def _vector(blob: bytes) -> np.ndarray:
+        """Decode a stored vector."""
+        return np.frombuffer(blob, dtype=np.float64)
+    
+    @staticmethod
+    def _plus(blob: Optional[bytes], vector: np.ndarray) -> bytes:
+        """Add a vector to a stored vector."""
+        if blob is None:
+            return vector.astype(np.float64).tobytes()
+        return (np.frombuffer(blob, dtype=np.float64) + vector).tobytes()
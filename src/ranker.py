@@ -1,15 +1,21 @@
 """LLM-based article ranking."""
-import os
 import logging
-from collections import defaultdict
-from typing import List, Dict, Tuple, Optional
+from collections import Counter, defaultdict
+from typing import Iterator, List, Dict, Tuple, Optional
 from sqlalchemy.orm import Session
-from openai import OpenAI
-from anthropic import Anthropic
 import numpy as np
 from .database import Article, Feedback, LLMRanking
 from .embedder import Embedder
 from .context_selector import LLMContextSelector
+from .preference_profile import PreferenceProfileManager
+from .resilient_llm import ResilientLLM
+from .ranking_cache import RankingCache
+from .local_ranker import LocalRanker
+from .cascade import RankingCascade
+from .candidate_ranking import CandidateRanker
+from .similarity import profile_scores, similarity_scores
+from .candidate_retrieval import CandidateRetriever
+from .llm_budget import BudgetExceeded, LLMBudget, Usage
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +23,10 @@ logger = logging.getLogger(__name__)
 class ArticleRanker:
     """Ranks articles using LLM."""
     
+    # Bump when the ranking prompts or scoring instructions change, so
+    # cached rankings made with the old wording are not reused
+    PROMPT_VERSION = '2'
+    
     def __init__(self, config: dict, embedder: Embedder):
         """Initialize article ranker.
         
@@ -27,21 +37,43 @@ class ArticleRanker:
         self.config = config
         self.embedder = embedder
         self.context_selector = LLMContextSelector(config, embedder)
+        self.preference_profile = PreferenceProfileManager(config, embedder)
+        self.local_ranker = LocalRanker(config, embedder)
+        self.retriever = CandidateRetriever(config, embedder)
+        
+        # Initialize LLM client (with failover), charging every request to the budget
+        self.budget = LLMBudget(config)
+        self.llm = ResilientLLM.create(config, self.budget)
+        self.provider = self.llm.provider
+        self.model = self.llm.model
+        
+        # Sends the prompts, concurrently and several candidates per prompt
+        self.candidate_ranker = CandidateRanker(config, self)
+        
+        self.ranking_cache = RankingCache(config)
+        self.prompt_version = '{}:{}:{}'.format(
+            self.PROMPT_VERSION,
+            config['llm'].get('response_language', 'English'),
+            config['llm'].get('response_length', 'concise')
+        )
         
-        # Initialize LLM clients
-        self.provider = config['llm']['provider']
-        
-        if self.provider == 'chatgpt':
-            api_key = os.getenv(config['llm']['chatgpt']['api_key_env'])
-            self.openai_client = OpenAI(api_key=api_key)
-            self.model = config['llm']['chatgpt']['model']
-        elif self.provider == 'claude':
-            api_key = os.getenv(config['llm']['claude']['api_key_env'])
-            self.anthropic_client = Anthropic(api_key=api_key)
-            self.model = config['llm']['claude']['model']
+        # Optional cheap first tier; only a slice is escalated to self.llm
+        self.cascade = RankingCascade(config)
+        self.cheap_llm = None
+        if self.cascade.enabled and self.cascade.cheap_tier == 'llm':
+            self.cheap_llm = ResilientLLM.create(
+                config, self.budget, self.cascade.cheap_provider, self.cascade.cheap_model,
+                failover=False
+            )
         
         logger.info(f"Ranker initialized with {self.provider} ({self.model})")
     
+    def close(self):
+        """Release the LLM clients' threads once the ranker is no longer used."""
+        self.llm.close()
+        if self.cheap_llm is not None:
+            self.cheap_llm.close()
+    
     def rank_article(
         self,
         db: Session,
@@ -59,34 +91,124 @@ class ArticleRanker:
             
         Returns:
             Tuple of (score, reasoning)
-        """
-        # Select best examples for context
-        selected_liked, selected_disliked = self.context_selector.select_examples(
-            article, liked_articles, disliked_articles
-        )
         
-        # Build prompt
-        prompt = self._build_prompt(
-            article, selected_liked, selected_disliked
-        )
+        Raises:
+            BudgetExceeded: If the LLM budget is used up
+            LLMUnavailable: If no provider answered
+            ValueError: If the response has no valid score
+        """
+        prompt = self._prepare_prompt(article, liked_articles, disliked_articles)
         
-        # Get LLM response
-        score, reasoning = self._query_llm(prompt)
+        # Get LLM response (its usage counts towards today's spending)
+        self.budget.attach(db)
+        response = self.llm.complete(prompt)
+        parsed = self._parse_response(response.text)
+        if parsed is None:
+            raise ValueError(f"LLM response has no valid score: {response.text[:100]}")
+        score, reasoning = parsed
         
         # Save ranking
-        ranking = LLMRanking(
-            article_id=article.id,
-            provider=self.provider,
-            model=self.model,
-            score=score,
-            reasoning=reasoning
-        )
-        db.add(ranking)
-        db.commit()
+        self._save_rankings(db, [(article, score, reasoning)], usage={article.id: response.usage})
         
         logger.debug(f"Ranked article {article.id}: score={score}")
         return score, reasoning
     
+    def _prepare_prompt(
+        self,
+        article: Article,
+        liked_articles: List[Article],
+        disliked_articles: List[Article]
+    ) -> str:
+        """Select context examples and build the ranking prompt for an article."""
+        selected_liked, selected_disliked = self.context_selector.select_examples(
+            article, liked_articles, disliked_articles
+        )
+        return self._build_prompt(article, selected_liked, selected_disliked)
+    
+    def _prepare_batch_prompt(
+        self,
+        articles: List[Article],
+        liked_articles: List[Article],
+        disliked_articles: List[Article]
+    ) -> str:
+        """Build one ranking prompt for several articles.
+        
+        The shared context holds the examples chosen most often across the
+        articles' individual selections.
+        """
+        liked_votes, disliked_votes = Counter(), Counter()
+        examples = {}
+        for article in articles:
+            selected_liked, selected_disliked = self.context_selector.select_examples(
+                article, liked_articles, disliked_articles
+            )
+            liked_votes.update(a.id for a in selected_liked)
+            disliked_votes.update(a.id for a in selected_disliked)
+            examples.update((a.id, a) for a in selected_liked + selected_disliked)
+        
+        liked = [examples[i] for i, _ in liked_votes.most_common(self.context_selector.max_liked)]
+        disliked = [
+            examples[i] for i, _ in disliked_votes.most_common(self.context_selector.max_disliked)
+        ]
+        return self._build_batch_prompt(articles, liked, disliked)
+    
+    def _save_rankings(
+        self,
+        db: Session,
+        ranked: List[Tuple[Article, float, str]],
+        fingerprint: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        usage: Optional[Dict[int, Optional[Usage]]] = None
+    ):
+        """Store LLM rankings in one commit (errors are logged, not raised).
+        
+        Args:
+            db: Database session
+            ranked: List of (article, score, reasoning) tuples
+            fingerprint: Feedback set fingerprint, if the rankings used the
+                full feedback history and may be reused
+            provider: Provider that ranked them (defaults to the main one)
+            model: Model that ranked them (defaults to the main one)
+            usage: Dictionary mapping article ID to the tokens spent on it;
+                its provider and model take precedence (failover answers)
+        """
+        if not ranked:
+            return
+        
+        usage = usage or {}
+        try:
+            db.add_all([
+                LLMRanking(
+                    article_id=article.id,
+                    score=score,
+                    reasoning=reasoning,
+                    prompt_version=self.prompt_version,
+                    feedback_fingerprint=fingerprint,
+                    **self._usage_columns(
+                        usage.get(article.id), provider or self.provider, model or self.model
+                    )
+                )
+                for article, score, reasoning in ranked
+            ])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error saving LLM rankings: {e}", exc_info=True)
+    
+    @staticmethod
+    def _usage_columns(usage: Optional[Usage], provider: str, model: str) -> Dict:
+        """LLMRanking column values for who ranked an article and at what cost."""
+        if usage is None:
+            return {'provider': provider, 'model': model}
+        return {
+            'provider': usage.provider or provider,
+            'model': usage.model or model,
+            'prompt_tokens': usage.prompt_tokens,
+            'completion_tokens': usage.completion_tokens,
+            'cost_usd': usage.cost
+        }
+    
     def _build_prompt(
         self,
         article: Article,
@@ -103,7 +225,74 @@ class ArticleRanker:
         Returns:
             Formatted prompt string
         """
-        # Get language settings
+        language, length_instruction = self._response_style()
+        
+        prompt = "You are a personalized news curator. "
+        prompt += "Your task is to rate how relevant a new article is to the user "
+        prompt += "based on their past preferences.\n\n"
+        prompt += self._examples_section(liked, disliked)
+        
+        # Add new article
+        prompt += "NEW ARTICLE TO RATE:\n"
+        prompt += f"Title: {article.title}\n"
+        prompt += f"Source: {article.source}\n"
+        content_preview = article.content[:1000] if article.content else article.summary
+        prompt += f"Content: {content_preview}\n\n"
+        
+        # Add instructions with language specification
+        prompt += "TASK:\n"
+        prompt += "1. Rate this article from 0-10 based on the user's preferences\n"
+        prompt += f"2. Provide {length_instruction} explaining why the user might (or might not) like this\n"
+        prompt += f"3. Write your explanation ONLY in {language}\n\n"
+        prompt += "Format your response as:\n"
+        prompt += "SCORE: [number]\n"
+        prompt += f"REASONING: [explanation in {language}]"
+        
+        return prompt
+    
+    def _build_batch_prompt(
+        self,
+        articles: List[Article],
+        liked: List[Article],
+        disliked: List[Article]
+    ) -> str:
+        """Build a ranking prompt asking for a JSON array of scores.
+        
+        Args:
+            articles: Articles to rank
+            liked: Selected liked articles
+            disliked: Selected disliked articles
+        
+        Returns:
+            Formatted prompt string
+        """
+        language, length_instruction = self._response_style()
+        
+        prompt = "You are a personalized news curator. "
+        prompt += "Your task is to rate how relevant each new article is to the user "
+        prompt += "based on their past preferences.\n\n"
+        prompt += self._examples_section(liked, disliked)
+        
+        # Add new articles
+        prompt += "NEW ARTICLES TO RATE:\n"
+        for article in articles:
+            prompt += f"ID: {article.id}\n"
+            prompt += f"Title: {article.title}\n"
+            prompt += f"Source: {article.source}\n"
+            content_preview = article.content[:1000] if article.content else article.summary
+            prompt += f"Content: {content_preview}\n\n"
+        
+        prompt += "TASK:\n"
+        prompt += "1. Rate each article from 0-10 based on the user's preferences\n"
+        prompt += f"2. For each, provide {length_instruction} explaining why the user might (or might not) like it\n"
+        prompt += f"3. Write your explanations ONLY in {language}\n\n"
+        prompt += "Respond with ONLY a JSON array containing one object per article:\n"
+        prompt += f'[{{"id": <article ID>, "score": <number>, "reasoning": "<explanation in {language}>"}}]'
+        
+        return prompt
+    
+    def _response_style(self) -> Tuple[str, str]:
+        """Get the configured reasoning language and length instruction."""
         language = self.config['llm'].get('response_language', 'English')
         length = self.config['llm'].get('response_length', 'concise')
         
@@ -114,9 +303,11 @@ class ArticleRanker:
             'detailed': '3-4 sentences with detailed reasoning'
         }.get(length, '1 concise sentence (max 15 words)')
         
-        prompt = "You are a personalized news curator. "
-        prompt += "Your task is to rate how relevant a new article is to the user "
-        prompt += "based on their past preferences.\n\n"
+        return language, length_instruction
+    
+    def _examples_section(self, liked: List[Article], disliked: List[Article]) -> str:
+        """Format liked and disliked examples for a prompt."""
+        prompt = ""
         
         # Add liked examples
         if liked:
@@ -136,104 +327,49 @@ class ArticleRanker:
                 prompt += f"   Summary: {summary}\n"
                 prompt += f"   Source: {a.source}\n\n"
         
-        # Add new article
-        prompt += "NEW ARTICLE TO RATE:\n"
-        prompt += f"Title: {article.title}\n"
-        prompt += f"Source: {article.source}\n"
-        content_preview = article.content[:1000] if article.content else article.summary
-        prompt += f"Content: {content_preview}\n\n"
-        
-        # Add instructions with language specification
-        prompt += "TASK:\n"
-        prompt += "1. Rate this article from 0-10 based on the user's preferences\n"
-        prompt += f"2. Provide {length_instruction} explaining why the user might (or might not) like this\n"
-        prompt += f"3. Write your explanation ONLY in {language}\n\n"
-        prompt += "Format your response as:\n"
-        prompt += "SCORE: [number]\n"
-        prompt += f"REASONING: [explanation in {language}]"
-        
         return prompt
     
-    def _query_llm(self, prompt: str) -> Tuple[float, str]:
+    def _query_llm(
+        self,
+        prompt: str,
+        llm: Optional[ResilientLLM] = None
+    ) -> Optional[Tuple[float, str, Optional[Usage]]]:
         """Query LLM for ranking.
         
         Args:
             prompt: Ranking prompt
+            llm: Client to use (defaults to the main model)
             
         Returns:
-            Tuple of (score, reasoning)
+            Tuple of (score, reasoning, usage), or None if the request failed
+            (after retries and failover), the budget does not cover it or
+            the response has no valid score
         """
+        llm = llm or self.llm
         try:
-            if self.provider == 'chatgpt':
-                return self._query_chatgpt(prompt)
-            elif self.provider == 'claude':
-                return self._query_claude(prompt)
-            else:
-                logger.error(f"Unknown LLM provider: {self.provider}")
-                return 5.0, f"Unknown provider: {self.provider}"
+            response = llm.complete(prompt)
+        except BudgetExceeded:
+            return None
         except Exception as e:
-            logger.error(f"Error querying LLM ({self.provider}): {e}", exc_info=True)
-            return 5.0, f"Error during ranking: {str(e)}"
-    
-    def _query_chatgpt(self, prompt: str) -> Tuple[float, str]:
-        """Query ChatGPT.
-        
-        Args:
-            prompt: Ranking prompt
-            
-        Returns:
-            Tuple of (score, reasoning)
-        """
-        temperature = self.config['llm']['chatgpt'].get('temperature', 0.7)
-        max_tokens = self.config['llm']['chatgpt'].get('max_tokens', 500)
-        
-        response = self.openai_client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are a personalized news curator."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        
-        content = response.choices[0].message.content
-        return self._parse_response(content)
-    
-    def _query_claude(self, prompt: str) -> Tuple[float, str]:
-        """Query Claude.
-        
-        Args:
-            prompt: Ranking prompt
-            
-        Returns:
-            Tuple of (score, reasoning)
-        """
-        temperature = self.config['llm']['claude'].get('temperature', 0.7)
-        max_tokens = self.config['llm']['claude'].get('max_tokens', 500)
-        
-        response = self.anthropic_client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
+            logger.error(f"Error querying LLM ({llm.provider}): {e}", exc_info=True)
+            return None
         
-        content = response.content[0].text
-        return self._parse_response(content)
+        parsed = self._parse_response(response.text)
+        if parsed is None:
+            return None
+        return (*parsed, response.usage)
     
-    def _parse_response(self, content: str) -> Tuple[float, str]:
+    def _parse_response(self, content: str) -> Optional[Tuple[float, str]]:
         """Parse LLM response.
         
         Args:
             content: LLM response text
             
         Returns:
-            Tuple of (score, reasoning)
+            Tuple of (score, reasoning), or None if there is no valid
+            SCORE line (a guessed score must not be stored as a ranking)
         """
-        score = 5.0
+        score = None
         reasoning = ""
         
         lines = content.strip().split('\n')
@@ -253,6 +389,10 @@ class ArticleRanker:
             elif line.startswith('REASONING:'):
                 reasoning = line.replace('REASONING:', '').strip()
         
+        if score is None:
+            logger.warning(f"LLM response has no valid score: {content[:200]}")
+            return None
+        
         if not reasoning:
             reasoning = content[:200]
         
@@ -280,55 +420,10 @@ class ArticleRanker:
             logger.warning("filter_and_rank_candidates: No new articles provided")
             return []
         
-        logger.info(
-            f"Starting ranking: {len(new_articles)} new articles, "
-            f"{len(liked_articles)} liked, {len(disliked_articles)} disliked"
-        )
-        
-        # Step 1: Embedding-based filtering
-        try:
-            candidates = self._filter_by_similarity(
-                new_articles, liked_articles, disliked_articles
-            )
-            
-            logger.info(
-                f"Filtered {len(new_articles)} articles to "
-                f"{len(candidates)} candidates using embeddings"
-            )
-        except Exception as e:
-            logger.error(f"Error in similarity filtering: {e}", exc_info=True)
-            # Fallback: use first N articles
-            limit = self.config['filtering']['top_candidates_for_llm']
-            candidates = new_articles[:limit]
-            logger.warning(f"Using fallback: first {len(candidates)} articles")
-        
-        if not candidates:
-            logger.warning("No candidates after filtering")
-            return []
-        
-        # Step 2: LLM ranking
-        ranked = []
-        for i, article in enumerate(candidates, 1):
-            try:
-                logger.debug(f"Ranking article {i}/{len(candidates)}: {article.title[:50]}...")
-                score, reasoning = self.rank_article(
-                    db, article, liked_articles, disliked_articles
-                )
-                ranked.append((article, score, reasoning))
-                logger.debug(f"Article {i} scored: {score}/10")
-            except Exception as e:
-                logger.error(
-                    f"Error ranking article {article.id} ('{article.title[:50]}...'): {e}",
-                    exc_info=True
-                )
-                # Continue with other articles instead of failing completely
-                continue
-        
+        ranked = list(self.iter_ranked_candidates(
+            db, new_articles, liked_articles, disliked_articles
+        ))
         if not ranked:
-            logger.error(
-                f"All {len(candidates)} candidates failed to rank! "
-                f"Check LLM configuration and API keys."
-            )
             return []
         
         # Sort by score
@@ -386,8 +481,158 @@ class ArticleRanker:
             )
         
         logger.info(
-            f"Ranking complete: {len(ranked)}/{len(candidates)} articles ranked successfully"
+            f"Ranking complete: {len(ranked)} articles ranked successfully"
+        )
+        
+        return ranked
+    
+    def iter_ranked_candidates(
+        self,
+        db: Session,
+        new_articles: List[Article],
+        liked_articles: List[Article],
+        disliked_articles: List[Article],
+        wave_size: Optional[int] = None
+    ) -> Iterator[Tuple[Article, float, str]]:
+        """Filter candidates and yield rankings as they become available.
+        
+        Still-valid cached rankings come first, then candidates in similarity
+        order, ranked wave_size at a time. Stopping the iteration early skips
+        the LLM calls for the remaining waves. With the cascade enabled all
+        candidates form one wave, since escalation compares them all.
+        
+        Args:
+            db: Database session
+            new_articles: New articles to evaluate
+            liked_articles: User's liked articles
+            disliked_articles: User's disliked articles
+            wave_size: Candidates ranked per wave (default: all at once)
+        
+        Yields:
+            (article, score, reasoning) tuples
+        """
+        if not new_articles:
+            return
+        
+        logger.info(
+            f"Starting ranking: {len(new_articles)} new articles, "
+            f"{len(liked_articles)} liked, {len(disliked_articles)} disliked"
+        )
+        
+        # Start this run's budget from today's recorded usage
+        try:
+            self.budget.start_run(db)
+        except Exception as e:
+            logger.warning(f"Could not load today's LLM usage: {e}")
+        
+        # Step 0: Reuse rankings still valid for the current feedback
+        fingerprint = RankingCache.fingerprint(liked_articles, disliked_articles)
+        cached = self.ranking_cache.lookup(
+            db, new_articles, self.model, self.prompt_version, fingerprint
         )
+        reused = [
+            (article, cached[article.id].score, cached[article.id].reasoning)
+            for article in new_articles if article.id in cached
+        ]
+        if reused:
+            new_articles = [article for article in new_articles if article.id not in cached]
+            logger.info(
+                f"Reusing {len(reused)} cached rankings, "
+                f"{len(new_articles)} articles left to rank"
+            )
+        
+        # Keep the local model up to date with new ratings
+        try:
+            self.local_ranker.refresh(db)
+        except Exception as e:
+            logger.warning(f"Could not update local ranker: {e}")
+        
+        # Step 1: Embedding-based filtering
+        try:
+            candidates = self._filter_by_similarity(
+                new_articles, liked_articles, disliked_articles, db
+            )
+            
+            logger.info(
+                f"Filtered {len(new_articles)} articles to "
+                f"{len(candidates)} candidates using embeddings"
+            )
+        except Exception as e:
+            logger.error(f"Error in similarity filtering: {e}", exc_info=True)
+            # Fallback: use first N articles
+            limit = self.config['filtering']['top_candidates_for_llm']
+            candidates = new_articles[:limit]
+            logger.warning(f"Using fallback: first {len(candidates)} articles")
+        
+        if not candidates and not reused:
+            logger.warning("No candidates after filtering")
+            return
+        
+        yield from reused
+        
+        # Step 2: LLM ranking, one wave at a time
+        if not wave_size or self.cascade.enabled:
+            wave_size = max(1, len(candidates))
+        ranked_count = 0
+        for start in range(0, len(candidates), wave_size):
+            wave = candidates[start:start + wave_size]
+            ranked = self._rank_wave(db, wave, liked_articles, disliked_articles, fingerprint)
+            ranked_count += len(ranked)
+            yield from ranked
+        
+        if candidates and not ranked_count and not reused:
+            logger.error(
+                f"All {len(candidates)} candidates failed to rank! "
+                f"Check LLM configuration and API keys."
+            )
+    
+    def _rank_wave(
+        self,
+        db: Session,
+        wave: List[Article],
+        liked_articles: List[Article],
+        disliked_articles: List[Article],
+        fingerprint: str
+    ) -> List[Tuple[Article, float, str]]:
+        """Rank and store a slice of the candidates.
+        
+        Args:
+            db: Database session
+            wave: Candidates to rank
+            liked_articles: User's liked articles
+            disliked_articles: User's disliked articles
+            fingerprint: Fingerprint of the current feedback set
+        
+        Returns:
+            List of (article, score, reasoning) tuples in candidate order
+        """
+        if self.cascade.enabled:
+            ranked = self.cascade.rank(
+                self, db, wave, liked_articles, disliked_articles, fingerprint
+            )
+        else:
+            usage = {}
+            ranked = self.candidate_ranker.rank(
+                wave, liked_articles, disliked_articles, usage=usage
+            )
+            self._save_rankings(db, ranked, fingerprint, usage=usage)
+        
+        # Budget used up or requests failed: the local model ranks the rest
+        ranked_ids = {article.id for article, _, _ in ranked}
+        unranked = [article for article in wave if article.id not in ranked_ids]
+        if unranked:
+            fallback = self.local_ranker.rank(unranked) if self.local_ranker.ready else []
+            self._save_rankings(
+                db, fallback, provider=LocalRanker.PROVIDER, model=LocalRanker.MODEL
+            )
+            logger.warning(
+                f"{len(unranked)} candidates not ranked by the LLM "
+                f"({'budget exhausted' if self.budget.exhausted else 'requests failed'}), "
+                f"{len(fallback)} ranked by the local model"
+            )
+            by_id = {article.id: (article, score, reasoning)
+                     for article, score, reasoning in ranked + fallback}
+            ranked = [by_id[article.id] for article in wave if article.id in by_id]
         
         return ranked
     
@@ -395,12 +640,17 @@ class ArticleRanker:
         self,
         new_articles: List[Article],
         liked_articles: List[Article],
-        disliked_articles: List[Article]
+        disliked_articles: List[Article],
+        db: Optional[Session] = None
     ) -> List[Article]:
         """
         Filter articles by embedding similarity with balanced source selection.
         
         This prevents high-volume sources from dominating the LLM input.
+        With a database session, scores come from the persisted preference
+        profile (two dot products per article) instead of every rated vector.
+        In ANN retrieval mode only the pool found by nearest-neighbour
+        queries is scored, not every pending article.
         """
         if not liked_articles and not disliked_articles:
             limit = self.config['filtering']['top_candidates_for_llm']
@@ -410,34 +660,63 @@ class ArticleRanker:
         threshold = self.config['filtering']['similarity_threshold']
         scored_articles = []
         
-        # Calculate similarity scores
-        for article in new_articles:
-            embedding = self.embedder.get_article_embedding(article.id)
-            if embedding is None:
-                embedding = self.embedder.embed_article(article)
-                self.embedder.store_article_embedding(article, embedding)
-            
-            # Calculate liked similarity
-            liked_sims = []
-            for liked in liked_articles:
-                liked_emb = self.embedder.get_article_embedding(liked.id)
-                if liked_emb is not None:
-                    sim = self._cosine_similarity(embedding, liked_emb)
-                    liked_sims.append(sim)
-            
-            # Calculate disliked similarity
-            disliked_sims = []
-            for disliked in disliked_articles:
-                disliked_emb = self.embedder.get_article_embedding(disliked.id)
-                if disliked_emb is not None:
-                    sim = self._cosine_similarity(embedding, disliked_emb)
-                    disliked_sims.append(sim)
-            
-            # Combined score
-            liked_score = sum(liked_sims) / len(liked_sims) if liked_sims else 0
-            disliked_score = sum(disliked_sims) / len(disliked_sims) if disliked_sims else 0
-            combined_score = liked_score - 0.3 * disliked_score
-            
+        embeddings, missing_ids = None, []
+        if db is not None and self.retriever.enabled:
+            try:
+                embeddings = self.retriever.retrieve(db, new_articles, liked_articles)
+            except Exception as e:
+                logger.warning(f"ANN retrieval failed, scoring every article: {e}")
+        
+        if embeddings is None:
+            # Fetch all vectors up front, embedding articles the background
+            # pipeline has not reached in bulk
+            matrix, id_to_row, missing_ids = self.embedder.get_article_embeddings(
+                [article.id for article in new_articles]
+            )
+            embeddings = {article_id: matrix[row] for article_id, row in id_to_row.items()}
+        if missing_ids:
+            missing_set = set(missing_ids)
+            missing = [article for article in new_articles if article.id in missing_set]
+            new_embeddings = self.embedder.embed_articles(missing)
+            if not self.embedder.store_article_embeddings(missing, new_embeddings):
+                raise RuntimeError(f"Could not embed any of {len(missing)} articles")
+            embeddings.update(
+                (article.id, embedding) for article, embedding in zip(missing, new_embeddings)
+            )
+        
+        # Calculate similarity scores for all embedded articles at once
+        embedded = [article for article in new_articles if embeddings.get(article.id) is not None]
+        if not embedded:
+            return []
+        pending_matrix = np.vstack([embeddings[article.id] for article in embedded])
+        
+        if self.local_ranker.prerank and self.local_ranker.ready:
+            # Pre-rank with the learned model: like probability replaces similarity
+            combined_scores = self.local_ranker.score(embedded, pending_matrix)
+            threshold = self.local_ranker.min_probability
+        elif db is not None and self.preference_profile.enabled:
+            liked_centroid, disliked_centroid = self.preference_profile.centroids(
+                db,
+                [article.id for article in liked_articles],
+                [article.id for article in disliked_articles]
+            )
+            combined_scores = profile_scores(
+                pending_matrix, liked_centroid, disliked_centroid
+            )
+        else:
+            liked_matrix, _, _ = self.embedder.get_article_embeddings(
+                [article.id for article in liked_articles]
+            )
+            disliked_matrix, _, _ = self.embedder.get_article_embeddings(
+                [article.id for article in disliked_articles]
+            )
+            combined_scores = similarity_scores(
+                pending_matrix, liked_matrix, disliked_matrix,
+                self.config['filtering'].get('similarity_chunk_size', 1024)
+            )
+        
+        for article, combined_score in zip(embedded, combined_scores):
+            combined_score = float(combined_score)
             if combined_score >= threshold:
                 scored_articles.append({
                     'article': article,
@@ -0,0 +1,109 @@
+"""Reuse of earlier LLM rankings across digests."""
+import hashlib
+import logging
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from .database import Article, Feedback, LLMRanking
+
+logger = logging.getLogger(__name__)
+
+
+class RankingCache:
+    """Finds stored LLM rankings that are still valid for pending articles.
+    
+    A ranking is reused when it came from the same model and prompt version
+    and either the feedback set is unchanged (same fingerprint) or only a
+    few ratings were given since, within max_age_hours.
+    """
+    
+    IN_CLAUSE_CHUNK = 500
+    
+    def __init__(self, config: dict):
+        """Initialize ranking cache.
+        
+        Args:
+            config: Application configuration dictionary
+        """
+        cache_config = config['llm'].get('ranking_cache', {})
+        self.enabled = cache_config.get('enabled', True)
+        self.max_age = timedelta(hours=cache_config.get('max_age_hours', 72))
+        # Ratings tolerated since the ranking before it counts as outdated
+        self.max_feedback_changes = cache_config.get('max_feedback_changes', 3)
+    
+    @staticmethod
+    def fingerprint(liked_articles: List[Article], disliked_articles: List[Article]) -> str:
+        """Hash the feedback set a ranking was made with.
+        
+        Args:
+            liked_articles: User's liked articles
+            disliked_articles: User's disliked articles
+        
+        Returns:
+            Hex digest identifying the set of ratings
+        """
+        liked = ','.join(str(i) for i in sorted(a.id for a in liked_articles))
+        disliked = ','.join(str(i) for i in sorted(a.id for a in disliked_articles))
+        return hashlib.sha256(f"like:{liked}|dislike:{disliked}".encode()).hexdigest()
+    
+    def lookup(
+        self,
+        db: Session,
+        articles: List[Article],
+        model: str,
+        prompt_version: str,
+        fingerprint: str
+    ) -> Dict[int, LLMRanking]:
+        """Get the latest still-valid ranking of each article.
+        
+        Args:
+            db: Database session
+            articles: Articles about to be ranked
+            model: Model that would rank them
+            prompt_version: Version of the ranking prompt
+            fingerprint: Fingerprint of the current feedback set
+        
+        Returns:
+            Dictionary mapping article ID to a reusable ranking
+        """
+        if not self.enabled or not articles:
+            return {}
+        
+        since = datetime.utcnow() - self.max_age
+        article_ids = [article.id for article in articles]
+        latest = {}
+        for start in range(0, len(article_ids), self.IN_CLAUSE_CHUNK):
+            chunk = article_ids[start:start + self.IN_CLAUSE_CHUNK]
+            rankings = db.query(LLMRanking).filter(
+                LLMRanking.article_id.in_(chunk),
+                LLMRanking.model == model,
+                LLMRanking.prompt_version == prompt_version,
+                LLMRanking.feedback_fingerprint != None,
+                LLMRanking.created_at >= since
+            ).order_by(LLMRanking.created_at.asc())
+            
+            for ranking in rankings:
+                latest[ranking.article_id] = ranking
+        
+        if not latest:
+            return {}
+        
+        # Rating times (changed ratings get a new created_at)
+        feedback_times = sorted(
+            created_at for (created_at,) in
+            db.query(Feedback.created_at).filter(Feedback.created_at != None)
+        )
+        
+        valid = {}
+        for article_id, ranking in latest.items():
+            if ranking.feedback_fingerprint == fingerprint:
+                valid[article_id] = ranking
+                continue
+            
+            changes = len(feedback_times) - bisect_right(feedback_times, ranking.created_at)
+            if changes <= self.max_feedback_changes:
+                valid[article_id] = ranking
+        
+        logger.debug(f"Ranking cache: {len(valid)}/{len(article_ids)} articles reusable")
+        return valid
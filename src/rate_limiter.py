@@ -0,0 +1,124 @@
+"""Requests- and tokens-per-minute limiting for API calls."""
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe sliding-window limit on requests and tokens per minute.
+    
+    acquire() blocks until the call fits into both budgets for the last
+    60 seconds. A limit of None or 0 disables that budget.
+    """
+    
+    WINDOW_SECONDS = 60.0
+    
+    # Limiters shared per (provider, model), see shared()
+    _registry: Dict[Tuple[str, str], 'RateLimiter'] = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """Initialize rate limiter.
+        
+        Args:
+            requests_per_minute: Max requests started per minute
+            tokens_per_minute: Max (estimated) tokens sent per minute
+            clock: Monotonic time source
+            sleep: Sleep function
+        """
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self._clock = clock
+        self._sleep = sleep
+        self._events = deque()  # (timestamp, tokens)
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(
+        cls,
+        provider: str,
+        model: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None
+    ) -> 'RateLimiter':
+        """Get the limiter every client of a provider and model goes through.
+        
+        Provider limits apply per API key, so the main, cheap-tier and
+        failover clients of every ranker must share one window. The limits
+        of the first call are kept.
+        
+        Args:
+            provider: Provider name
+            model: Model name
+            requests_per_minute: Max requests started per minute
+            tokens_per_minute: Max (estimated) tokens sent per minute
+        
+        Returns:
+            RateLimiter instance
+        """
+        with cls._registry_lock:
+            key = (provider, model)
+            if key not in cls._registry:
+                cls._registry[key] = cls(requests_per_minute, tokens_per_minute)
+            return cls._registry[key]
+    
+    def acquire(self, tokens: int = 0) -> float:
+        """Wait until a request of the given size is allowed, then record it.
+        
+        Args:
+            tokens: Estimated tokens the request will use
+        
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._expire(now)
+                wait = self._wait_time(now, tokens)
+                if wait <= 0:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    if waited:
+                        logger.debug(f"Rate limiter delayed request by {waited:.1f}s")
+                    return waited
+            
+            self._sleep(wait)
+            waited += wait
+    
+    def _expire(self, now: float):
+        """Drop events that left the window."""
+        while self._events and self._events[0][0] <= now - self.WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+    
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Seconds until a request of the given size fits, 0 if it fits now."""
+        wait = 0.0
+        
+        if self.requests_per_minute and len(self._events) >= self.requests_per_minute:
+            oldest = self._events[len(self._events) - self.requests_per_minute][0]
+            wait = max(wait, oldest + self.WINDOW_SECONDS - now)
+        
+        if self.tokens_per_minute and self._events:
+            # A request larger than the whole budget goes alone
+            excess = self._tokens_in_window + min(tokens, self.tokens_per_minute) - self.tokens_per_minute
+            for timestamp, event_tokens in self._events:
+                if excess <= 0:
+                    break
+                excess -= event_tokens
+                wait = max(wait, timestamp + self.WINDOW_SECONDS - now)
+        
+        return wait
@@ -0,0 +1,248 @@
+"""Deadlines, retries, hedging and provider failover for LLM requests."""
+import os
+import random
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional
+from .llm_budget import BudgetExceeded, LLMBudget
+from .llm_client import LLMClient, LLMResponse
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """Raised when no provider answered a request before its deadline."""
+
+
+class ResilientLLM:
+    """Wraps LLM clients so one slow or failing call cannot stall ranking.
+    
+    Each request gets an overall deadline. Failed attempts are retried with
+    jittered exponential backoff, then the next client (another provider)
+    is tried. An attempt slower than the configured percentile of recent
+    latencies gets a hedged duplicate; whichever answers first wins.
+    """
+    
+    # Latencies kept per client for the hedging percentile
+    LATENCY_WINDOW = 200
+    # HTTP statuses that will not succeed on retry (the next provider may)
+    NON_RETRYABLE_STATUS = {400, 401, 403, 404, 422}
+    
+    def __init__(
+        self,
+        config: dict,
+        clients: List[LLMClient],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """Initialize resilient LLM.
+        
+        Args:
+            config: Application configuration dictionary
+            clients: Clients in failover order; the first one is the primary
+            clock: Monotonic time source
+            sleep: Sleep function
+        """
+        resilience_config = config['llm'].get('resilience', {})
+        self.enabled = resilience_config.get('enabled', True)
+        self.deadline = resilience_config.get('deadline_seconds', 90)
+        self.max_retries = resilience_config.get('max_retries', 2)
+        self.backoff_base = resilience_config.get('backoff_base_seconds', 1.0)
+        self.backoff_max = resilience_config.get('backoff_max_seconds', 10.0)
+        # Hedge attempts slower than this percentile of recent latencies (0 = off)
+        self.hedge_percentile = resilience_config.get('hedge_percentile', 95)
+        self.hedge_min_samples = resilience_config.get('hedge_min_samples', 20)
+        
+        self.clients = clients
+        self.hedges = 0
+        self._clock = clock
+        self._sleep = sleep
+        self._latencies: Dict[int, Deque[float]] = {
+            id(client): deque(maxlen=self.LATENCY_WINDOW) for client in clients
+        }
+        self._lock = threading.Lock()
+        # Attempts and their hedges; sized so hedges do not queue behind
+        # the ranker's concurrent requests
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * max(1, config['llm'].get('max_concurrent_requests', 4)),
+            thread_name_prefix='llm-attempt'
+        )
+    
+    @classmethod
+    def create(
+        cls,
+        config: dict,
+        budget: Optional[LLMBudget] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        failover: bool = True
+    ) -> 'ResilientLLM':
+        """Build a client for a provider, backed by the other configured ones.
+        
+        Args:
+            config: Application configuration dictionary
+            budget: Budget every request is charged to
+            provider: Primary provider (defaults to llm.provider)
+            model: Primary model (defaults to the provider's configured one)
+            failover: Add the other providers with an API key as fallbacks
+        
+        Returns:
+            ResilientLLM instance
+        """
+        clients = [LLMClient(config, provider, model, budget)]
+        if failover and config['llm'].get('resilience', {}).get('failover', True):
+            for other in ('chatgpt', 'claude'):
+                other_config = config['llm'].get(other)
+                if other == clients[0].provider or not other_config:
+                    continue
+                if not os.getenv(other_config.get('api_key_env', '')):
+                    continue
+                try:
+                    clients.append(LLMClient(config, other, budget=budget))
+                except Exception as e:
+                    logger.warning(f"Could not set up {other} for failover: {e}")
+        
+        return cls(config, clients)
+    
+    @property
+    def provider(self) -> str:
+        """Primary provider."""
+        return self.clients[0].provider
+    
+    @property
+    def model(self) -> str:
+        """Primary model."""
+        return self.clients[0].model
+    
+    @property
+    def max_tokens(self) -> int:
+        """Primary client's completion token limit."""
+        return self.clients[0].max_tokens
+    
+    def complete(self, prompt: str, max_tokens: Optional[int] = None) -> LLMResponse:
+        """Get a reply from the first provider that answers in time.
+        
+        Args:
+            prompt: Prompt text
+            max_tokens: Completion token limit (defaults to the configured one)
+        
+        Returns:
+            Response text and usage
+        
+        Raises:
+            BudgetExceeded: If the budget cannot cover the request
+            LLMUnavailable: If every provider failed or the deadline passed
+        """
+        if not self.enabled:
+            return self.clients[0].complete(prompt, max_tokens)
+        
+        deadline = self._clock() + self.deadline
+        last_error = None
+        for index, client in enumerate(self.clients):
+            if index:
+                logger.warning(
+                    f"Failing over to {client.provider} ({client.model}) after: {last_error}"
+                )
+            
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    raise LLMUnavailable(f"Deadline of {self.deadline}s passed: {last_error}")
+                
+                try:
+                    return self._attempt(client, prompt, max_tokens, remaining)
+                except BudgetExceeded:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if not self._retryable(e) or attempt == self.max_retries:
+                        break
+                    delay = min(self._backoff(attempt), deadline - self._clock())
+                    logger.info(
+                        f"{client.provider} request failed ({e}), "
+                        f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                    )
+                    if delay > 0:
+                        self._sleep(delay)
+        
+        raise LLMUnavailable(f"All LLM providers failed: {last_error}")
+    
+    def close(self):
+        """Stop the attempt threads once this client is no longer used.
+        
+        Queued attempts are dropped; ones already sent finish in the background.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _attempt(
+        self,
+        client: LLMClient,
+        prompt: str,
+        max_tokens: Optional[int],
+        timeout: float
+    ) -> LLMResponse:
+        """Send one request, hedged with a duplicate if it runs long."""
+        start = self._clock()
+        # Set once the attempt is decided, so calls still queued for the rate limiter are not sent
+        cancel = threading.Event()
+        pending = {self._executor.submit(client.complete, prompt, max_tokens, cancel)}
+        
+        hedge_after = self._hedge_delay(client)
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(pending, timeout=hedge_after)
+            if not done:
+                with self._lock:
+                    self.hedges += 1
+                logger.debug(f"Hedging {client.provider} request after {hedge_after:.1f}s")
+                pending.add(self._executor.submit(client.complete, prompt, max_tokens, cancel))
+        
+        try:
+            error = None
+            while pending:
+                remaining = timeout - (self._clock() - start)
+                done, pending = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+                if not done:
+                    # Calls already sent run on until the SDK timeout; their usage is still recorded
+                    raise TimeoutError(f"{client.provider} did not answer within {timeout:.1f}s")
+                
+                for future in done:
+                    if future.exception() is None:
+                        response = future.result()
+                        if response.latency is not None:
+                            self._record_latency(client, response.latency)
+                        return response
+                    error = future.exception()
+                    if isinstance(error, BudgetExceeded) and pending:
+                        # A hedge the budget cannot cover; the first call may still answer
+                        error = None
+            
+            raise error
+        finally:
+            cancel.set()
+    
+    def _hedge_delay(self, client: LLMClient) -> Optional[float]:
+        """Latency after which an attempt is hedged, None if not hedging."""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies[id(client)])
+        if len(samples) < self.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return samples[index]
+    
+    def _record_latency(self, client: LLMClient, latency: float):
+        """Remember how long a successful request took once sent."""
+        with self._lock:
+            self._latencies[id(client)].append(latency)
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before the given retry."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    def _retryable(self, error: Exception) -> bool:
+        """Whether retrying the same provider may help."""
+        return getattr(error, 'status_code', None) not in self.NON_RETRYABLE_STATUS
@@ -1,7 +1,6 @@
 """Task scheduling for RSS fetching and digest generation."""
 import logging
 import asyncio
-from datetime import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
@@ -54,15 +53,28 @@ class AppScheduler:
         """Start all scheduled jobs."""
         
         # RSS fetch job
-        fetch_interval = self.config['scheduling']['fetch_interval_hours']
-        self.scheduler.add_job(
-            self._fetch_rss_job,
-            IntervalTrigger(hours=fetch_interval),
-            id='fetch_rss',
-            name='Fetch RSS feeds',
-            replace_existing=True
-        )
-        logger.info(f"Scheduled RSS fetch every {fetch_interval} hour(s)")
+        adaptive = self.config['scheduling'].get('adaptive_polling', {})
+        if adaptive.get('enabled', False):
+            # Tick often, but only poll the feeds that are due
+            tick_minutes = adaptive.get('tick_minutes', 5)
+            self.scheduler.add_job(
+                self._fetch_due_feeds_job,
+                IntervalTrigger(minutes=tick_minutes),
+                id='fetch_rss',
+                name='Fetch due RSS feeds',
+                replace_existing=True
+            )
+            logger.info(f"Scheduled adaptive RSS polling every {tick_minutes} minute(s)")
+        else:
+            fetch_interval = self.config['scheduling']['fetch_interval_hours']
+            self.scheduler.add_job(
+                self._fetch_rss_job,
+                IntervalTrigger(hours=fetch_interval),
+                id='fetch_rss',
+                name='Fetch RSS feeds',
+                replace_existing=True
+            )
+            logger.info(f"Scheduled RSS fetch every {fetch_interval} hour(s)")
         
         # Digest generation job
         digest_interval = self.config['scheduling']['digest_interval_hours']
@@ -88,6 +100,10 @@ class AppScheduler:
         )
         logger.info(f"Scheduled cleanup at {cleanup_time} daily")
         
+        # Embed newly fetched articles ahead of the digest
+        if self.fetcher.embedding_pipeline is not None:
+            self.fetcher.embedding_pipeline.start()
+        
         # Start scheduler
         self.scheduler.start()
         logger.info("Scheduler started with all jobs")
@@ -105,6 +121,18 @@ class AppScheduler:
         finally:
             db.close()
     
+    def _fetch_due_feeds_job(self):
+        """Job: Fetch RSS feeds whose adaptive poll time has come."""
+        db = self.db_manager.get_session()
+        
+        try:
+            new_count = self.fetcher.fetch_all(db, due_only=True)
+            logger.info(f"Adaptive RSS fetch complete: {new_count} new articles")
+        except Exception as e:
+            logger.error(f"Error in adaptive RSS fetch job: {e}")
+        finally:
+            db.close()
+    
     def _generate_digest_job(self):
         """Job: Generate and send digest."""
         logger.info("Starting digest generation...")
@@ -113,7 +141,8 @@ class AppScheduler:
         try:
             # Get pending articles (not shown yet, no feedback)
             pending = db.query(Article).filter(
-                Article.shown_to_user == False
+                Article.shown_to_user == False,
+                Article.duplicate_of == None
             ).all()
             
             if not pending:
@@ -134,36 +163,39 @@ class AppScheduler:
                 f"{len(liked)} liked, {len(disliked)} disliked"
             )
             
-            # Filter and rank articles
-            ranked = self.ranker.filter_and_rank_candidates(
-                db, pending, liked, disliked
-            )
-            
-            # Apply score threshold
             min_score = self.config['filtering'].get('min_score_to_show', 7.0)
-            filtered = [
-                (a, s, r) for a, s, r in ranked
-                if s >= min_score
-            ]
             
-            # Limit to articles per digest
-            max_articles = self.config['filtering']['articles_per_digest']
-            digest_articles = filtered[:max_articles]
-            
-            if digest_articles:
-                # Send digest asynchronously
-                asyncio.run(
-                    self.telegram_bot.send_digest(digest_articles)
+            if self.config['filtering'].get('streaming_digest', {}).get('enabled', False):
+                # Send (and mark) each article as soon as it clears the threshold
+                digest_articles, ranked = asyncio.run(
+                    self.telegram_bot.stream_digest(db, self.ranker, pending, liked, disliked)
+                )
+            else:
+                # Filter and rank articles
+                ranked = self.ranker.filter_and_rank_candidates(
+                    db, pending, liked, disliked
                 )
                 
-                # Mark articles as shown
-                now = datetime.utcnow()
-                for article, _, _ in digest_articles:
-                    article.shown_to_user = True
-                    article.shown_at = now
+                # Apply score threshold
+                filtered = [
+                    (a, s, r) for a, s, r in ranked
+                    if s >= min_score
+                ]
                 
-                db.commit()
+                # Limit to articles per digest
+                max_articles = self.config['filtering']['articles_per_digest']
+                digest_articles = filtered[:max_articles]
                 
+                if digest_articles:
+                    # Send digest asynchronously
+                    asyncio.run(
+                        self.telegram_bot.send_digest(digest_articles)
+                    )
+                    
+                    # Mark articles as shown
+                    self.ranker.retriever.mark_shown(db, [article for article, _, _ in digest_articles])
+            
+            if digest_articles:
                 # Log summary
                 scores_sent = [s for _, s, _ in digest_articles]
                 avg_score_sent = sum(scores_sent) / len(scores_sent)
@@ -246,4 +278,6 @@ class AppScheduler:
     def stop(self):
         """Stop scheduler."""
         self.scheduler.shutdown()
+        if self.fetcher.embedding_pipeline is not None:
+            self.fetcher.embedding_pipeline.stop()
         logger.info("Scheduler stopped")
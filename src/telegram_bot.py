@@ -1,5 +1,8 @@
 """Telegram bot interface."""
 import os
+import html
+import time
+import asyncio
 import logging
 from typing import Optional, List, Tuple
 from datetime import datetime
@@ -18,15 +21,30 @@ logger = logging.getLogger(__name__)
 class TelegramBot:
     """Telegram bot for article curation."""
     
-    def __init__(self, config: dict, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        config: dict,
+        db_manager: DatabaseManager,
+        preference_profile=None,
+        sender=None,
+        retriever=None
+    ):
         """Initialize Telegram bot.
         
         Args:
             config: Application configuration dictionary
             db_manager: Database manager instance
+            preference_profile: Optional PreferenceProfileManager updated
+                when feedback is recorded
+            sender: Object with an async send_message used for digests
+                (defaults to the bot; e.g. FakeTelegramSender offline)
+            retriever: Optional CandidateRetriever whose index flags are
+                updated when articles are shown outside a digest
         """
         self.config = config
         self.db_manager = db_manager
+        self.preference_profile = preference_profile
+        self.retriever = retriever
         
         # Get bot token and admin user ID
         token = os.getenv(config['telegram']['bot_token_env'])
@@ -41,6 +59,7 @@ class TelegramBot:
         
         # Create application
         self.app = Application.builder().token(token).build()
+        self.sender = sender or self.app.bot
         
         # Register handlers
         self._register_handlers()
@@ -144,6 +163,11 @@ class TelegramBot:
         try:
             stats = self.db_manager.get_stats(db)
             
+            from .embedding_cache import EmbeddingCache
+            cache = EmbeddingCache(self.config)
+            cache_stats = cache.stats()
+            cache.close()
+            
             stats_msg = (
                 "📊 Your Preference Stats\n\n"
                 f"👁️ Shown: {stats['shown_articles']} articles\n"  # ADDED
@@ -151,7 +175,10 @@ class TelegramBot:
                 f"👎 Disliked: {stats['disliked_articles']} articles\n"
                 f"📰 Total articles: {stats['total_articles']}\n"
                 f"🗑️ Cleaned up: {stats['total_deleted']} articles\n"
-                f"💾 Database size: {stats['db_size_mb']:.1f} MB\n\n"
+                f"💾 Database size: {stats['db_size_mb']:.1f} MB\n"
+                f"🧠 Embedding cache: {cache_stats['entries']} vectors, "
+                f"{cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                f"({cache_stats['hit_rate']:.0%}), {cache_stats['size_mb']:.1f} MB\n\n"
                 f"ℹ️ Shown articles won't be re-ranked in future digests"  # ADDED
             )
                         
@@ -239,6 +266,30 @@ class TelegramBot:
             min_score = self.config['filtering']['min_score_to_show']
             top_candidates = self.config['filtering']['top_candidates_for_llm']
             
+            # Check failing feeds
+            from .feed_health import FeedCircuitBreaker
+            feed_names = {f['url']: f['name'] for f in self.config.get('rss_feeds', [])}
+            open_circuits = FeedCircuitBreaker.open_circuits(db, datetime.utcnow())
+            feeds_msg = f"• Skipped (open circuit): {len(open_circuits)}\n"
+            for state in open_circuits[:10]:
+                name = html.escape(feed_names.get(state.feed_url, state.feed_url))
+                error = html.escape((state.last_error or '')[:80])
+                feeds_msg += (
+                    f"  – {name}: {state.consecutive_failures} failures, "
+                    f"retry {state.next_attempt_at.strftime('%m-%d %H:%M')} UTC\n"
+                    f"    <i>{error}</i>\n"
+                )
+            
+            # Check today's LLM spending
+            from .llm_budget import LLMBudget
+            budget = LLMBudget(self.config).status(db)
+            budget_msg = (
+                f"• Used today: {budget['day_tokens']:,} tokens, ${budget['day_cost']:.4f}\n"
+                f"• Left today: "
+                f"{'unlimited' if budget['tokens_left'] is None else format(budget['tokens_left'], ',')} tokens, "
+                f"{'unlimited' if budget['cost_left'] is None else '$' + format(budget['cost_left'], '.4f')}\n"
+            )
+            
             # Test LLM connectivity
             llm_status = "✅ OK"
             try:
@@ -247,7 +298,10 @@ class TelegramBot:
                     from .ranker import ArticleRanker
                     ranker = ArticleRanker(self.config, embedder)
                     # Try to rank one article
-                    score, reasoning = ranker.rank_article(db, test_article, [], [])
+                    try:
+                        score, reasoning = ranker.rank_article(db, test_article, [], [])
+                    finally:
+                        ranker.close()
                     llm_status = f"✅ OK (test score: {score:.1f})"
                 else:
                     llm_status = "⚠️ No articles to test"
@@ -275,11 +329,17 @@ class TelegramBot:
                 f"• Response length: {response_len}\n"
                 f"• Status: {llm_status}\n\n"
                 
+                "<b>LLM Budget:</b>\n"
+                f"{budget_msg}\n"
+                
                 "<b>Filtering Settings:</b>\n"
                 f"• Similarity threshold: {sim_threshold}\n"
                 f"• Min score to show: {min_score}\n"
                 f"• Top candidates for LLM: {top_candidates}\n\n"
                 
+                "<b>Feeds:</b>\n"
+                f"{feeds_msg}\n"
+                
                 "<b>Next Steps:</b>\n"
             )
             
@@ -472,6 +532,7 @@ class TelegramBot:
         from .database import Article, Feedback
         
         db = self.db_manager.get_session()
+        ranker = None
         try:
             # Initialize components
             embedder = Embedder(self.config)
@@ -479,7 +540,8 @@ class TelegramBot:
             
             # Get pending articles (not shown yet)
             pending = db.query(Article).filter(
-                Article.shown_to_user == False
+                Article.shown_to_user == False,
+                Article.duplicate_of == None
             ).all()
             
             if not pending:
@@ -499,35 +561,37 @@ class TelegramBot:
                 Feedback.rating == 'dislike'
             ).all()
             
-            # Filter and rank
-            ranked = ranker.filter_and_rank_candidates(
-                db, pending, liked, disliked
-            )
-            
             # Get config settings
             min_score = self.config['filtering'].get('min_score_to_show', 7.0)
             max_articles = self.config['filtering']['articles_per_digest']
             
-            # Apply score threshold
-            filtered = [
-                (a, s, r) for a, s, r in ranked
-                if s >= min_score
-            ]
-            
-            # Limit to articles per digest
-            digest_articles = filtered[:max_articles]
-            
-            if digest_articles:
-                await self.send_digest(digest_articles)
+            if self.config['filtering'].get('streaming_digest', {}).get('enabled', False):
+                # Send (and mark) each article as soon as it clears the threshold
+                digest_articles, ranked = await self.stream_digest(
+                    db, ranker, pending, liked, disliked
+                )
+            else:
+                # Filter and rank
+                ranked = ranker.filter_and_rank_candidates(
+                    db, pending, liked, disliked
+                )
                 
-                # Mark articles as shown
-                now = datetime.utcnow()
-                for article, _, _ in digest_articles:
-                    article.shown_to_user = True
-                    article.shown_at = now
+                # Apply score threshold
+                filtered = [
+                    (a, s, r) for a, s, r in ranked
+                    if s >= min_score
+                ]
                 
-                db.commit()
+                # Limit to articles per digest
+                digest_articles = filtered[:max_articles]
                 
+                if digest_articles:
+                    await self.send_digest(digest_articles)
+                    
+                    # Mark articles as shown
+                    ranker.retriever.mark_shown(db, [article for article, _, _ in digest_articles])
+            
+            if digest_articles:
                 await update.effective_message.reply_text(
                     f"✅ Digest sent!\n\n"
                     f"📬 Sent {len(digest_articles)} articles\n"
@@ -592,6 +656,8 @@ class TelegramBot:
                 parse_mode='HTML'
             )
         finally:
+            if ranker is not None:
+                ranker.close()
             db.close()
     
     async def cleanup_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -690,6 +756,15 @@ class TelegramBot:
                 
                 db.commit()
                 
+                # Keep the preference profile current (the digest reconciles
+                # it anyway if this fails)
+                if self.preference_profile is not None:
+                    try:
+                        self.preference_profile.record_feedback(db, article_id, action)
+                    except Exception as e:
+                        db.rollback()
+                        logger.warning(f"Could not update preference profile: {e}")
+                
                 # Show feedback in the button callback popup (non-intrusive)
                 emoji = "👍" if action == "like" else "👎"
                 await query.answer(
@@ -759,7 +834,7 @@ class TelegramBot:
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         try:
-            await self.app.bot.send_message(
+            await self.sender.send_message(
                 chat_id=self.admin_user_id,
                 text=message,
                 reply_markup=reply_markup,
@@ -781,25 +856,96 @@ class TelegramBot:
             logger.info("No articles to send in digest")
             return
         
-        # Send header
-        header = f"📬 <b>Article Digest</b> - {len(articles_with_scores)} articles\n"
-        header += f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+        await self._send_digest_header(len(articles_with_scores))
+        
+        # Send each article
+        for article, score, reasoning in articles_with_scores:
+            await self.send_article(article, score, reasoning)
+        
+        logger.info(f"Sent digest with {len(articles_with_scores)} articles")
+    
+    async def stream_digest(
+        self,
+        db,
+        ranker,
+        pending: List[Article],
+        liked: List[Article],
+        disliked: List[Article]
+    ) -> Tuple[List[Tuple[Article, float, str]], List[Tuple[Article, float, str]]]:
+        """Send articles as soon as they clear the threshold.
+        
+        Candidates are ranked in similarity order, a wave at a time, and
+        ranking stops once articles_per_digest articles were sent. Each
+        article is marked as shown right after it is sent.
+        
+        Args:
+            db: Database session
+            ranker: ArticleRanker
+            pending: Articles not shown yet
+            liked: User's liked articles
+            disliked: User's disliked articles
+        
+        Returns:
+            Tuple of (sent, ranked) lists of (article, score, reasoning);
+            ranked only covers the waves that were needed
+        """
+        filtering = self.config['filtering']
+        min_score = filtering.get('min_score_to_show', 7.0)
+        max_articles = filtering['articles_per_digest']
+        # Default: one round of concurrent requests, which takes about as
+        # long as a single request
+        wave_size = filtering.get('streaming_digest', {}).get('wave_size') or (
+            max(1, ranker.candidate_ranker.articles_per_prompt)
+            * max(1, ranker.candidate_ranker.max_concurrent_requests)
+        )
+        
+        ranking = ranker.iter_ranked_candidates(db, pending, liked, disliked, wave_size)
+        sent, ranked = [], []
+        started = time.monotonic()
+        try:
+            while len(sent) < max_articles:
+                # Rank off the event loop so the bot keeps answering meanwhile
+                item = await asyncio.to_thread(next, ranking, None)
+                if item is None:
+                    break
+                ranked.append(item)
+                
+                article, score, reasoning = item
+                if score < min_score:
+                    continue
+                if not sent:
+                    await self._send_digest_header()
+                    logger.info(f"First digest article sent {time.monotonic() - started:.1f}s after start")
+                
+                await self.send_article(article, score, reasoning)
+                ranker.retriever.mark_shown(db, [article])
+                sent.append(item)
+        finally:
+            # Skips the LLM calls for candidates not ranked yet
+            ranking.close()
+        
+        logger.info(
+            f"Streamed digest with {len(sent)} articles after ranking {len(ranked)} "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return sent, ranked
+    
+    async def _send_digest_header(self, count: Optional[int] = None):
+        """Send the digest header (with the article count, if known)."""
+        header = "📬 <b>Article Digest</b>"
+        if count is not None:
+            header += f" - {count} articles"
+        header += f"\n📅 {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
         header += "─" * 30
         
         try:
-            await self.app.bot.send_message(
+            await self.sender.send_message(
                 chat_id=self.admin_user_id,
                 text=header,
                 parse_mode='HTML'
             )
         except Exception as e:
             logger.error(f"Error sending digest header: {e}")
-        
-        # Send each article
-        for article, score, reasoning in articles_with_scores:
-            await self.send_article(article, score, reasoning)
-        
-        logger.info(f"Sent digest with {len(articles_with_scores)} articles")
 
     async def random_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /random command - show random unshown articles with balanced source selection."""
@@ -824,9 +970,10 @@ class TelegramBot:
             # Calculate cutoff date
             cutoff_date = datetime.utcnow() - timedelta(days=days)
             
-            # Query for all unshown articles from last N days
+            # Query for all unshown articles from last N days (one per story)
             all_candidates = db.query(Article).filter(
                 Article.shown_to_user == False,
+                Article.duplicate_of == None,
                 Article.published_at >= cutoff_date
             ).all()
             
@@ -859,12 +1006,10 @@ class TelegramBot:
             for article in selected_articles:
                 await self._send_article(update, article, db)
             
-            # Mark articles as shown
-            for article in selected_articles:
-                article.shown_to_user = True
-                article.shown_at = datetime.utcnow()
-            
-            db.commit()
+            # Mark articles as shown (and flag them in the shared index, if any)
+            from .candidate_retrieval import CandidateRetriever
+            retriever = self.retriever or CandidateRetriever(self.config, embedder=None)
+            retriever.mark_shown(db, selected_articles)
             logger.info(
                 f"Random command: sent {len(selected_articles)} articles with balanced selection\n"
                 f"  Source distribution: {dict(distribution)}"
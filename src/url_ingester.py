@@ -0,0 +1,209 @@
+"""Bulk ingestion of article URLs (e.g. an imported reading list)."""
+import csv
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from .database import Article
+from .feed_downloader import FeedDownloader
+from .html_cleaner import clean_html
+
+logger = logging.getLogger(__name__)
+
+
+def extract_article(page: bytes) -> Tuple[str, str]:
+    """Extract the title and cleaned main text of a web page.
+    
+    Runs in worker processes, so it must stay a module-level function.
+    
+    Args:
+        page: Raw page body
+    
+    Returns:
+        Tuple of (title, cleaned text)
+    """
+    from readability import Document
+    
+    doc = Document(page)
+    return doc.title(), clean_html(doc.summary())
+
+
+class URLIngester:
+    """Downloads, extracts and saves many article URLs in batches."""
+    
+    def __init__(self, config: dict, fetcher):
+        """Initialize URL ingester.
+        
+        Args:
+            config: Application configuration dictionary
+            fetcher: RSSFetcher used to hash and save articles
+        """
+        ingest_config = config.get('ingest', {})
+        self.batch_size = ingest_config.get('batch_size', 100)
+        self.workers = ingest_config.get('extract_workers', 2)
+        self.fetcher = fetcher
+        self.downloader = FeedDownloader(config)
+    
+    def ingest(
+        self,
+        db: Session,
+        urls: List[str],
+        source_name: str = "Manual",
+        report_path: Optional[str] = None
+    ) -> dict:
+        """Ingest a list of article URLs.
+        
+        Pages are downloaded concurrently over one pooled client,
+        readability extraction runs in a process pool, and each batch is
+        saved and committed together.
+        
+        Args:
+            db: Database session
+            urls: Article URLs
+            source_name: Source name for the articles
+            report_path: Optional CSV file for per-URL results
+        
+        Returns:
+            Dictionary with counts per result status
+        """
+        urls = list(dict.fromkeys(url.strip() for url in urls if url.strip()))
+        results = []
+        self.fetcher.near_duplicates.reset()
+        
+        pool = self._create_pool()
+        try:
+            for start in range(0, len(urls), self.batch_size):
+                batch = urls[start:start + self.batch_size]
+                results.extend(self._ingest_batch(db, batch, source_name, pool))
+                logger.info(
+                    f"Ingested {min(start + self.batch_size, len(urls))}/{len(urls)} URLs"
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        
+        if report_path:
+            self._write_report(report_path, results)
+        
+        summary = {'total': len(results), 'saved': 0, 'skipped': 0, 'failed': 0}
+        for result in results:
+            summary[result['status']] += 1
+        return summary
+    
+    def _ingest_batch(
+        self,
+        db: Session,
+        urls: List[str],
+        source_name: str,
+        pool: Optional[ProcessPoolExecutor]
+    ) -> List[dict]:
+        """Download, extract and save one batch of URLs."""
+        results = {url: {'url': url, 'status': 'failed', 'article_id': None, 'error': ''}
+                   for url in urls}
+        
+        known = self.fetcher._existing_values(db, Article.url, urls)
+        for url in known:
+            results[url].update(status='skipped', error='already saved')
+        
+        pending = [url for url in urls if url not in known]
+        downloads = self.downloader.download_all(pending)
+        
+        pages = []
+        for url in pending:
+            download = downloads[url]
+            if download['error']:
+                results[url]['error'] = download['error']
+            elif not download['content']:
+                results[url]['error'] = 'empty response'
+            else:
+                pages.append((url, download['content']))
+        
+        articles = []
+        for (url, _), extracted in zip(pages, self._extract_many([p for _, p in pages], pool)):
+            if isinstance(extracted, Exception):
+                results[url]['error'] = f"extraction failed: {extracted}"
+                continue
+            
+            title, content = extracted
+            articles.append({
+                'url': url,
+                'title': title,
+                'content': content,
+                'summary': content[:500] + '...' if len(content) > 500 else content,
+                'source': source_name,
+                'published_at': datetime.utcnow(),
+                'content_hash': self.fetcher._hash_content(url, title, content)
+            })
+        
+        # A failed save is reported per URL, not mistaken for duplicates
+        save_error = None
+        try:
+            saved_ids = self.fetcher._save_articles(db, articles)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error saving batch of {len(articles)} articles: {e}")
+            db.rollback()
+            self.fetcher.discard_unpublished_articles()
+            saved_ids = []
+            save_error = f"save failed: {e}"
+        else:
+            self.fetcher.publish_new_articles()
+        
+        id_by_url = {}
+        if saved_ids:
+            id_by_url = dict(
+                db.query(Article.url, Article.id).filter(Article.id.in_(saved_ids))
+            )
+        for article_data in articles:
+            url = article_data['url']
+            if save_error:
+                results[url]['error'] = save_error
+            elif url in id_by_url:
+                results[url].update(status='saved', article_id=id_by_url[url])
+            else:
+                results[url].update(status='skipped', error='duplicate content')
+        
+        return [results[url] for url in urls]
+    
+    def _extract_many(self, pages: List[bytes], pool: Optional[ProcessPoolExecutor]) -> list:
+        """Extract pages in order, returning an exception for failures."""
+        if pool is None:
+            return [self._extract_safely(page) for page in pages]
+        
+        futures = [pool.submit(extract_article, page) for page in pages]
+        extracted = []
+        for future in futures:
+            try:
+                extracted.append(future.result())
+            except Exception as e:
+                extracted.append(e)
+        return extracted
+    
+    @staticmethod
+    def _extract_safely(page: bytes):
+        """Extract a page in-process, returning an exception on failure."""
+        try:
+            return extract_article(page)
+        except Exception as e:
+            return e
+    
+    def _create_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Create the extraction process pool, if configured."""
+        if self.workers <= 1:
+            return None
+        # spawn, not fork: ingestion may run next to scheduler and bot threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    
+    @staticmethod
+    def _write_report(report_path: str, results: List[dict]):
+        """Write per-URL results as CSV."""
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['url', 'status', 'article_id', 'error'])
+            writer.writeheader()
+            writer.writerows(results)
+        logger.info(f"Ingest report written to {report_path}")
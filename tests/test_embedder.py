@@ -0,0 +1,375 @@
+"""Basic tests for Embedder and the components built on article vectors."""
+import hashlib
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from openai import BadRequestError
+from src.candidate_retrieval import CandidateRetriever
+from src.cleanup import ArticleCleanupManager
+from src.database import DatabaseManager, Article, Config, Feedback, PreferenceProfile
+from src.embedder import Embedder
+from src.embedding_pipeline import EmbeddingPipeline
+from src.local_ranker import LocalRanker
+from src.preference_profile import PreferenceProfileManager
+from src.similarity import profile_scores, similarity_scores
+
+
+def fake_vector(text: str) -> np.ndarray:
+    """Deterministic stand-in for an API embedding."""
+    digest = hashlib.sha256(text.encode()).digest()
+    return np.frombuffer(digest, dtype=np.uint8).astype(float)
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Configuration pointing at throwaway storage."""
+    return {
+        'embeddings': {'model': 'text-embedding-3-small', 'api_key_env': 'TEST_OPENAI_KEY',
+                       'pipeline': {'batch_size': 2, 'max_wait_seconds': 0.05},
+                       'cache': {'path': str(tmp_path / 'embedding_cache.db'), 'max_entries': 5}},
+        'chromadb': {'path': str(tmp_path / 'chroma'), 'collection_name': 'test'},
+        'database': {'path': str(tmp_path / 'test.db')}
+    }
+
+
+@pytest.fixture
+def db_manager(config):
+    """Create a throwaway database."""
+    manager = DatabaseManager(config)
+    manager.create_tables()
+    return manager
+
+
+class FakeEmbeddingsAPI:
+    """Answers embeddings.create locally and records each request."""
+    
+    def __init__(self, reject=()):
+        self.requests = []
+        self.reject = set(reject)
+    
+    def create(self, input, model):
+        inputs = [input] if isinstance(input, str) else list(input)
+        self.requests.append(inputs)
+        if self.reject.intersection(inputs):
+            raise BadRequestError(
+                "rejected", response=SimpleNamespace(request=None, status_code=400, headers={}),
+                body=None
+            )
+        # Return items out of order, as the API is allowed to
+        data = [SimpleNamespace(index=i, embedding=fake_vector(text).tolist())
+                for i, text in enumerate(inputs)]
+        return SimpleNamespace(data=data[::-1])
+
+
+@pytest.fixture
+def embedder(config, monkeypatch):
+    """Create an embedder whose API calls are answered locally."""
+    monkeypatch.setenv('TEST_OPENAI_KEY', 'test')
+    embedder = Embedder(config)
+    embedder.client = SimpleNamespace(embeddings=FakeEmbeddingsAPI())
+    return embedder
+
+
+def add_articles(db_manager, count, start=0):
+    """Insert articles and return their IDs."""
+    db = db_manager.get_session()
+    try:
+        articles = [
+            Article(url=f"https://example.com/{i}", title=f"Article {i}",
+                    content=f"Body of article {i}", source='Test', content_hash=f"h{i}")
+            for i in range(start, start + count)
+        ]
+        db.add_all(articles)
+        db.commit()
+        return [article.id for article in articles]
+    finally:
+        db.close()
+
+
+class TestEmbedder:
+    """Test Embedder functionality."""
+    
+    def test_embed_texts_packs_requests_and_keeps_order(self, embedder):
+        """Test that texts are batched by input count and token budget."""
+        embedder.max_batch_inputs = 4
+        embedder.max_batch_tokens = 1000
+        texts = [f"text {i}" for i in range(10)] + ['x' * 3000, 'y' * 3000]
+        
+        embeddings = embedder.embed_texts(texts)
+        
+        requests = embedder.client.embeddings.requests
+        assert [len(r) for r in requests] == [4, 4, 3, 1]
+        for text, embedding in zip(texts, embeddings):
+            assert np.array_equal(embedding, fake_vector(text))
+    
+    def test_rejected_input_only_fails_itself(self, embedder):
+        """Test that a rejected batch is split to isolate the bad input."""
+        embedder.client.embeddings.reject = {'bad'}
+        texts = ['a', 'b', 'bad', 'c']
+        
+        embeddings = embedder.embed_texts(texts)
+        
+        assert embeddings[2] is None
+        assert all(embeddings[i] is not None for i in (0, 1, 3))
+        assert len(embedder.client.embeddings.requests) < 8
+    
+    def test_get_article_embeddings_returns_matrix_and_missing(self, db_manager, embedder):
+        """Test bulk retrieval of stored vectors."""
+        ids = add_articles(db_manager, 3)
+        db = db_manager.get_session()
+        articles = db.query(Article).filter(Article.id.in_(ids[:2])).all()
+        embedder.store_article_embeddings(articles, embedder.embed_articles(articles))
+        db.close()
+        
+        matrix, id_to_row, missing = embedder.get_article_embeddings([ids[2], ids[1], ids[0], ids[1]])
+        
+        assert matrix.dtype == np.float32
+        assert matrix.shape == (2, 32)
+        assert set(id_to_row) == {ids[0], ids[1]}
+        assert missing == [ids[2]]
+        assert np.allclose(matrix[id_to_row[ids[1]]], fake_vector("Article 1\n\nBody of article 1"))
+
+
+class TestEmbeddingCache:
+    """Test the persistent embedding cache."""
+    
+    def test_reembedding_same_content_hits_cache(self, config, db_manager, embedder):
+        """Test that a re-fetched article is not sent to the API again."""
+        add_articles(db_manager, 3)
+        db = db_manager.get_session()
+        articles = db.query(Article).order_by(Article.id).all()
+        
+        first = embedder.embed_articles(articles)
+        embedder.embed_article(articles[0])
+        second = Embedder(config).embed_articles(articles)
+        db.close()
+        
+        assert sum(len(r) for r in embedder.client.embeddings.requests) == 3
+        for a, b in zip(first, second):
+            assert np.allclose(a, b)
+        stats = embedder.cache.stats()
+        assert (stats['entries'], stats['hits'], stats['misses']) == (3, 4, 3)
+    
+    def test_least_recently_used_entries_are_evicted(self, embedder):
+        """Test that the cache stays within max_entries."""
+        cache = embedder.cache
+        for i in range(5):
+            cache.put_many({f"h{i}": np.ones(4) * i}, 'm', 'p')
+            time.sleep(0.01)
+        cache.get_many(['h0'], 'm', 'p')
+        cache.put_many({'h5': np.ones(4)}, 'm', 'p')
+        
+        assert set(cache.get_many([f"h{i}" for i in range(6)], 'm', 'p')) == {'h0', 'h2', 'h3', 'h4', 'h5'}
+        assert cache.stats()['evictions'] == 1
+
+
+class TestEmbeddingPipeline:
+    """Test EmbeddingPipeline functionality."""
+    
+    def test_backfill_and_submitted_articles_are_embedded(self, config, db_manager, embedder):
+        """Test that pending and newly submitted articles get vectors once."""
+        backlog_ids = add_articles(db_manager, 3)
+        pipeline = EmbeddingPipeline(config, db_manager, embedder)
+        pipeline.start()
+        try:
+            new_ids = add_articles(db_manager, 3, start=3)
+            assert pipeline.submit(new_ids + backlog_ids) == 6
+            assert pipeline.wait_until_idle(timeout=10)
+        finally:
+            pipeline.stop()
+        
+        stored = embedder.collection.get(ids=[str(i) for i in backlog_ids + new_ids])
+        assert len(stored['ids']) == 6
+        assert sum(len(r) for r in embedder.client.embeddings.requests) == 6
+    
+    def test_submit_is_ignored_when_not_running(self, config, db_manager, embedder):
+        """Test that submitting without a worker does not queue anything."""
+        pipeline = EmbeddingPipeline(config, db_manager, embedder)
+        
+        assert pipeline.submit([1, 2, 3]) == 0
+        assert pipeline.queue.qsize() == 0
+
+
+class TestPreferenceProfile:
+    """Test the incrementally maintained preference profile."""
+    
+    def test_profile_scores_match_pairwise_and_follow_flips(self, config, db_manager, embedder):
+        """Test that profile scores equal the pairwise filter after rating changes."""
+        ids = add_articles(db_manager, 6)
+        db = db_manager.get_session()
+        articles = db.query(Article).order_by(Article.id).all()
+        embedder.store_article_embeddings(articles, embedder.embed_articles(articles))
+        pending, _, _ = embedder.get_article_embeddings(ids[4:])
+        profile = PreferenceProfileManager(config, embedder)
+        
+        def assert_matches(liked_ids, disliked_ids):
+            liked, _, _ = embedder.get_article_embeddings(liked_ids)
+            disliked, _, _ = embedder.get_article_embeddings(disliked_ids)
+            centroids = profile.centroids(db, liked_ids, disliked_ids)
+            assert np.allclose(
+                profile_scores(pending, *centroids),
+                similarity_scores(pending, liked, disliked, 1024)
+            )
+        
+        assert_matches(ids[:3], [ids[3]])
+        
+        # Flip a like to a dislike through the incremental path
+        profile.record_feedback(db, ids[0], 'dislike')
+        db.commit()
+        assert_matches(ids[1:3], [ids[0], ids[3]])
+        
+        # Drop a rating without telling the profile; sync reconciles it
+        assert_matches(ids[1:3], [ids[0]])
+        db.close()
+    
+    def test_profile_updates_from_two_sessions_are_not_lost(self, config, db_manager, embedder):
+        """Test that a session holding stale profile rows does not overwrite newer sums."""
+        ids = add_articles(db_manager, 3)
+        first, second = db_manager.get_session(), db_manager.get_session()
+        articles = first.query(Article).order_by(Article.id).all()
+        embedder.store_article_embeddings(articles, embedder.embed_articles(articles))
+        profile = PreferenceProfileManager(config, embedder)
+        
+        profile.record_feedback(first, ids[0], 'like')
+        # The other thread's session has loaded the profile before the next like
+        second.query(PreferenceProfile).all()
+        profile.record_feedback(first, ids[1], 'like')
+        profile.record_feedback(second, ids[2], 'like')
+        
+        liked, _, _ = embedder.get_article_embeddings(ids)
+        liked = liked / np.linalg.norm(liked, axis=1, keepdims=True)
+        stored = first.query(PreferenceProfile).populate_existing().filter(
+            PreferenceProfile.rating == 'like'
+        ).one()
+        assert stored.count == 3
+        assert np.allclose(np.frombuffer(stored.vector_sum), liked.sum(axis=0))
+        first.close()
+        second.close()
+    
+    def test_cleanup_updates_profile_in_its_single_commit(self, config, db_manager, embedder, monkeypatch):
+        """Test that a failed cleanup changes nothing and a successful one commits once."""
+        config['cleanup'] = {'retention': {
+            'neutral_articles_days': 365, 'disliked_articles_days': 365, 'liked_articles_days': 30,
+            'max_liked_articles': 100, 'max_disliked_articles': 100
+        }}
+        ids = add_articles(db_manager, 3)
+        db = db_manager.get_session()
+        articles = db.query(Article).order_by(Article.id).all()
+        embedder.store_article_embeddings(articles, embedder.embed_articles(articles))
+        articles[0].fetched_at = datetime.utcnow() - timedelta(days=60)
+        db.add_all(Feedback(article_id=article_id, user_id=1, rating='like') for article_id in ids[:2])
+        db.commit()
+        cleanup = ArticleCleanupManager(config, embedder)
+        cleanup.preference_profile.sync(db, ids[:2], [])
+        
+        def liked_count():
+            return db.query(PreferenceProfile).populate_existing().filter(
+                PreferenceProfile.rating == 'like'
+            ).one().count
+        
+        def fail(*args):
+            raise RuntimeError('disk full')
+        
+        monkeypatch.setattr(cleanup, '_log_cleanup', fail)
+        with pytest.raises(RuntimeError):
+            cleanup.run_cleanup(db)
+        assert db.get(Article, ids[0]) is not None
+        assert liked_count() == 2
+        assert embedder.stored_article_ids(ids) == set(ids)
+        
+        monkeypatch.undo()
+        commits = []
+        monkeypatch.setattr(db, 'commit', lambda original=db.commit: commits.append(1) or original())
+        assert cleanup.run_cleanup(db)['deleted'] == 1
+        assert len(commits) == 1
+        assert liked_count() == 1
+        assert embedder.stored_article_ids(ids) == set(ids[1:])
+        db.close()
+
+
+class TestLocalRanker:
+    """Test the local feedback-trained ranker."""
+    
+    def test_trains_persists_and_updates_incrementally(self, config, db_manager, embedder):
+        """Test training on feedback, reloading from disk and partial updates."""
+        config['local_ranker'] = {'model_path': config['database']['path'] + '.ranker',
+                                  'min_feedback': 4}
+        ids = add_articles(db_manager, 8)
+        db = db_manager.get_session()
+        articles = db.query(Article).order_by(Article.id).all()
+        embedder.store_article_embeddings(articles, embedder.embed_articles(articles))
+        db.add_all(
+            Feedback(article_id=article_id, user_id=1, rating='like' if i % 2 else 'dislike')
+            for i, article_id in enumerate(ids[:6])
+        )
+        db.commit()
+        
+        ranker = LocalRanker(config, embedder)
+        assert ranker.refresh(db) == 6
+        assert ranker.refresh(db) == 0
+        
+        reloaded = LocalRanker(config, embedder)
+        assert reloaded.ready and reloaded.samples == 6
+        ranked = reloaded.rank(articles)
+        assert [article.id for article, _, _ in ranked] == ids
+        assert all(0 <= score <= 10 for _, score, _ in ranked)
+        
+        db.add(Feedback(article_id=ids[6], user_id=1, rating='like'))
+        db.commit()
+        assert reloaded.refresh(db) == 1
+        assert reloaded.samples == 7
+        db.close()
+
+
+class TestCandidateRetriever:
+    """Test nearest-neighbour candidate retrieval."""
+    
+    def test_retrieves_unshown_pending_articles_from_the_index(self, config, db_manager, embedder):
+        """Test metadata filtering, flag backfill and repair, and the pool size bound."""
+        config['filtering'] = {'retrieval': {'mode': 'ann', 'results_per_query': 100,
+                                             'clusters': 2, 'recent_likes': 1}}
+        ids = add_articles(db_manager, 30)
+        db = db_manager.get_session()
+        articles = db.query(Article).order_by(Article.id).all()
+        for article in articles[:4]:
+            article.shown_to_user = True
+        db.add_all(Feedback(article_id=article_id, user_id=1, rating='like') for article_id in ids[:3])
+        db.commit()
+        # Stored before the flag existed; the first retrieval backfills it
+        embedder.collection.add(
+            ids=[str(i) for i in ids[:25]],
+            embeddings=[vector.tolist() for vector in embedder.embed_articles(articles[:25])],
+            metadatas=[{'article_id': i} for i in ids[:25]]
+        )
+        
+        retriever = CandidateRetriever(config, embedder)
+        assert retriever.enabled
+        liked, pending = articles[:3], articles[4:]
+        pool = retriever.retrieve(db, pending, liked)
+        # Shown articles are filtered out; recent ones missing from the index are embedded
+        assert set(pool) == set(ids[4:])
+        assert db.get(Config, CandidateRetriever.BACKFILL_KEY) is not None
+        
+        # Shown elsewhere after it was stored: returned once, then flagged
+        articles[4].shown_to_user = True
+        db.commit()
+        retriever.retrieve(db, articles[5:], liked)
+        assert embedder.collection.get(ids=[str(ids[4])])['metadatas'][0]['shown'] is True
+        
+        # 1 centroid + 2 cluster centroids + 1 recent like, 3 results each
+        retriever.results_per_query = 3
+        pool = retriever.retrieve(db, articles[5:], liked)
+        assert 0 < len(pool) <= 12 and set(pool) <= set(ids[5:])
+        assert all(vector.shape == (32,) for vector in pool.values())
+        
+        # Marking as shown flags the index too
+        retriever.mark_shown(db, [articles[5]])
+        assert articles[5].shown_to_user
+        assert embedder.collection.get(ids=[str(ids[5])])['metadatas'][0]['shown'] is True
+        
+        # Nothing to query with or nothing found: every article is scored instead
+        assert CandidateRetriever(config, embedder).retrieve(db, pending, []) is None
+        assert retriever.retrieve(db, [], liked) is None
+        db.close()
@@ -0,0 +1,347 @@
+"""Basic tests for RSSFetcher and its helpers."""
+import asyncio
+import csv
+from datetime import datetime, timedelta
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import insert
+from src.database import DatabaseManager, Article, FeedState
+from src.feed_downloader import FeedDownloader
+from src.feed_schedule import FeedSchedulePolicy
+from src.html_cleaner import HTMLCleaner, clean_html, _soup_text, _normalize_whitespace
+from src.fetcher import RSSFetcher
+from src.url_ingester import URLIngester
+
+FEED_XML = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Test</title>
+<item><title>First</title><link>https://example.com/1</link>
+<description>&lt;p&gt;Hello &lt;b&gt;world&lt;/b&gt;&lt;/p&gt;</description></item>
+<item><title>Second</title><link>https://example.com/2</link>
+<description>Plain text body</description></item>
+</channel></rss>"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """Serves FEED_XML with an ETag and honours If-None-Match."""
+    
+    requests_seen = []
+    
+    def do_GET(self):
+        FeedHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(FEED_XML)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    """Run a local feed server for the duration of a test."""
+    FeedHandler.requests_seen = []
+    server = HTTPServer(('127.0.0.1', 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/feed"
+    server.shutdown()
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Create a throwaway database session."""
+    manager = DatabaseManager({'database': {'path': str(tmp_path / 'test.db')}})
+    manager.create_tables()
+    session = manager.get_session()
+    yield session
+    session.close()
+
+
+class TestFeedDownloader:
+    """Test FeedDownloader functionality."""
+    
+    @pytest.fixture
+    def downloader(self):
+        """Create a downloader with short timeouts."""
+        return FeedDownloader({'fetching': {'timeout_seconds': 2, 'connect_timeout_seconds': 1}})
+    
+    def test_download_errors_are_captured(self, downloader):
+        """Test that a failing feed does not raise."""
+        url = "http://127.0.0.1:9/feed"
+        results = downloader.download_all([url])
+        
+        assert results[url]['content'] is None
+        assert results[url]['error']
+    
+    def test_download_inside_running_loop(self, downloader):
+        """Test that downloading works when called from async code."""
+        url = "http://127.0.0.1:9/feed"
+        
+        async def call_from_loop():
+            return downloader.download_all([url])
+        
+        results = asyncio.run(call_from_loop())
+        assert url in results
+
+
+class TestHTMLCleaner:
+    """Test HTML cleaning fast path and process pool."""
+    
+    SAMPLES = [
+        '<p>The <a href="https://x.com/?a=1&amp;b=2">model</a> beats rivals&#8217; scores.</p>',
+        '<div>x</div>\t<div>y</div>\n<pre>  keep\t it </pre>',
+        '<p>Text</p><script>var x = 1;</script><style>p {}</style>',
+        '</p>leading end tag',
+        'plain   text &amp; entities &copy;',
+        '<ul><li>one<li>two</ul> trailing &',
+        '<p>x<rt>y</rt></p>',
+        '<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby>字 <rtc>z</rtc>',
+    ]
+    
+    def test_output_matches_beautifulsoup(self):
+        """Test that cleaned text is identical to the BeautifulSoup cleaner."""
+        for html in self.SAMPLES:
+            assert clean_html(html) == _normalize_whitespace(_soup_text(html))
+    
+    def test_process_pool_preserves_order(self):
+        """Test batch cleaning in a process pool."""
+        cleaner = HTMLCleaner({'fetching': {'html_workers': 2, 'html_pool_min_batch': 1}})
+        try:
+            assert cleaner.clean_many(self.SAMPLES) == [clean_html(h) for h in self.SAMPLES]
+        finally:
+            cleaner.shutdown()
+
+
+class TestFeedSchedulePolicy:
+    """Test adaptive polling intervals."""
+    
+    @pytest.fixture
+    def policy(self):
+        """Create a policy with 15 minute / 24 hour bounds."""
+        return FeedSchedulePolicy({'scheduling': {'fetch_interval_hours': 1}})
+    
+    def test_fast_feed_polled_more_often(self, policy):
+        """Test that feeds publishing often get shorter intervals."""
+        start = datetime(2024, 1, 1)
+        fast, slow = FeedState(feed_url='fast'), FeedState(feed_url='slow')
+        policy.record_poll(fast, 20, start, [start - timedelta(minutes=10 * i) for i in range(20)])
+        policy.record_poll(slow, 5, start, [start - timedelta(days=7 * i) for i in range(5)])
+        
+        assert policy.poll_interval(fast) == timedelta(minutes=15)
+        assert policy.poll_interval(slow) == timedelta(hours=24)
+        assert not policy.is_due(fast, start)
+        assert policy.is_due(fast, start + timedelta(minutes=15))
+    
+    def test_silent_feed_backs_off(self, policy):
+        """Test that a feed that stops publishing is polled less often."""
+        now = datetime(2024, 1, 1)
+        state = FeedState(feed_url='quiet')
+        policy.record_poll(state, 10, now, [now - timedelta(hours=i) for i in range(10)])
+        first_interval = policy.poll_interval(state)
+        
+        for _ in range(10):
+            now = state.next_poll_at
+            policy.record_poll(state, 0, now)
+        
+        assert policy.poll_interval(state) > first_interval
+
+
+class TestRSSFetcher:
+    """Test RSSFetcher functionality."""
+    
+    def test_fetch_all_saves_articles(self, db, feed_server):
+        """Test that entries from a downloaded feed are saved."""
+        fetcher = RSSFetcher({'rss_feeds': [{'url': feed_server, 'name': 'Local'}]})
+        
+        assert fetcher.fetch_all(db) == 2
+        article = db.query(Article).filter(Article.url == 'https://example.com/1').one()
+        assert article.content == 'Hello world'
+    
+    def test_conditional_fetch_skips_unchanged_feed(self, db, feed_server):
+        """Test that a 304 response skips parsing and keeps state."""
+        fetcher = RSSFetcher({'rss_feeds': [{'url': feed_server, 'name': 'Local'}]})
+        
+        fetcher.fetch_all(db)
+        assert fetcher.fetch_all(db) == 0
+        
+        assert FeedHandler.requests_seen[-1].get('If-None-Match') == '"v1"'
+        state = db.query(FeedState).filter(FeedState.feed_url == feed_server).one()
+        assert state.etag == '"v1"'
+        assert state.last_status == 304
+    
+    def test_failed_save_keeps_validators_and_earlier_rows(self, db, feed_server, monkeypatch):
+        """Test that entries lost to a save error are fetched again next time."""
+        fetcher = RSSFetcher({'rss_feeds': [{'url': feed_server, 'name': 'Local'}]})
+        earlier_id, = fetcher._save_articles(db, [{
+            'url': 'https://other.example/1', 'title': 'Other', 'content': 'Body', 'summary': '',
+            'source': 'Other', 'published_at': None, 'content_hash': 'other'
+        }])
+        
+        # Invalid SQL, so the bulk insert raises
+        monkeypatch.setattr('src.fetcher.insert', lambda table: insert(table).prefix_with('BROKEN'))
+        assert fetcher.fetch_all(db) == 0
+        state = db.query(FeedState).filter(FeedState.feed_url == feed_server).one()
+        assert state.etag is None and state.newest_entry_id is None
+        assert state.consecutive_failures == 1
+        assert db.query(Article).filter(Article.id == earlier_id).count() == 1
+        
+        monkeypatch.undo()
+        assert fetcher.fetch_all(db) == 2
+        assert FeedHandler.requests_seen[-1].get('If-None-Match') is None
+    
+    def test_failed_commit_does_not_publish_rolled_back_articles(self, db, feed_server, monkeypatch):
+        """Test that IDs from a rolled-back fetch never reach the embedding pipeline."""
+        fetcher = RSSFetcher({'rss_feeds': [{'url': feed_server, 'name': 'Local'}]})
+        submitted = []
+        fetcher.embedding_pipeline = SimpleNamespace(submit=submitted.append)
+        
+        def fail():
+            raise RuntimeError('disk I/O error')
+        
+        monkeypatch.setattr(db, 'commit', fail)
+        with pytest.raises(RuntimeError):
+            fetcher.fetch_all(db)
+        assert fetcher._unpublished_ids == []
+        assert db.query(Article).count() == 0
+        
+        monkeypatch.undo()
+        assert fetcher.fetch_all(db) == 2
+        assert submitted == [[article.id for article in db.query(Article).order_by(Article.id)]]
+    
+    def test_failing_feed_opens_circuit(self, db):
+        """Test that a feed is skipped after repeated failures."""
+        url = "http://127.0.0.1:9/feed"
+        fetcher = RSSFetcher({
+            'rss_feeds': [{'url': url, 'name': 'Dead'}],
+            'fetching': {'timeout_seconds': 2, 'connect_timeout_seconds': 1}
+        })
+        
+        fetcher.fetch_all(db)
+        state = db.query(FeedState).filter(FeedState.feed_url == url).one()
+        assert state.consecutive_failures == 1
+        assert state.next_attempt_at is None
+        
+        fetcher.fetch_all(db)
+        assert state.consecutive_failures == 2
+        assert state.next_attempt_at > datetime.utcnow()
+        
+        fetcher.fetch_all(db)
+        assert state.consecutive_failures == 2
+        assert state.last_error
+    
+    def test_save_articles_skips_duplicates(self, db):
+        """Test bulk save against existing rows and in-batch duplicates."""
+        fetcher = RSSFetcher({'rss_feeds': []})
+        
+        def article(url, content_hash):
+            return {'url': url, 'title': 'T', 'content': 'C', 'summary': 'C',
+                    'source': 'S', 'published_at': None, 'content_hash': content_hash}
+        
+        first_ids = fetcher._save_articles(db, [article('https://a', 'h1')])
+        new_ids = fetcher._save_articles(db, [
+            article('https://a', 'h9'),   # known URL
+            article('https://b', 'h1'),   # known hash
+            article('https://c', 'h3'),
+            article('https://c', 'h4'),   # duplicate within batch
+        ])
+        
+        assert len(first_ids) == 1
+        assert len(new_ids) == 1
+        saved = db.query(Article).filter(Article.id == new_ids[0]).one()
+        assert saved.url == 'https://c'
+        assert saved.fetched_at is not None
+        assert saved.shown_to_user is False
+    
+    def test_incremental_fetch_stops_at_seen_entry(self):
+        """Test that only entries newer than the last seen one are processed."""
+        fetcher = RSSFetcher({'rss_feeds': []})
+        entries = [
+            {'id': 'c', 'published_parsed': (2024, 1, 3, 0, 0, 0)},
+            {'id': 'b', 'published_parsed': (2024, 1, 2, 0, 0, 0)},
+            {'id': 'a', 'published_parsed': (2024, 1, 1, 0, 0, 0)},
+        ]
+        
+        assert fetcher._unseen_entries(entries, 'b') == entries[:1]
+        assert fetcher._unseen_entries(entries, None) == entries
+        # Oldest-first feeds are always processed in full
+        assert fetcher._unseen_entries(entries[::-1], 'a') == entries[::-1]
+    
+    def test_near_duplicates_grouped_into_story(self, db):
+        """Test that the same story from two sources gets one representative."""
+        fetcher = RSSFetcher({'rss_feeds': []})
+        story = ' '.join(f"Paragraph {i} of the launch coverage with detail number {i * 7}." for i in range(40))
+        
+        def article(url, title, content):
+            return {'url': url, 'title': title, 'content': content, 'summary': '',
+                    'source': url, 'published_at': None,
+                    'content_hash': fetcher._hash_content(url, title, content)}
+        
+        first_id, = fetcher._save_articles(db, [article('https://a/1', 'New model launched', story)])
+        second_id, other_id = fetcher._save_articles(db, [
+            article('https://b/1', 'New model launched', story + ' Reporting by the wire desk.'),
+            article('https://c/1', 'Council passes budget', 'The city council approved the budget for parks and roads.'),
+        ])
+        
+        assert db.get(Article, second_id).duplicate_of == first_id
+        assert db.get(Article, other_id).duplicate_of is None
+        assert db.get(Article, first_id).duplicate_of is None
+
+
+class TestURLIngester:
+    """Test URLIngester functionality."""
+    
+    def test_ingest_reports_every_url(self, db, tmp_path):
+        """Test that known and unreachable URLs are reported, not raised."""
+        config = {'fetching': {'timeout_seconds': 2, 'connect_timeout_seconds': 1},
+                  'ingest': {'extract_workers': 0}}
+        fetcher = RSSFetcher(config)
+        fetcher._save_articles(db, [{
+            'url': 'https://example.com/known', 'title': 'Known', 'content': 'Body',
+            'summary': 'Body', 'source': 'Manual', 'published_at': None,
+            'content_hash': fetcher._hash_content('https://example.com/known', 'Known', 'Body')
+        }])
+        db.commit()
+        
+        report_path = tmp_path / 'report.csv'
+        summary = URLIngester(config, fetcher).ingest(
+            db, ['https://example.com/known\n', 'http://127.0.0.1:9/gone', ''],
+            report_path=str(report_path)
+        )
+        
+        assert summary == {'total': 2, 'saved': 0, 'skipped': 1, 'failed': 1}
+        report = report_path.read_text().splitlines()
+        assert report[0] == 'url,status,article_id,error'
+        assert report[1].startswith('https://example.com/known,skipped')
+        assert report[2].startswith('http://127.0.0.1:9/gone,failed')
+    
+    def test_failed_save_is_reported_as_failure(self, db, tmp_path, monkeypatch):
+        """Test that URLs lost to a save error are not reported as duplicates."""
+        config = {'ingest': {'extract_workers': 0}}
+        fetcher = RSSFetcher(config)
+        ingester = URLIngester(config, fetcher)
+        urls = ['https://example.com/a', 'https://example.com/b']
+        monkeypatch.setattr(ingester.downloader, 'download_all', lambda pending: {
+            url: {'error': None, 'content': b'<html></html>'} for url in pending
+        })
+        monkeypatch.setattr(ingester, '_extract_many', lambda pages, pool: [
+            (f"Title {i}", f"Body {i}") for i in range(len(pages))
+        ])
+        monkeypatch.setattr('src.fetcher.insert', lambda table: insert(table).prefix_with('BROKEN'))
+        
+        report_path = tmp_path / 'report.csv'
+        summary = ingester.ingest(db, urls, report_path=str(report_path))
+        
+        assert summary == {'total': 2, 'saved': 0, 'skipped': 0, 'failed': 2}
+        with open(report_path, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['status'] for row in rows] == ['failed', 'failed']
+        assert all(row['error'].startswith('save failed: ') for row in rows)
+        assert fetcher._unpublished_ids == []
@@ -0,0 +1,28 @@
+"""Smoke test for the offline pipeline benchmark."""
+import yaml
+from benchmarks import pipeline
+
+
+def test_benchmark_runs_every_stage_offline():
+    """Test that a tiny corpus goes through all stages with the fakes."""
+    args = pipeline.parse_args([
+        '--articles', '60', '--feedback', '12', '--feeds', '3', '--llm-latency', '0'
+    ])
+    with open(args.config, 'r', encoding='utf-8') as f:
+        base_config = yaml.safe_load(f)
+    
+    result = pipeline.run(args, base_config)
+    
+    assert set(result['stages']) == set(pipeline.STAGES)
+    assert result['fetched'] == 60
+    assert result['calls']['feed_requests'] == 3
+    assert result['calls']['embedded_texts'] == 60
+    assert result['calls']['llm_requests'] > 0
+    # Header plus one message per digest article
+    assert result['digest'] > 0
+    assert result['calls']['telegram_messages'] == 1 + result['digest']
+    
+    # The same corpus against itself is never a regression
+    assert pipeline.compare(result, result, tolerance=0.0) == []
+    slower = {**result, 'stages': {'rank': {'seconds': result['stages']['rank']['seconds'] + 1}}}
+    assert pipeline.compare(slower, result, tolerance=0.25)
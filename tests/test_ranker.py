@@ -1,8 +1,64 @@
 """Basic tests for ArticleRanker."""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+import numpy as np
 import pytest
-from datetime import datetime
 from src.ranker import ArticleRanker
-from src.database import Article
+from src.database import Article, DatabaseManager, Feedback, LLMRanking, LLMUsage
+from src.fakes import FakeTelegramSender
+from src.llm_budget import LLMBudget, Usage
+from src.llm_client import LLMResponse, RequestCancelled
+from src.ranking_cache import RankingCache
+from src.rate_limiter import RateLimiter
+from src.resilient_llm import LLMUnavailable, ResilientLLM
+from src.similarity import similarity_scores
+from src.telegram_bot import TelegramBot
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """Ranker configuration with throwaway storage and a test API key."""
+    monkeypatch.setenv('TEST_OPENAI_KEY', 'test')
+    return {
+        'llm': {'provider': 'chatgpt', 'articles_per_prompt': 1, 'max_concurrent_requests': 1,
+                'chatgpt': {'model': 'test-model', 'api_key_env': 'TEST_OPENAI_KEY'}},
+        'llm_context': {'max_liked_examples': 2, 'max_disliked_examples': 2},
+        'filtering': {'top_candidates_for_llm': 6},
+        'database': {'path': str(tmp_path / 'test.db')}
+    }
+
+
+@pytest.fixture
+def db_manager(config):
+    """Create a throwaway database."""
+    manager = DatabaseManager(config)
+    manager.create_tables()
+    return manager
+
+
+@pytest.fixture
+def db(db_manager):
+    """Create a throwaway database session."""
+    session = db_manager.get_session()
+    yield session
+    session.close()
+
+
+def add_articles(db, count: int) -> List[Article]:
+    """Insert articles titled 'Article <i>' and return them."""
+    articles = [
+        Article(url=f"https://example.com/{i}", title=f"Article {i}", content=f"Body {i}",
+                source='Test', content_hash=f"h{i}")
+        for i in range(count)
+    ]
+    db.add_all(articles)
+    db.commit()
+    return articles
 
 
 class TestArticleRanker:
@@ -22,17 +78,29 @@ class TestArticleRanker:
             content_hash="abc123"
         )
     
-    def test_parse_response(self):
-        """Test LLM response parsing."""
-        # This would need proper mocking of the ranker
-        # For now, just a placeholder test
-        assert True
+    def test_parse_response(self, config, db, monkeypatch):
+        """Test LLM response parsing and that unscored answers are not stored."""
+        config['local_ranker'] = {'enabled': False}
+        ranker = ArticleRanker(config, embedder=None)
+        assert ranker._parse_response("SCORE: 12\nREASONING: great") == (10.0, 'great')
+        assert ranker._parse_response("SCORE: high\nREASONING: great") is None
+        assert ranker._parse_response("Looks relevant to me.") is None
+        
+        articles = add_articles(db, 2)
+        monkeypatch.setattr(ranker, '_filter_by_similarity', lambda *args: articles)
+        answers = {'0': "SCORE: 8\nREASONING: ok", '1': "I would rate this highly."}
+        monkeypatch.setattr(
+            ranker.llm.clients[0], '_complete_chatgpt',
+            lambda prompt, max_tokens: LLMResponse(answers[prompt.split('Title: Article ')[1][0]])
+        )
+        
+        ranked = ranker.filter_and_rank_candidates(db, articles, [], [])
+        
+        assert [(a.title, s) for a, s, _ in ranked] == [('Article 0', 8.0)]
+        assert [r.article_id for r in db.query(LLMRanking)] == [articles[0].id]
     
     def test_cosine_similarity(self):
         """Test cosine similarity calculation."""
-        import numpy as np
-        from src.ranker import ArticleRanker
-        
         vec1 = np.array([1, 0, 0])
         vec2 = np.array([1, 0, 0])
         
@@ -42,6 +110,351 @@ class TestArticleRanker:
         vec3 = np.array([0, 1, 0])
         similarity = ArticleRanker._cosine_similarity(vec1, vec3)
         assert similarity == 0.0
+    
+    def test_similarity_scores_match_pairwise_cosine(self):
+        """Test that the vectorised filter score equals the pairwise average."""
+        rng = np.random.default_rng(0)
+        pending = rng.normal(size=(7, 16)).astype(np.float32)
+        pending[3] = 0
+        liked = rng.normal(size=(5, 16)).astype(np.float32)
+        disliked = rng.normal(size=(3, 16)).astype(np.float32)
+        
+        expected = [
+            np.mean([ArticleRanker._cosine_similarity(p, l) for l in liked])
+            - 0.3 * np.mean([ArticleRanker._cosine_similarity(p, d) for d in disliked])
+            for p in pending
+        ]
+        
+        scores = similarity_scores(pending, liked, disliked, chunk_size=2)
+        assert np.allclose(scores, expected, atol=1e-9)
+        
+        no_dislikes = similarity_scores(pending, liked, np.zeros((0, 0)))
+        assert np.allclose(no_dislikes, [
+            np.mean([ArticleRanker._cosine_similarity(p, l) for l in liked]) for p in pending
+        ])
+    
+    def test_rate_limiter_waits_for_request_and_token_budgets(self):
+        """Test that the limiter delays calls until they fit the window."""
+        now = [0.0]
+        sleeps = []
+        
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        
+        limiter = RateLimiter(2, 1000, clock=lambda: now[0], sleep=sleep)
+        assert limiter.acquire(100) == 0
+        now[0] = 10.0
+        assert limiter.acquire(100) == 0
+        
+        # Third request in the minute waits for the first to expire
+        assert limiter.acquire(100) == pytest.approx(50.0)
+        
+        # Token budget: 950 more tokens only fit once both earlier requests expire
+        assert limiter.acquire(950) == pytest.approx(60.0)
+        assert sleeps == [pytest.approx(50.0), pytest.approx(60.0)]
+    
+    def test_rate_limiter_shared_per_provider_and_model(self, config):
+        """Test that every client of one model draws from the same window."""
+        first, second = ArticleRanker(config, embedder=None), ArticleRanker(config, embedder=None)
+        assert first.llm.clients[0].rate_limiter is second.llm.clients[0].rate_limiter
+        assert RateLimiter.shared('chatgpt', 'other-model') is not first.llm.clients[0].rate_limiter
+        first.close()
+        second.close()
+    
+    def test_candidates_ranked_concurrently_and_saved_together(self, config, db, monkeypatch):
+        """Test concurrent LLM calls with results stored in one batch."""
+        config['llm']['max_concurrent_requests'] = 3
+        articles = add_articles(db, 6)
+        
+        ranker = ArticleRanker(config, embedder=None)
+        monkeypatch.setattr(ranker, '_filter_by_similarity', lambda *args: articles)
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+        
+        def fake_query(prompt, llm=None):
+            with lock:
+                in_flight.append(prompt)
+                peak.append(len(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.remove(prompt)
+            return float(prompt.split('Title: Article ')[1][0]), "ok", None
+        
+        monkeypatch.setattr(ranker, '_query_llm', fake_query)
+        commits = []
+        monkeypatch.setattr(db, 'commit', lambda original=db.commit: commits.append(1) or original())
+        
+        ranked = ranker.filter_and_rank_candidates(db, articles, [], [])
+        
+        assert [score for _, score, _ in ranked] == [5.0, 4.0, 3.0, 2.0, 1.0, 0.0]
+        assert max(peak) == 3
+        assert len(commits) == 1
+        assert db.query(LLMRanking).count() == 6
+    
+    def test_batched_prompt_results_mapped_back_with_fallback(self, config, db, monkeypatch):
+        """Test JSON batch parsing and per-article fallback for missed articles."""
+        config['llm']['articles_per_prompt'] = 3
+        ranker = ArticleRanker(config, embedder=None)
+        # IDs 1-5 in the fresh database
+        articles = add_articles(db, 5)
+        batch_prompts = []
+        
+        def fake_complete(prompt, max_tokens=None):
+            batch_prompts.append(prompt)
+            if 'ID: 1\n' in prompt:
+                # Article 3 is missing; unknown, duplicate and malformed entries are ignored
+                return LLMResponse("Here you go:\n" + json.dumps([
+                    {"id": 1, "score": 12, "reasoning": "Great"},
+                    {"id": 2, "score": "4.5", "reasoning": "Meh"},
+                    {"id": 2, "score": 9, "reasoning": "Duplicate"},
+                    {"id": 99, "score": 9, "reasoning": "Unknown"},
+                    {"id": 3, "score": "n/a"}
+                ]))
+            return LLMResponse("not json")
+        
+        singles = []
+        monkeypatch.setattr(ranker.llm, 'complete', fake_complete)
+        monkeypatch.setattr(
+            ranker, '_query_llm', lambda prompt, llm=None: singles.append(prompt) or (1.0, "single", None)
+        )
+        
+        ranked = ranker.candidate_ranker.rank(articles, [], [])
+        
+        assert len(batch_prompts) == 2
+        assert '"reasoning"' in batch_prompts[0]
+        assert [(a.id, score, reasoning) for a, score, reasoning in ranked] == [
+            (1, 10.0, "Great"), (2, 4.5, "Meh"),
+            (3, 1.0, "single"), (4, 1.0, "single"), (5, 1.0, "single")
+        ]
+        assert len(singles) == 3
+    
+    def test_ranking_cache_reuses_scores_until_feedback_changes(self, config, db):
+        """Test that stored rankings are reused only while still valid."""
+        config['llm']['ranking_cache'] = {'max_feedback_changes': 1}
+        articles = add_articles(db, 4)
+        liked = articles[:1]
+        pending = articles[1:]
+        fingerprint = RankingCache.fingerprint(liked, [])
+        an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+        db.add_all([
+            Feedback(article_id=liked[0].id, user_id=1, rating='like',
+                     created_at=an_hour_ago - timedelta(hours=1)),
+            LLMRanking(article_id=pending[0].id, provider='chatgpt', model='m', score=4.0,
+                       reasoning='old', prompt_version='v', feedback_fingerprint=fingerprint,
+                       created_at=an_hour_ago),
+            # Ranked without feedback context (e.g. /debug) - never reused
+            LLMRanking(article_id=pending[1].id, provider='chatgpt', model='m', score=9.0,
+                       reasoning='debug', prompt_version='v', created_at=an_hour_ago),
+            LLMRanking(article_id=pending[2].id, provider='chatgpt', model='m', score=6.0,
+                       reasoning='stale', prompt_version='v', feedback_fingerprint=fingerprint,
+                       created_at=datetime.utcnow() - timedelta(days=10))
+        ])
+        db.commit()
+        cache = RankingCache(config)
+        
+        assert set(cache.lookup(db, pending, 'm', 'v', fingerprint)) == {pending[0].id}
+        assert cache.lookup(db, pending, 'other-model', 'v', fingerprint) == {}
+        assert cache.lookup(db, pending, 'm', 'v2', fingerprint) == {}
+        
+        # One new rating is tolerated, a second one invalidates the score
+        db.add(Feedback(article_id=pending[2].id, user_id=1, rating='like'))
+        db.commit()
+        new_fingerprint = RankingCache.fingerprint(liked + [pending[2]], [])
+        assert set(cache.lookup(db, pending, 'm', 'v', new_fingerprint)) == {pending[0].id}
+        
+        db.add(Feedback(article_id=pending[1].id, user_id=1, rating='dislike'))
+        db.commit()
+        newer_fingerprint = RankingCache.fingerprint(liked + [pending[2]], [pending[1]])
+        assert cache.lookup(db, pending, 'm', 'v', newer_fingerprint) == {}
+    
+    def test_cascade_escalates_top_and_uncertain_candidates(self, config, db, monkeypatch):
+        """Test that only the top/uncertain cheap results reach the main model."""
+        config['llm']['chatgpt']['model'] = 'premium'
+        config['llm']['cascade'] = {'enabled': True, 'cheap_tier': 'llm', 'cheap_model': 'mini',
+                                    'escalate_top_n': 1, 'uncertainty_band': 0.5}
+        config['filtering']['min_score_to_show'] = 7.0
+        articles = add_articles(db, 5)
+        
+        ranker = ArticleRanker(config, embedder=None)
+        monkeypatch.setattr(ranker, '_filter_by_similarity', lambda *args: articles)
+        cheap_scores = {0: 9.0, 1: 7.3, 2: 3.0, 3: 6.6, 4: 1.0}
+        premium_calls = []
+        
+        def fake_client(model, answer):
+            def complete(prompt, max_tokens=None):
+                index = int(prompt.split('Title: Article ')[1][0])
+                return LLMResponse(f"SCORE: {answer(index)}\nREASONING: {model}")
+            return SimpleNamespace(provider='chatgpt', model=model, max_tokens=500, complete=complete)
+        
+        ranker.cheap_llm = fake_client('mini', lambda i: cheap_scores[i])
+        ranker.llm = fake_client('premium', lambda i: premium_calls.append(i) or 5.0)
+        
+        ranked = ranker.filter_and_rank_candidates(db, articles, [], [])
+        
+        # Top 1 (article 0) and the two within 0.5 of 7.0 (articles 1 and 3)
+        assert sorted(premium_calls) == [0, 1, 3]
+        assert {a.title: (s, r) for a, s, r in ranked} == {
+            'Article 0': (5.0, 'premium'), 'Article 1': (5.0, 'premium'),
+            'Article 2': (3.0, 'mini'), 'Article 3': (5.0, 'premium'), 'Article 4': (1.0, 'mini')
+        }
+        assert db.query(LLMRanking).filter(LLMRanking.model == 'mini').count() == 5
+        assert db.query(LLMRanking).filter(LLMRanking.model == 'premium').count() == 3
+    
+    def test_budget_stops_ranking_and_records_usage(self, config, db, monkeypatch):
+        """Test that requests stop at the run ceiling and usage is stored."""
+        # Each call reserves prompt + 500 tokens and really uses 1000
+        config['llm']['budget'] = {'max_tokens_per_run': 2500,
+                                   'pricing': {'test-model': {'input': 1.0, 'output': 2.0}}}
+        config['local_ranker'] = {'enabled': False}
+        articles = add_articles(db, 4)
+        
+        ranker = ArticleRanker(config, embedder=None)
+        monkeypatch.setattr(ranker, '_filter_by_similarity', lambda *args: articles)
+        client = ranker.llm.clients[0]
+        calls = []
+        
+        def fake_complete(prompt, max_tokens):
+            calls.append(prompt)
+            return LLMResponse("SCORE: 7\nREASONING: ok", client._usage(900, 100))
+        
+        monkeypatch.setattr(client, '_complete_chatgpt', fake_complete)
+        
+        ranked = ranker.filter_and_rank_candidates(db, articles, [], [])
+        
+        assert len(calls) == 2
+        assert [a.title for a, _, _ in ranked] == ['Article 0', 'Article 1']
+        assert ranker.budget.exhausted
+        rankings = db.query(LLMRanking).all()
+        assert [(r.prompt_tokens, r.completion_tokens) for r in rankings] == [(900, 100)] * 2
+        assert rankings[0].cost_usd == pytest.approx(0.0011)
+        
+        status = LLMBudget(config).status(db)
+        assert (status['day_tokens'], status['tokens_left']) == (2000, None)
+        assert status['day_cost'] == pytest.approx(0.0022)
+        
+        # Requests without a stored ranking (like the /debug test call) count too
+        ranker.budget.start_run(db)
+        client.complete('test prompt')
+        assert db.query(LLMUsage).count() == 3
+        assert LLMBudget(config).status(db)['day_tokens'] == 3000
+        assert Usage(900, 100, 0.0011).split(2) == Usage(450, 50, 0.00055)
+    
+    def test_resilient_llm_retries_hedges_and_fails_over(self):
+        """Test retries with backoff, hedged slow calls and provider failover."""
+        class ApiError(Exception):
+            def __init__(self, status_code):
+                super().__init__(f"HTTP {status_code}")
+                self.status_code = status_code
+        
+        def fake_client(provider, answers):
+            calls = []
+            lock = threading.Lock()
+            
+            def complete(prompt, max_tokens=None, cancel=None):
+                with lock:
+                    calls.append(cancel)
+                    answer = answers[min(len(calls), len(answers)) - 1]
+                if isinstance(answer, Exception):
+                    raise answer
+                delay, text = answer
+                time.sleep(delay)
+                return LLMResponse(text, latency=delay)
+            return SimpleNamespace(provider=provider, model=provider, max_tokens=500,
+                                   complete=complete, calls=calls)
+        
+        config = {'llm': {'resilience': {'max_retries': 2, 'hedge_min_samples': 3}}}
+        sleeps = []
+        
+        # Server errors are retried, then the next provider answers
+        primary = fake_client('chatgpt', [ApiError(500)])
+        secondary = fake_client('claude', [(0, 'from claude')])
+        llm = ResilientLLM(config, [primary, secondary], sleep=sleeps.append)
+        assert llm.complete('p').text == 'from claude'
+        assert len(primary.calls) == 3
+        assert len(sleeps) == 2 and sleeps[1] <= 2.0
+        
+        # Client errors fail over straight away
+        primary = fake_client('chatgpt', [ApiError(401)])
+        llm = ResilientLLM(config, [primary, secondary], sleep=sleeps.append)
+        assert llm.complete('p').text == 'from claude'
+        assert len(primary.calls) == 1
+        
+        # A call slower than recent latencies is hedged; the duplicate wins
+        primary = fake_client('chatgpt', [(0.01, 'fast')] * 3 + [(1.0, 'slow'), (0, 'hedged')])
+        llm = ResilientLLM(config, [primary])
+        assert [llm.complete('p').text for _ in range(3)] == ['fast'] * 3
+        assert llm.complete('p').text == 'hedged'
+        assert llm.hedges == 1
+        # The slow loser is told its reply is no longer wanted
+        assert primary.calls[3].is_set()
+        
+        # Nobody answers: a failure instead of a placeholder score
+        llm = ResilientLLM(config, [fake_client('chatgpt', [ApiError(503)])], sleep=sleeps.append)
+        with pytest.raises(LLMUnavailable):
+            llm.complete('p')
+        
+        # Closing releases the attempt threads
+        llm.close()
+        with pytest.raises(RuntimeError):
+            llm._executor.submit(print)
+    
+    def test_cancelled_request_is_not_sent(self, config, monkeypatch):
+        """Test that a request given up on while rate limited is never sent."""
+        client = ArticleRanker(config, embedder=None).llm.clients[0]
+        sent = []
+        
+        def fake_complete(prompt, max_tokens):
+            sent.append(prompt)
+            return LLMResponse("SCORE: 7\nREASONING: ok")
+        
+        monkeypatch.setattr(client, '_complete_chatgpt', fake_complete)
+        
+        # Latency is measured from sending, not from waiting for the limiter
+        monkeypatch.setattr(client.rate_limiter, 'acquire', lambda tokens: time.sleep(0.2))
+        assert client.complete('p').latency < 0.1
+        
+        cancel = threading.Event()
+        monkeypatch.setattr(client.rate_limiter, 'acquire', lambda tokens: cancel.set())
+        with pytest.raises(RequestCancelled):
+            client.complete('p', cancel=cancel)
+        assert len(sent) == 1
+        assert client.budget.run_tokens == 0
+    
+    def test_streaming_digest_sends_early_and_stops_ranking(self, config, db_manager, db, monkeypatch):
+        """Test that articles go out as they clear the threshold and ranking stops."""
+        monkeypatch.setenv('TEST_BOT_TOKEN', '0:test')
+        monkeypatch.setenv('TEST_ADMIN_ID', '42')
+        config['filtering'].update({'min_score_to_show': 7.0, 'articles_per_digest': 2,
+                                    'streaming_digest': {'enabled': True}})
+        config['telegram'] = {'bot_token_env': 'TEST_BOT_TOKEN', 'admin_user_id_env': 'TEST_ADMIN_ID',
+                              'show_reasoning': True, 'show_score': True,
+                              'show_source': True, 'show_date': True}
+        articles = add_articles(db, 6)
+        
+        ranker = ArticleRanker(config, embedder=None)
+        monkeypatch.setattr(ranker, '_filter_by_similarity', lambda *args: articles)
+        scores = [3.0, 8.0, 9.0, 2.0, 8.0, 9.0]
+        queried = []
+        
+        def fake_query(prompt, llm=None):
+            index = int(prompt.split('Title: Article ')[1][0])
+            queried.append(index)
+            return scores[index], "ok", None
+        
+        monkeypatch.setattr(ranker, '_query_llm', fake_query)
+        sender = FakeTelegramSender()
+        bot = TelegramBot(config, db_manager, sender=sender)
+        
+        sent, ranked = asyncio.run(bot.stream_digest(db, ranker, articles, [], []))
+        
+        assert [a.title for a, _, _ in sent] == ['Article 1', 'Article 2']
+        assert queried == [0, 1, 2]
+        assert len(ranked) == 3
+        # Header plus the two articles, which are marked as shown
+        assert len(sender.messages) == 3 and 'Article Digest' in sender.messages[0]['text']
+        assert [a.shown_to_user for a in articles] == [False, True, True, False, False, False]
 
 
 # To run tests: